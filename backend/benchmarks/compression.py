@@ -0,0 +1,64 @@
+# coding=utf-8
+"""Benchmark of the response compression (src.util.compression) on typical /tasks/ofuser payloads: reports the bytes
+on the wire and the CPU time per response for each content coding and level.
+
+Run from the backend folder:
+    python -m benchmarks.compression [--tasks 10 50 200] [--number 50]
+"""
+import argparse
+import json
+import time
+from unittest.mock import patch
+
+from bson.objectid import ObjectId
+
+from src.util import compression
+from src.util.converter import toJson
+
+def payload(tasks: int):
+    """Create the JSON body of /tasks/ofuser for a user with the given number of populated tasks, based on the dummy data."""
+    with open('./src/static/data/dummy.json', 'r') as f:
+        dummytasks = [task for user in json.load(f) for task in user['tasks']]
+
+    result = []
+    for i in range(tasks):
+        task = dummytasks[i % len(dummytasks)]
+        result.append(toJson({
+            '_id': ObjectId(),
+            'title': task['title'],
+            'description': task['description'],
+            'categories': [],
+            'video': {'_id': ObjectId(), 'url': task['url'], '_version': 1},
+            'todos': [{'_id': ObjectId(), 'description': todo, 'done': False, '_version': 1} for todo in task['todos']],
+            '_version': 1
+        }))
+    return json.dumps(result).encode('utf-8')
+
+def measure(data: bytes, algorithm: str, level: int, number: int):
+    setting = 'COMPRESSION_BROTLI_QUALITY' if algorithm == 'br' else 'COMPRESSION_LEVEL'
+    with patch.object(compression, 'getSetting', lambda name, default=None, cast=str: level if name == setting else default):
+        start = time.process_time()
+        for _ in range(number):
+            compressed = compression.compress(data, algorithm)
+        return len(compressed), (time.process_time() - start) / number
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure size and CPU cost of compressed task list responses')
+    parser.add_argument('--tasks', type=int, nargs='+', default=[10, 50, 200], help='number of tasks per response')
+    parser.add_argument('--number', type=int, default=50, help='compressions per measurement')
+    args = parser.parse_args()
+
+    codings = [('gzip', 1), ('gzip', 6), ('gzip', 9)]
+    if compression.brotli is not None:
+        codings += [('br', 1), ('br', 4), ('br', 11)]
+
+    print(f'{"tasks":>6}{"coding":>10}{"bytes":>10}{"ratio":>8}{"cpu [ms]":>10}')
+    for tasks in args.tasks:
+        data = payload(tasks)
+        print(f'{tasks:>6}{"identity":>10}{len(data):>10}{1:>8.2f}{0:>10.3f}')
+        for algorithm, level in codings:
+            size, cpu = measure(data, algorithm, level, args.number)
+            print(f'{tasks:>6}{algorithm + "-" + str(level):>10}{size:>10}{len(data) / size:>8.2f}{cpu * 1000:>10.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+# coding=utf-8
+"""Load generator replaying the request flows of the frontend against a running backend, either with a fixed number of
+concurrent virtual users (closed loop) or at a target rate of flows per second (open loop). It reports the throughput,
+the p50/p95/p99 latency per endpoint and the error rate, e.g., to determine the number of gunicorn workers.
+
+The flows (see frontend/src) and their default weights:
+    login  (1) -- GET /users/bymail/<email>, then GET /tasks/ofuser/<id>
+    ofuser (4) -- GET /tasks/ofuser/<id>
+    toggle (4) -- PUT /todos/byid/<id>, then GET /tasks/byid/<id> and GET /tasks/ofuser/<id>
+    create (1) -- POST /tasks/create (which responds with the full list of tasks)
+
+The virtual users log in as existing users (e.g., seeded with POST /populate), which are taken from GET /users/all
+unless --emails is given.
+
+Run from the backend folder:
+    python -m benchmarks.load [--url http://localhost:5000] [--concurrency 20 | --rate 50] [--duration 30] [--mix login=1,ofuser=4,toggle=4,create=1]
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+FLOWS = ['login', 'ofuser', 'toggle', 'create']
+
+def parseMix(mix: str):
+    """Parse the weights of the flows of the form login=1,ofuser=4,..."""
+    weights = {flow: 0 for flow in FLOWS}
+    for entry in mix.split(','):
+        flow, weight = entry.split('=')
+        if flow.strip() not in weights:
+            raise ValueError(f'Unknown flow {flow}, expected one of {", ".join(FLOWS)}')
+        weights[flow.strip()] = float(weight)
+    return weights
+
+def percentile(values: list, p: float):
+    """Obtain the p-th percentile (0-100) of a sorted list by the nearest-rank method."""
+    if len(values) == 0:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+class Recorder:
+    def __init__(self):
+        """Collect the latency and the outcome of every request per endpoint (thread-safe)."""
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, latency: float, failed: bool):
+        with self.lock:
+            self.latencies[endpoint].append(latency)
+            if failed:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed: float):
+        """Print the throughput, latency percentiles (in ms) and error rate per endpoint and in total."""
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        errors = sum(self.errors.values())
+        print(f'\n{total} requests in {elapsed:.1f} s: {total / elapsed:.1f} requests/s, error rate {errors / max(total, 1) * 100:.2f}%')
+        print(f'{"endpoint":<30}{"requests":>10}{"req/s":>9}{"p50 [ms]":>10}{"p95 [ms]":>10}{"p99 [ms]":>10}{"errors":>9}')
+        for endpoint in sorted(self.latencies):
+            latencies = sorted(self.latencies[endpoint])
+            print(f'{endpoint:<30}{len(latencies):>10}{len(latencies) / elapsed:>9.1f}{percentile(latencies, 50):>10.1f}{percentile(latencies, 95):>10.1f}{percentile(latencies, 99):>10.1f}{self.errors[endpoint]:>9}')
+
+    def summary(self, elapsed: float):
+        """Summarize the results as a JSON-compatible dict."""
+        endpoints = {}
+        for endpoint, latencies in self.latencies.items():
+            latencies = sorted(latencies)
+            endpoints[endpoint] = {'requests': len(latencies), 'errors': self.errors[endpoint], 'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95), 'p99': percentile(latencies, 99)}
+        total = sum(endpoint['requests'] for endpoint in endpoints.values())
+        return {'elapsed': elapsed, 'requests': total, 'throughput': total / elapsed, 'error_rate': sum(self.errors.values()) / max(total, 1), 'endpoints': endpoints}
+
+class VirtualUser:
+    def __init__(self, url: str, email: str, recorder: Recorder, rng: random.Random):
+        """A user of the frontend with a keep-alive connection to the backend and the state of its session (the user object and its tasks)."""
+        parsed = urllib.parse.urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.connection = None
+        self.email = email
+        self.recorder = recorder
+        self.rng = rng
+        self.user = None
+        self.tasks = []
+
+    def request(self, method: str, path: str, endpoint: str, form: dict = None):
+        """Send one request and record its latency under the endpoint (the route pattern).
+
+        returns:
+            body -- the parsed JSON body (None if the request failed)
+        """
+        body, headers = None, {'Cache-Control': 'no-cache'}
+        if form is not None:
+            body = urllib.parse.urlencode(form, doseq=True)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        start = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            failed = response.status >= 400
+        except (OSError, http.client.HTTPException) as e:
+            # reconnect upon the next request
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            data, failed = None, True
+        self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, failed)
+        return None if failed or not data else json.loads(data)
+
+    def login(self):
+        self.user = self.request('GET', f'/users/bymail/{urllib.parse.quote(self.email)}', 'GET /users/bymail/<email>')
+        if self.user is not None:
+            self.ofuser()
+
+    def ofuser(self):
+        if self.user is None:
+            return self.login()
+        tasks = self.request('GET', f'/tasks/ofuser/{self.user["_id"]["$oid"]}', 'GET /tasks/ofuser/<id>')
+        if tasks is not None:
+            self.tasks = tasks
+
+    def toggle(self):
+        todos = [(task, todo) for task in self.tasks for todo in task.get('todos', [])]
+        if len(todos) == 0:
+            return self.ofuser()
+        task, todo = self.rng.choice(todos)
+        todo['done'] = not todo.get('done', False)
+        self.request('PUT', f'/todos/byid/{todo["_id"]["$oid"]}', 'PUT /todos/byid/<id>', form={'data': f"{{'$set': {{'done': {str(todo['done']).lower()}}}}}"})
+        self.request('GET', f'/tasks/byid/{task["_id"]["$oid"]}', 'GET /tasks/byid/<id>')
+        self.ofuser()
+
+    def create(self):
+        if self.user is None:
+            return self.login()
+        form = {'title': f'Load test {self.rng.getrandbits(32)}', 'description': '(add a description here)', 'userid': self.user['_id']['$oid'], 'url': 'U_gANjtv28g', 'todos': ['Watch video']}
+        tasks = self.request('POST', '/tasks/create', 'POST /tasks/create', form=form)
+        if tasks is not None:
+            self.tasks = tasks
+
+    def run(self, flow: str):
+        getattr(self, flow)()
+
+def getEmails(url: str, users: int):
+    """Obtain the emails of up to the given number of existing users from GET /users/all."""
+    parsed = urllib.parse.urlparse(url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    connection.request('GET', f'/users/all?limit={users}')
+    response = connection.getresponse()
+    if response.status != 200:
+        raise RuntimeError(f'GET /users/all failed with status {response.status}')
+    return [user['email'] for user in json.loads(response.read())]
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the request flows of the frontend against a running backend')
+    parser.add_argument('--url', default='http://localhost:5000', help='url of the backend')
+    parser.add_argument('--concurrency', type=int, default=10, help='number of concurrent virtual users (in rate mode: the maximum number of flows in progress)')
+    parser.add_argument('--rate', type=float, default=None, help='target number of flows started per second (open loop) instead of a closed loop')
+    parser.add_argument('--duration', type=float, default=30, help='duration of the test in seconds')
+    parser.add_argument('--mix', default='login=1,ofuser=4,toggle=4,create=1', help='weights of the flows')
+    parser.add_argument('--users', type=int, default=100, help='number of existing users to log in as')
+    parser.add_argument('--emails', nargs='+', default=None, help='emails of the users to log in as (instead of GET /users/all)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the chosen flows and users')
+    parser.add_argument('--output', default=None, help='optional path of a JSON file receiving the results')
+    args = parser.parse_args()
+
+    weights = parseMix(args.mix)
+    emails = args.emails or getEmails(args.url, args.users)
+    if len(emails) == 0:
+        raise RuntimeError('There are no users to log in as, create some first (e.g., with POST /populate)')
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    virtualusers = [VirtualUser(args.url, emails[index % len(emails)], recorder, random.Random(rng.random())) for index in range(args.concurrency)]
+    flows = [flow for flow in FLOWS if weights[flow] > 0]
+
+    def chooseFlow(rng):
+        return rng.choices(flows, weights=[weights[flow] for flow in flows])[0]
+
+    start = time.perf_counter()
+    deadline = start + args.duration
+    if args.rate is None:
+        # closed loop: every virtual user starts its next flow as soon as the previous one completed
+        def loop(virtualuser):
+            virtualuser.login()
+            while time.perf_counter() < deadline:
+                virtualuser.run(chooseFlow(virtualuser.rng))
+        threads = [threading.Thread(target=loop, args=(virtualuser,)) for virtualuser in virtualusers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        # open loop: flows are started at the target rate by idle virtual users, regardless of the latency of the backend
+        idle = list(virtualusers)
+        lock = threading.Lock()
+        def run(virtualuser, flow):
+            try:
+                virtualuser.run(flow)
+            finally:
+                with lock:
+                    idle.append(virtualuser)
+
+        skipped = 0
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            scheduled = start
+            while scheduled < deadline:
+                time.sleep(max(0, scheduled - time.perf_counter()))
+                with lock:
+                    virtualuser = idle.pop() if len(idle) > 0 else None
+                if virtualuser is None:
+                    skipped += 1
+                else:
+                    executor.submit(run, virtualuser, chooseFlow(rng))
+                scheduled += 1 / args.rate
+        if skipped > 0:
+            print(f'Warning: {skipped} flows were not started since all {args.concurrency} virtual users were busy, increase --concurrency')
+
+    elapsed = time.perf_counter() - start
+    recorder.report(elapsed)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(recorder.summary(elapsed), f, indent=2)
+
+if __name__ == '__main__':
+    main()
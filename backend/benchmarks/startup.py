@@ -0,0 +1,85 @@
+# coding=utf-8
+"""Startup benchmark of the backend: every sample imports the application in a fresh interpreter, creates it and serves
+its first health check (GET /), as a restarted gunicorn worker would. The database is configured to be unreachable,
+hence a database round trip during the startup shows up as a failed first request and as an opened client.
+
+Run from the backend folder:
+    python -m benchmarks.startup [--number 20] [--label after] [--no-save]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.suite import getCommit, loadHistory, saveRun
+
+DATASET = 'startup'
+
+# executed by every sample, which prints the durations of its phases in milliseconds as one JSON line
+PROBE = """
+import json, time
+start = time.perf_counter()
+import src.app
+imported = time.perf_counter()
+app = src.app.create_app()
+created = time.perf_counter()
+response = app.test_client().get('/')
+served = time.perf_counter()
+
+from src.util import mongo, daos
+print(json.dumps({
+    'import': (imported - start) * 1000, 'create_app': (created - imported) * 1000, 'first request': (served - created) * 1000,
+    'status': response.status_code, 'clients': len(mongo.clients), 'daos': len(daos.daos)}))
+"""
+
+def sample(env: dict):
+    """Start the application in a fresh interpreter and return the durations of its phases, including the wall time of the whole process."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, env=env, check=True)
+    durations = json.loads(result.stdout.strip().splitlines()[-1])
+    durations['process'] = (time.perf_counter() - start) * 1000
+    return durations
+
+def summarize(values: list):
+    values = sorted(values)
+    return {'median': statistics.median(values), 'p95': values[min(len(values) - 1, int(len(values) * 0.95))], 'mean': statistics.mean(values)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the import and startup time of the backend')
+    parser.add_argument('--number', type=int, default=20, help='number of started interpreters')
+    parser.add_argument('--label', default=None, help='optional label of the run stored in the history (e.g., before or after)')
+    parser.add_argument('--no-save', action='store_true', help='do not append the results to the history')
+    args = parser.parse_args()
+
+    # nothing listens on port 1, and the short timeout bounds a sample which (wrongly) waits for the database
+    env = {**os.environ, 'MONGO_URL': 'mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=2000'}
+    # the first sample compiles the bytecode of the modules, hence it is not timed
+    sample(env)
+    samples = [sample(env) for _ in range(args.number)]
+
+    phases = ['import', 'create_app', 'first request', 'process']
+    run = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': getCommit(), 'label': args.label, 'dataset': DATASET, 'number': args.number,
+        'results': {phase: summarize([s[phase] for s in samples]) for phase in phases}}
+    previous = next((entry for entry in reversed(loadHistory()) if entry['dataset'] == DATASET), None)
+
+    print(f'\n{args.number} started interpreters')
+    print(f'{"phase":<16}{"median [ms]":>13}{"p95 [ms]":>11}{"mean [ms]":>11}{"change":>10}')
+    for phase, result in run['results'].items():
+        change = ''
+        if previous is not None and phase in previous['results'] and previous['results'][phase]['median'] > 0:
+            change = f'{(result["median"] / previous["results"][phase]["median"] - 1) * 100:+.1f}%'
+        print(f'{phase:<16}{result["median"]:>13.3f}{result["p95"]:>11.3f}{result["mean"]:>11.3f}{change:>10}')
+
+    failed = [s for s in samples if s['status'] != 200 or s['clients'] > 0 or s['daos'] > 0]
+    if len(failed) > 0:
+        print(f'\nWarning: {len(failed)} samples connected to the database or failed the health check during the startup')
+
+    if not args.no_save:
+        saveRun(run)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# coding=utf-8
+"""Benchmark suite of the data access objects, the TaskController and the flask routes against a local mongod. Each
+dataset size (users x tasks per user x todos per task) is seeded into a separate database (see src.util.seeding), every operation is timed
+individually, and the results are appended to a history file, such that runs before and after a change can be compared.
+
+Run from the backend folder (MONGO_URL defaults to the setting of the .env file):
+    python -m benchmarks.suite [--sizes 10x10x5 100x10x5] [--number 50] [--only dao controller routes] [--label after]
+    python -m benchmarks.suite --history    (lists the recorded runs)
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+from src.app import create_app
+from src.util import config, daos
+from src.util.converter import toJson
+from src.util.mongo import getClient
+from src.util.seeding import seedDatabase, generateUser, parseDistribution
+from src.controllers.taskcontroller import TaskController
+
+HISTORY = os.path.join(os.path.dirname(__file__), 'results', 'history.jsonl')
+DATABASE = 'edutask_benchmark'
+
+def parseSize(size: str):
+    """Parse a dataset size of the form USERSxTASKSxTODOS (e.g., 100x10x5)."""
+    users, tasks, todos = [int(value) for value in size.lower().split('x')]
+    return users, tasks, todos
+
+def measure(operation, number: int, setup=None):
+    """Time an operation individually number times, where the optional setup provides the argument of each call without being timed.
+
+    returns:
+        result -- dict containing the median, 95th percentile and mean latency in milliseconds
+    """
+    durations = []
+    for _ in range(number):
+        argument = setup() if setup is not None else None
+        start = time.perf_counter()
+        operation(argument)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return {'median': statistics.median(durations), 'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))], 'mean': statistics.mean(durations)}
+
+def getCases(database, users: list, rng: random.Random, dataset: tuple):
+    """Assemble the benchmark cases per group as dicts mapping the name of each case to an (operation, setup) tuple."""
+    dao = {name: daos.getDao(name) for name in ['user', 'task', 'video', 'todo']}
+    controller = TaskController(tasks_dao=dao['task'], videos_dao=dao['video'], todos_dao=dao['todo'], users_dao=dao['user'])
+    populated = controller.populate_tasks(users[0]['tasks'][:1]) or [{}]
+    raw = list(database['task'].find({'_id': {'$in': users[0]['tasks'][:1]}}))
+
+    def randomUser(_=None):
+        return rng.choice(users)
+
+    def randomTask(_=None):
+        return database['task'].find_one({'_id': rng.choice(randomUser()['tasks'])}) if dataset[1] > 0 else None
+
+    # users created by the setup of a case are generated after the seeded ones
+    offset = [len(users)]
+    def newUser(_=None):
+        documents = generateUser(offset[0], 0, parseDistribution(f'fixed:{dataset[1]}'), parseDistribution(f'fixed:{dataset[2]}'), parseDistribution('uniform:5-30'))
+        for collection_name, objs in documents.items():
+            if len(objs) > 0:
+                database[collection_name].insert_many(objs)
+        offset[0] += 1
+        return documents['user'][0]
+
+    def createdUser(_=None):
+        return dao['user'].create({'firstName': 'Jane', 'lastName': 'Doe', 'email': f'created.{rng.getrandbits(48)}@benchmark.com'})
+
+    client = create_app().test_client()
+
+    cases = {
+        'dao': {
+            'DAO.create': (lambda _: createdUser(), None),
+            'DAO.findOne': (lambda user: dao['user'].findOne(str(user['_id'])), randomUser),
+            'DAO.find (todos of a task)': (lambda task: dao['todo'].find({'_id': [{'$oid': str(id)} for id in task['todos']]}, toid=['_id']), randomTask),
+            'DAO.update': (lambda task: dao['todo'].update(str(task['todos'][0]), {'$set': {'done': True}}), randomTask),
+            'DAO.delete': (lambda user: dao['user'].delete(user['_id']['$oid']), createdUser),
+            'DAO.to_json (raw task)': (lambda _: toJson(raw), None),
+            'DAO.to_json (populated task)': (lambda _: toJson(populated), None),
+        },
+        'controller': {
+            'TaskController.create': (lambda user: controller.create({'userid': str(user['_id']), 'title': 'Created task', 'description': '-', 'url': 'U_gANjtv28g', 'todos': [f'Todo {d}' for d in range(dataset[2])]}), randomUser),
+            'TaskController.get_tasks_of_user': (lambda user: controller.get_tasks_of_user(str(user['_id'])), randomUser),
+            'TaskController.delete_of_user': (lambda user: controller.delete_of_user(str(user['_id'])), newUser),
+        },
+        'routes': {
+            'GET /users/bymail/<email>': (lambda user: client.get(f'/users/bymail/{user["email"]}'), randomUser),
+            'GET /tasks/ofuser/<id>': (lambda user: client.get(f'/tasks/ofuser/{user["_id"]}'), randomUser),
+            'PUT /todos/byid/<id>': (lambda task: client.put(f'/todos/byid/{task["todos"][0]}', data={'data': "{'$set': {'done': true}}"}), randomTask),
+            'POST /tasks/create': (lambda user: client.post('/tasks/create', data={'userid': str(user['_id']), 'title': 'Created task', 'description': '-', 'url': 'U_gANjtv28g', 'todos': [f'Todo {d}' for d in range(dataset[2])]}), randomUser),
+        }
+    }
+    return cases
+
+def getCommit():
+    """Obtain the abbreviated hash of the current git commit (or None outside of a git repository)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception as e:
+        return None
+
+def loadHistory():
+    """Load all recorded runs of the history file."""
+    if not os.path.exists(HISTORY):
+        return []
+    with open(HISTORY, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def saveRun(run: dict):
+    """Append a run to the history file."""
+    os.makedirs(os.path.dirname(HISTORY), exist_ok=True)
+    with open(HISTORY, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+
+def report(run: dict, previous: dict):
+    """Print the results of a run, compared to the median latencies of the previous run of the same dataset (if any)."""
+    print(f'\ndataset {run["dataset"]} (users x tasks x todos), {run["number"]} calls per case')
+    print(f'{"case":<36}{"median [ms]":>13}{"p95 [ms]":>11}{"mean [ms]":>11}{"change":>10}')
+    for name, result in run['results'].items():
+        change = ''
+        if previous is not None and name in previous['results'] and previous['results'][name]['median'] > 0:
+            change = f'{(result["median"] / previous["results"][name]["median"] - 1) * 100:+.1f}%'
+        print(f'{name:<36}{result["median"]:>13.3f}{result["p95"]:>11.3f}{result["mean"]:>11.3f}{change:>10}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the data access objects, the TaskController and the flask routes')
+    parser.add_argument('--sizes', nargs='+', default=['10x10x5', '100x10x5'], help='dataset sizes as USERSxTASKSxTODOS')
+    parser.add_argument('--number', type=int, default=50, help='timed calls per case')
+    parser.add_argument('--only', nargs='+', choices=['dao', 'controller', 'routes'], default=['dao', 'controller', 'routes'], help='groups of cases to run')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated data and the chosen objects')
+    parser.add_argument('--label', default=None, help='optional label of the run stored in the history (e.g., before or after)')
+    parser.add_argument('--no-save', action='store_true', help='do not append the results to the history')
+    parser.add_argument('--history', action='store_true', help='list the recorded runs and exit')
+    args = parser.parse_args()
+
+    history = loadHistory()
+    if args.history:
+        for run in history:
+            print(f'{run["timestamp"]}  {run.get("commit") or "-":<10}{run.get("label") or "-":<12}{run["dataset"]:<12}{len(run["results"])} cases')
+        return
+
+    config.loadSettings()
+    for size in args.sizes:
+        dataset = parseSize(size)
+        rng = random.Random(args.seed)
+
+        # every dataset is seeded into a database of its own, which is dropped afterwards
+        with patch.dict(config.settings, {'MONGO_DATABASE': DATABASE}), patch.dict(daos.daos, clear=True), patch('src.util.dao.bootstrapped', set()):
+            client = getClient()
+            client.drop_database(DATABASE)
+            database = client[DATABASE]
+            try:
+                # create the collections including their validators and indexes before seeding
+                for name in ['user', 'task', 'video', 'todo']:
+                    daos.getDao(name).collection
+                seedDatabase(database, dataset[0], tasks=f'fixed:{dataset[1]}', todos=f'fixed:{dataset[2]}', seed=args.seed)
+                users = list(database['user'].find({}, {'email': 1, 'tasks': 1}))
+
+                cases = getCases(database, users, rng, dataset)
+                results = {}
+                for group in args.only:
+                    for name, (operation, setup) in cases[group].items():
+                        results[name] = measure(operation, args.number, setup)
+            finally:
+                client.drop_database(DATABASE)
+
+        run = {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': getCommit(), 'label': args.label, 'dataset': size, 'number': args.number, 'results': results}
+        previous = next((entry for entry in reversed(history) if entry['dataset'] == size), None)
+        report(run, previous)
+        if not args.no_save:
+            saveRun(run)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# coding=utf-8
+"""Micro-benchmark comparing the direct BSON-to-JSON converter (src.util.converter.toJson) with the former
+bson.json_util dumps/loads round trip on documents shaped like the task, todo and user data of the application.
+
+Run from the backend folder:
+    python -m benchmarks.to_json [--number 2000] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from bson import json_util
+from bson.objectid import ObjectId
+
+from src.util.converter import toJson
+
+def todo():
+    return {'_id': ObjectId(), 'description': 'Evaluate usability of tools', 'done': False}
+
+def user(tasks: int = 10):
+    return {'_id': ObjectId(), 'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane.doe@gmail.com', 'tasks': [ObjectId() for _ in range(tasks)]}
+
+def task(todos: int = 5):
+    return {
+        '_id': ObjectId(),
+        'title': 'Improve Devtools',
+        'description': 'Upgrade the tools used for web development. In order to keep web development effective, the right choice of tools is critical.',
+        'startdate': datetime.today(),
+        'categories': ['tooling', 'web'],
+        'video': {'_id': ObjectId(), 'url': 'U_gANjtv28g'},
+        'todos': [todo() for _ in range(todos)]
+    }
+
+def roundtrip(data):
+    return json.loads(json_util.dumps(data))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the BSON-to-JSON conversion strategies')
+    parser.add_argument('--number', type=int, default=2000, help='conversions per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements (the best one is reported)')
+    args = parser.parse_args()
+
+    documents = {'todo': todo(), 'user': user(), 'task (populated)': task(), 'task list (50)': [task() for _ in range(50)]}
+
+    print(f'{"document":<20}{"json_util [us]":>16}{"toJson [us]":>14}{"speedup":>10}')
+    for name, document in documents.items():
+        assert json.dumps(toJson(document)) == json.dumps(roundtrip(document))
+        results = []
+        for converter in [roundtrip, toJson]:
+            best = min(timeit.repeat(lambda: converter(document), number=args.number, repeat=args.repeat))
+            results.append(best / args.number * 1e6)
+        print(f'{name:<20}{results[0]:>16.2f}{results[1]:>14.2f}{results[0] / results[1]:>9.1f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import pytest
+import mongomock
+
+from src.controllers.taskcontroller import TaskController
+from src.controllers.usercontroller import UserController
+from src.util import asyncdao, dao
+from src.util.dao import DAO
+
+@pytest.fixture
+def mockdatabase():
+    """In-memory database containing all collections of the application. The collections are created upfront, since
+    mongomock does not support collection validators. Since collections are bootstrapped once per client id, which may be
+    reused by a new client once the previous one is garbage collected, the record of bootstrapped collections is reset."""
+    dao.bootstrapped.clear()
+    asyncdao.bootstrapped.clear()
+    database = mongomock.MongoClient().edutask
+    for collection_name in ['user', 'task', 'todo', 'video']:
+        database.create_collection(collection_name)
+    return database
+
+@pytest.fixture
+def daos(mockdatabase):
+    """Data access objects of all collections of the in-memory database."""
+    return {name: DAO(collection_name=name, database=mockdatabase) for name in ['task', 'video', 'todo', 'user']}
+
+@pytest.fixture
+def controller(daos):
+    """Task controller on top of the data access objects of the in-memory database."""
+    return TaskController(tasks_dao=daos['task'], videos_dao=daos['video'], todos_dao=daos['todo'], users_dao=daos['user'])
+
+@pytest.fixture
+def user(daos):
+    """The user Jane Doe with two tasks, each with a video and two todos, which are stored in the referenced mode."""
+    user = UserController(daos['user']).create({'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane.doe@gmail.com'})
+    controller = TaskController(tasks_dao=daos['task'], videos_dao=daos['video'], todos_dao=daos['todo'], users_dao=daos['user'], embedded=False)
+    for title in ['Improve Devtools', 'Tech Stacks']:
+        controller.create({'userid': user['_id']['$oid'], 'title': title, 'description': '-', 'url': 'U_gANjtv28g', 'todos': ['Watch video', f'Summarize {title}']})
+    return user
@@ -0,0 +1,53 @@
+# coding=utf-8
+# configuration of the production server, run from the root folder of the backend with
+#   gunicorn -c gunicorn.conf.py main:app
+# all values are read like the settings of the application, i.e., from the local .env file or the environment variables (see README.md)
+import multiprocessing
+import os
+import sys
+
+from src.util.config import getSetting
+
+bind = f"{getSetting('FLASK_BIND_IP', '0.0.0.0')}:{getSetting('PORT', '5000')}"
+
+# worker processes, each serving requests with a pool of threads; the memory event bus only reaches the event streams of
+# its own process, hence multiple workers are only started by default with the changestream backend (see src/util/events.py)
+workers = getSetting('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1 if getSetting('EVENT_BACKEND', 'memory').lower() == 'changestream' else 1, int)
+threads = getSetting('GUNICORN_THREADS', 4, int)
+worker_class = 'gthread'
+
+# import the application once in the master process, which is safe since creating it does not connect to the database
+preload_app = True
+
+timeout = getSetting('GUNICORN_TIMEOUT', 30, int)
+graceful_timeout = getSetting('GUNICORN_GRACEFUL_TIMEOUT', 30, int)
+keepalive = getSetting('GUNICORN_KEEPALIVE', 5, int)
+max_requests = getSetting('GUNICORN_MAX_REQUESTS', 0, int)
+max_requests_jitter = getSetting('GUNICORN_MAX_REQUESTS_JITTER', 0, int)
+
+accesslog = getSetting('GUNICORN_ACCESS_LOG', '-')
+
+def on_starting(server):
+    # refuse to start multiple workers which would not deliver the change events of each other
+    from src.util.events import getDeploymentError
+    error = getDeploymentError(server.cfg.workers)
+    if error is not None:
+        server.log.error(error)
+        sys.exit(1)
+
+def post_fork(server, worker):
+    # pymongo clients are not fork-safe: every worker creates its own connection pool upon its first database operation
+    from src.util.mongo import resetClients
+    resetClients()
+
+def worker_exit(server, worker):
+    # close the connection pool of the worker during a graceful shutdown
+    from src.util.mongo import closeClients
+    closeClients()
+
+def child_exit(server, worker):
+    # remove the live gauges of a terminated worker from the aggregated metrics (if PROMETHEUS_MULTIPROC_DIR is set, which
+    # prometheus_client reads from the environment itself)
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,59 @@
+# coding=utf-8
+from flask import Flask
+from flask_cors import CORS
+
+from src.blueprints.mainblueprint import main_blueprint
+from src.blueprints.userblueprint import user_blueprint
+from src.blueprints.taskblueprint import task_blueprint
+from src.blueprints.todoblueprint import todo_blueprint
+from src.blueprints.batchblueprint import batch_blueprint
+from src.blueprints.eventblueprint import event_blueprint
+
+from src.util.compression import initCompression
+from src.util.metrics import initMetrics
+from src.util.profiler import initProfiler
+from src.util.config import getSetting
+
+def create_app(config: dict = None):
+    """Create and configure the flask application. Creating the application does not connect to the database: the
+    connection pools are created upon the first database operation of each process, such that the application can be
+    created before a pre-fork server (e.g., gunicorn) forks its worker processes.
+
+    parameters:
+        config -- optional dict of flask configuration values overriding the defaults
+
+    returns:
+        app -- the flask application
+    """
+    app = Flask('todoapp')
+
+    # configure CORS for cross-origin resource sharing (between the frontend and backend)
+    app.config['CORS_HEADERS'] = 'Content-Type'
+    app.config['CORS_EXPOSE_HEADERS'] = ['X-Next-Cursor', 'ETag', 'X-Query-Count', 'Server-Timing']
+    if config is not None:
+        app.config.update(config)
+    CORS(app)
+
+    # measure the latency of all requests including the after_request functions registered below
+    initMetrics(app)
+
+    # attribute the MongoDB commands to the requests which issued them (if PROFILER_ENABLED is set)
+    initProfiler(app)
+
+    # compress responses for clients that accept gzip or brotli
+    initCompression(app)
+
+    # register blueprints
+    app.register_blueprint(blueprint=main_blueprint)
+    app.register_blueprint(blueprint=user_blueprint, url_prefix='/users')
+    if getSetting('ASYNC_VIEWS', False, bool):
+        # serve the task routes with asynchronous views on top of the motor driver (see src.util.asyncdao)
+        from src.blueprints.asynctaskblueprint import async_task_blueprint
+        app.register_blueprint(blueprint=async_task_blueprint, url_prefix='/tasks')
+    else:
+        app.register_blueprint(blueprint=task_blueprint, url_prefix='/tasks')
+    app.register_blueprint(blueprint=todo_blueprint, url_prefix='/todos')
+    app.register_blueprint(blueprint=batch_blueprint, url_prefix='/batch')
+    app.register_blueprint(blueprint=event_blueprint, url_prefix='/events')
+
+    return app
@@ -0,0 +1,99 @@
+from flask import Blueprint, jsonify, abort, request
+from werkzeug.exceptions import NotFound
+
+from bson.objectid import ObjectId
+from pymongo.errors import WriteError
+import json
+
+from src.controllers.asynctaskcontroller import AsyncTaskController
+from src.util.daos import getAsyncDao
+from src.util.lazy import Lazy
+from src.util.pagination import getPageArguments
+from src.util.etag import conditionalJsonResponse
+# the controller is created upon the first request (see src.util.lazy)
+controller = Lazy(lambda: AsyncTaskController(tasks_dao=getAsyncDao(collection_name='task'), videos_dao=getAsyncDao(collection_name='video'), todos_dao=getAsyncDao(collection_name='todo'), users_dao=getAsyncDao(collection_name='user')))
+
+# instantiate the flask blueprint, which serves the same routes as the task_blueprint with asynchronous views; the views are
+# not decorated with cross_origin, which would hide the coroutines from flask, as CORS(app) already covers all routes
+async_task_blueprint = Blueprint('async_task_blueprint', __name__)
+
+# create a new task
+@async_task_blueprint.route('/create', methods=['POST'])
+async def create():
+    try:
+        data = request.form.to_dict(flat=False)
+        userid = data['userid'][0]
+        # convert all non-array fields back to simple values
+        for key in ['title', 'description', 'start', 'due', 'userid', 'url']:
+            if key in data and isinstance(data[key], list):
+                data[key] = data[key][0]
+
+        await controller.create(data)
+        tasks = await controller.get_tasks_of_user(userid)
+        return jsonify(tasks), 200
+    except WriteError as e:
+        abort(400, 'Invalid input data')
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+# get or update a specific task
+@async_task_blueprint.route('/byid/<id>', methods=['GET', 'PUT', 'DELETE'])
+async def get(id):
+    try:
+        if request.method == 'GET':
+            async def getTask():
+                task = await controller.get(id)
+                if task is None:
+                    abort(404, 'Task not found')
+                return task
+
+            return await conditionalJsonResponse(request, lambda: controller.get_etag([id]), getTask)
+        elif request.method == 'PUT':
+            data = request.form.to_dict(flat=True)['data']
+            data = json.loads(data.replace("'", "\""))
+
+            task = await controller.update_and_return(id, data)
+            if task is None:
+                abort(404, 'Task not found')
+            return jsonify(task), 200
+        elif request.method == 'DELETE':
+            counts = await controller.delete(id=id)
+            return jsonify({"success": True, "deleted": counts}), 200
+    except NotFound as e:
+        raise
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+# obtain all tasks associated to a specific user
+@async_task_blueprint.route('/ofuser/<id>', methods=['GET'])
+async def get_tasks_of_user(id):
+    try:
+        limit, after, sort = getPageArguments(request.args)
+        progress = request.args.get('progress', 'false').lower() == 'true'
+        if limit is None:
+            # the ids of the tasks are fetched once, then the entity tag and the tasks are obtained concurrently
+            ids = await controller.get_task_ids_of_user(id)
+            return await conditionalJsonResponse(request, lambda: controller.get_etag(ids), lambda: controller.populate_tasks([ObjectId(taskid) for taskid in ids], progress=progress))
+
+        page = await controller.get_page_of_user(id, limit=limit, after=after, progress=progress)
+        response = jsonify(page['items'])
+        if page['next'] is not None:
+            response.headers['X-Next-Cursor'] = page['next']
+        return response, 200
+    except ValueError as e:
+        abort(400, str(e))
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+# summarize the progress of all tasks associated to a specific user without their todos
+@async_task_blueprint.route('/summary/<id>', methods=['GET'])
+async def get_summary_of_user(id):
+    try:
+        ids = await controller.get_task_ids_of_user(id)
+        return await conditionalJsonResponse(request, lambda: controller.get_etag(ids), lambda: controller.get_progress(ids))
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify, abort, request
+from flask_cors import cross_origin
+
+from bson import json_util
+
+from src.controllers.batchcontroller import BatchController, COLLECTIONS
+from src.util.daos import getDao
+from src.util.lazy import Lazy
+# the controller is created upon the first request (see src.util.lazy)
+controller = Lazy(lambda: BatchController(daos={collection_name: getDao(collection_name=collection_name) for collection_name in COLLECTIONS + ['video']}))
+
+# instantiate the flask blueprint
+batch_blueprint = Blueprint('batch_blueprint', __name__)
+
+# execute a batch of create, update, and delete operations
+@batch_blueprint.route('', methods=['POST'])
+@cross_origin()
+def execute():
+    try:
+        # the body is parsed as extended JSON, such that ids and dates may be given as {"$oid": ...} and {"$date": ...}
+        body = json_util.loads(request.get_data(as_text=True) or 'null')
+        if not isinstance(body, dict):
+            raise ValueError('The body of a batch must be an object containing a list of operations')
+        batch = controller.execute(body.get('operations'), ordered=body.get('ordered', True))
+        return jsonify(batch), 200
+    except ValueError as e:
+        abort(400, str(e))
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
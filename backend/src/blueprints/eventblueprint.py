@@ -0,0 +1,39 @@
+from flask import Blueprint, Response, abort
+from flask_cors import cross_origin
+
+from bson.objectid import ObjectId
+
+from src.util.config import getSetting
+from src.util.events import getEventBus, getStreamLimit, encodeEvents
+
+# instantiate the flask blueprint
+event_blueprint = Blueprint('event_blueprint', __name__)
+
+# stream the changes of the tasks and todos of a user as server-sent events
+@event_blueprint.route('/<userid>', methods=['GET'])
+@cross_origin()
+def stream(userid):
+    # every stream occupies a thread of the worker until it is closed, hence streams beyond the limit are rejected
+    limit = getStreamLimit()
+    if not limit.acquire():
+        abort(503, 'Too many open event streams')
+    try:
+        if not ObjectId.is_valid(userid):
+            raise ValueError(f'Invalid userid {userid}')
+
+        # subscribe before the response is returned, such that no event between the request and the first read is lost
+        subscription = getEventBus().subscribe(userid)
+        response = Response(encodeEvents(subscription, keepalive=getSetting('EVENT_KEEPALIVE', 15.0, float)), mimetype='text/event-stream')
+        response.call_on_close(subscription.close)
+        response.call_on_close(limit.release)
+        response.headers['Cache-Control'] = 'no-cache'
+        # disable the response buffering of reverse proxies (e.g., nginx)
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except ValueError as e:
+        limit.release()
+        abort(400, str(e))
+    except Exception as e:
+        limit.release()
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
@@ -0,0 +1,101 @@
+from flask import Blueprint, jsonify, abort, request, Response
+from flask_cors import cross_origin
+
+import json
+
+from src.controllers.usercontroller import UserController
+from src.controllers.taskcontroller import TaskController
+from src.util.config import getSetting
+from src.util.daos import getDao, getCacheStats
+from src.util.metrics import isEnabled, generateMetrics
+from src.util.seeding import seedDatabase
+
+# instantiate the flask blueprint
+main_blueprint = Blueprint('main_blueprint', __name__)
+
+# simple heartbeat method to check if the server is running
+@main_blueprint.route('/')
+@cross_origin()
+def ping():
+    # the version is read from the configuration loaded once per process, such that a health check does no file I/O
+    return jsonify({'version': getSetting('VERSION')}), 200
+
+# hit and miss counters of the read caches of the data access objects
+@main_blueprint.route('/cache', methods=['GET'])
+@cross_origin()
+def cache():
+    return jsonify(getCacheStats()), 200
+
+# request latencies, data access object latencies and connection pool gauges in the Prometheus text format
+@main_blueprint.route('/metrics', methods=['GET'])
+def metrics():
+    if not isEnabled():
+        abort(404, 'Metrics are disabled')
+    body, content_type = generateMetrics()
+    return Response(body, content_type=content_type), 200
+
+# simple population method that adds initial data to the database
+@main_blueprint.route('/populate', methods=['POST'])
+@cross_origin()
+def populate():
+    usercontroller = UserController(getDao(collection_name='user'))
+    taskcontroller = TaskController(tasks_dao=getDao(collection_name='task'), videos_dao=getDao(collection_name='video'), todos_dao=getDao(collection_name='todo'), users_dao=getDao(collection_name='user'))
+
+    response = {'users': []}
+    with open(f'./src/static/data/dummy.json', 'r') as f:
+        dummydata = json.load(f)
+
+        for userdata in dummydata:
+            user = usercontroller.create({
+                'firstName': userdata['firstName'], 
+                'lastName': userdata['lastName'], 
+                'email': userdata['email']
+            })
+
+            for taskdata in userdata['tasks']:
+                taskcontroller.create({
+                    'userid': user['_id']['$oid'],
+                    'title': taskdata['title'],
+                    'description': taskdata['description'],
+                    'url': taskdata['url'],
+                    'todos': taskdata['todos']
+                })
+
+            response['users'].append(user['_id']['$oid'])
+
+    return jsonify(response), 200
+
+# generate a deterministic synthetic dataset of the given size (see src.util.seeding)
+@main_blueprint.route('/seed', methods=['POST'])
+@cross_origin()
+def seed():
+    try:
+        data = request.form.to_dict(flat=True)
+        users = int(data.get('users', 100))
+        workers = int(data.get('workers', 4))
+        max_users = getSetting('MAX_SEED_USERS', 10000, int)
+        max_workers = getSetting('MAX_SEED_WORKERS', 8, int)
+        if not 0 <= users <= max_users:
+            raise ValueError(f'The number of users must be between 0 and {max_users}')
+        if not 1 <= workers <= max_workers:
+            raise ValueError(f'The number of workers must be between 1 and {max_workers}')
+
+        database = getDao(collection_name='user').collection.database
+        for collection_name in ['task', 'video', 'todo']:
+            getDao(collection_name=collection_name).collection
+
+        counts = seedDatabase(
+            database,
+            users=users,
+            tasks=data.get('tasks', 'poisson:5'),
+            todos=data.get('todos', 'poisson:3'),
+            words=data.get('words', 'uniform:5-30'),
+            seed=int(data.get('seed', 0)),
+            offset=int(data.get('offset', 0)),
+            workers=workers)
+        return jsonify(counts), 200
+    except ValueError as e:
+        abort(400, str(e))
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
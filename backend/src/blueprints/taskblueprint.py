@@ -1,13 +1,19 @@
 from flask import Blueprint, jsonify, abort, request
+from werkzeug.exceptions import NotFound
 from flask_cors import cross_origin
 
+from bson.objectid import ObjectId
 from pymongo.errors import WriteError
 import json
 
 #import src.controllers.taskcontroller as controller
-from src.controllers.taskcontroller import TaskController
+from src.controllers.taskcontroller import TaskController, getTasksEtag
 from src.util.daos import getDao
-controller = TaskController(tasks_dao=getDao(collection_name='task'), videos_dao=getDao(collection_name='video'), todos_dao=getDao(collection_name='todo'), users_dao=getDao(collection_name='user'))
+from src.util.lazy import Lazy
+from src.util.pagination import getPageArguments
+from src.util.etag import conditionalResponse, conditionalDerivedResponse
+# the controller is created upon the first request (see src.util.lazy)
+controller = Lazy(lambda: TaskController(tasks_dao=getDao(collection_name='task'), videos_dao=getDao(collection_name='video'), todos_dao=getDao(collection_name='todo'), users_dao=getDao(collection_name='user')))
 
 # instantiate the flask blueprint
 task_blueprint = Blueprint('task_blueprint', __name__)
@@ -39,17 +45,27 @@ def create():
 def get(id):
     try:
         if request.method == 'GET':
-            task = controller.get(id)
-            return jsonify(task), 200
+            def getTask():
+                task = controller.get(id)
+                if task is None:
+                    abort(404, 'Task not found')
+                return task
+
+            # answer with 304 Not Modified if neither the task nor its video or todos changed
+            return conditionalDerivedResponse(request, lambda: controller.get_etag([id]), getTask, lambda task: getTasksEtag([task]))
         elif request.method == 'PUT':
             data = request.form.to_dict(flat=True)['data']
             data = json.loads(data.replace("'", "\""))
 
-            task = controller.update(id, data)
+            task = controller.update_and_return(id, data)
+            if task is None:
+                abort(404, 'Task not found')
             return jsonify(task), 200
         elif request.method == 'DELETE':
-            result = controller.delete(id=id)
-            return jsonify({"success": result}), 200
+            counts = controller.delete(id=id)
+            return jsonify({"success": True, "deleted": counts}), 200
+    except NotFound as e:
+        raise
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
@@ -59,8 +75,34 @@ def get(id):
 @cross_origin()
 def get_tasks_of_user(id):
     try:
-        tasks = controller.get_tasks_of_user(id)
-        return jsonify(tasks), 200
+        limit, after, sort = getPageArguments(request.args)
+        # optionally include the number of done and of all todos of each task
+        progress = request.args.get('progress', 'false').lower() == 'true'
+        if limit is None:
+            # the ids of the tasks are fetched once, and the entity tag is only computed upfront for conditional requests
+            ids = controller.get_task_ids_of_user(id)
+            return conditionalDerivedResponse(request, lambda: controller.get_etag(ids), lambda: controller.populate_tasks([ObjectId(taskid) for taskid in ids], progress=progress), getTasksEtag)
+
+        # return one page of tasks and the continuation token of the next page
+        page = controller.get_page_of_user(id, limit=limit, after=after, progress=progress)
+        response = jsonify(page['items'])
+        if page['next'] is not None:
+            response.headers['X-Next-Cursor'] = page['next']
+        return response, 200
+    except ValueError as e:
+        abort(400, str(e))
+    except Exception as e:
+        print(f'{e.__class__.__name__}: {e}')
+        abort(500, 'Unknown server error')
+
+# summarize the progress of all tasks associated to a specific user without their todos
+@task_blueprint.route('/summary/<id>', methods=['GET'])
+@cross_origin()
+def get_summary_of_user(id):
+    try:
+        # the summary does not contain the versions of the tasks, hence the entity tag is always computed upfront
+        ids = controller.get_task_ids_of_user(id)
+        return conditionalResponse(request, controller.get_etag(ids), lambda: jsonify(controller.get_progress(ids)))
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
\ No newline at end of file
@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify, abort, request
+from werkzeug.exceptions import NotFound
 from flask_cors import cross_origin
 
 import json
@@ -7,7 +8,10 @@ from pymongo.errors import WriteError
 
 from src.controllers.todocontroller import TodoController
 from src.util.daos import getDao
-controller = TodoController(todo_dao=getDao(collection_name='todo'), tasks_dao=getDao(collection_name='task'))
+from src.util.lazy import Lazy
+from src.util.etag import conditionalResponse, getDocumentEtag
+# the controller is created upon the first request (see src.util.lazy)
+controller = Lazy(lambda: TodoController(todo_dao=getDao(collection_name='todo'), tasks_dao=getDao(collection_name='task'), users_dao=getDao(collection_name='user')))
 
 # instantiate the flask blueprint
 todo_blueprint = Blueprint('todo_blueprint', __name__)
@@ -20,7 +24,7 @@ def create():
         data = request.form.to_dict(flat=True)
         todo = controller.create(data)
         return jsonify(todo), 200
-    except WriteError as e:
+    except (WriteError, KeyError, ValueError) as e:
         abort(400, 'Invalid input data')
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
@@ -34,18 +38,22 @@ def get_todo(id):
         # get a specific todo
         if request.method == 'GET':
             todo = controller.get(id)
-            return jsonify(todo), 200
+            return conditionalResponse(request, getDocumentEtag(todo), lambda: jsonify(todo))
         # update the todo
         elif request.method == 'PUT':
             data = request.form.to_dict(flat=True)['data']
             data = json.loads(data.replace("'", "\""))
 
-            todo = controller.update(id, data)
+            todo = controller.update_and_return(id, data)
+            if todo is None:
+                abort(404, 'Todo not found')
             return jsonify(todo), 200
         # delete an existing todo
         elif request.method == 'DELETE':
             controller.delete(id)
             return jsonify({'id': id}), 200
+    except NotFound as e:
+        raise
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
\ No newline at end of file
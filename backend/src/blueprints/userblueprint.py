@@ -1,13 +1,19 @@
 from flask import Blueprint, jsonify, abort, request
+from werkzeug.exceptions import NotFound
 from flask_cors import cross_origin
 
 from pymongo.errors import WriteError
 
 from src.util.daos import getDao
+from src.util.lazy import Lazy
+from src.util.pagination import getPageArguments
+from src.util.streaming import isStreamRequested, streamResponse
+from src.util.etag import conditionalResponse, getDocumentEtag
 from src.controllers.usercontroller import UserController
 from src.controllers.taskcontroller import TaskController
-controller = UserController(getDao(collection_name='user'))
-taskcontroller = TaskController(tasks_dao=getDao(collection_name='task'), videos_dao=getDao(collection_name='video'), todos_dao=getDao(collection_name='todo'), users_dao=getDao(collection_name='user'))
+# the controllers are created upon the first request (see src.util.lazy)
+controller = Lazy(lambda: UserController(getDao(collection_name='user')))
+taskcontroller = Lazy(lambda: TaskController(tasks_dao=getDao(collection_name='task'), videos_dao=getDao(collection_name='video'), todos_dao=getDao(collection_name='todo'), users_dao=getDao(collection_name='user')))
 
 # instantiate the flask blueprint
 user_blueprint = Blueprint('user_blueprint', __name__)
@@ -35,18 +41,21 @@ def get_user(id):
         # get a specific user
         if request.method == 'GET':
             user = controller.get(id)
-            return jsonify(user), 200
+            return conditionalResponse(request, getDocumentEtag(user), lambda: jsonify(user))
         # update the user
         elif request.method == 'PUT':
-            data = request.form
-            update_result = controller.update(id, data)
-            user = controller.get(id)
+            # update the user and obtain the updated user within one round trip
+            user = controller.update_and_return(id, request.form)
+            if user is None:
+                abort(404, 'User not found')
             return jsonify(user), 200
         # delete a user
         elif request.method == 'DELETE':
-            taskcontroller.delete_of_user(id=id)
+            counts = taskcontroller.delete_of_user(id=id)
             result = controller.delete(id=id)
-            return jsonify({"success": result}), 200
+            return jsonify({"success": result, "deleted": counts}), 200
+    except NotFound as e:
+        raise
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
@@ -67,8 +76,25 @@ def get_user_by_mail(email):
 @cross_origin()
 def get_users():
     try:
-        users = controller.get_all()
-        return jsonify(users), 200
+        limit, after, sort = getPageArguments(request.args)
+
+        # stream all users (e.g., for exports) without loading them into memory
+        format = isStreamRequested(request)
+        if format is not None and limit is None:
+            return streamResponse(controller.iterate_all(sort=sort), format=format)
+
+        if limit is None and sort is None:
+            users = controller.get_all()
+            return jsonify(users), 200
+
+        # return one page of users and the continuation token of the next page
+        page = controller.get_page(limit=limit, after=after, sort=sort)
+        response = jsonify(page['items'])
+        if page['next'] is not None:
+            response.headers['X-Next-Cursor'] = page['next']
+        return response, 200
+    except ValueError as e:
+        abort(400, str(e))
     except Exception as e:
         print(f'{e.__class__.__name__}: {e}')
         abort(500, 'Unknown server error')
\ No newline at end of file
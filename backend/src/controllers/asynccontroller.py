@@ -0,0 +1,151 @@
+from src.util.asyncdao import AsyncDAO
+
+class AsyncController:
+    def __init__(self, dao: AsyncDAO):
+        """Instantiate an asynchronous controller, which offers the methods of the Controller (see src.controllers.controller) as coroutines on top of an asynchronous data access object.
+
+        parameters:
+            dao -- asynchronous data access object, which has to grant access to the specific collection of the database
+        """
+        self.dao = dao
+
+    async def create(self, data: dict):
+        """Create a new object in the database and return the newly created object (see Controller.create).
+
+        parameters:
+            data -- a dict containing all relevant fields of data according to the validator
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.create(data)
+        except Exception as e:
+            raise
+
+    async def create_many(self, data: list, ordered: bool = True):
+        """Create multiple new objects in the database within a single round trip (see Controller.create_many).
+
+        parameters:
+            data -- a list of dicts, each containing all relevant fields of data according to the validator
+            ordered -- if True, stop at the first object violating the validator
+
+        returns:
+            result -- dict containing the created objects under the key 'created' and the per-object errors under the key 'errors'
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.create_many(data, ordered=ordered)
+        except Exception as e:
+            raise
+
+    async def get(self, id: str):
+        """Search for an object by id and return the associated database object (see Controller.get).
+
+        parameters:
+            id -- the unique identifier of the object
+
+        returns:
+            object -- if an object associated to the given id can be found
+            None -- if no object associated to the given id can be found
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.findOne(id)
+        except Exception as e:
+            raise
+
+    async def get_all(self):
+        """Gathers all objects in the respective collection of the database (see Controller.get_all).
+
+        returns:
+            objects -- array of all objects in the respective collection in the database
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.find()
+        except Exception as e:
+            raise
+
+    async def get_page(self, limit: int = None, after: str = None, sort: str = None):
+        """Gathers one page of the objects in the respective collection of the database (see Controller.get_page).
+
+        parameters:
+            limit -- maximum number of objects of the page (None for all remaining objects)
+            after -- continuation token of the previous page (None for the first page)
+            sort -- the name of the field to sort by, prefixed by a '-' for a descending order
+
+        returns:
+            page -- dict containing the objects under the key 'items' and the continuation token of the next page under the key 'next'
+
+        raises:
+            ValueError -- in case the continuation token is invalid
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.find_page(limit=limit, after=after, sort=sort)
+        except Exception as e:
+            raise
+
+    async def update(self, id: str, data: dict):
+        """Locates an object in the respective collection of the database and updates it with the given data values (see Controller.update).
+
+        parameters:
+            id -- the unique identifier of the object
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set, $push)
+
+        returns:
+            True -- if the update was successful
+            False -- if the update failed
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.update(id=id, update_data=data)
+        except Exception as e:
+            raise
+
+    async def update_and_return(self, id: str, data: dict, projection: dict = None):
+        """Locates an object, updates it with the given data values, and returns the updated object within the same round trip (see Controller.update_and_return).
+
+        parameters:
+            id -- the unique identifier of the object
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set, $push)
+            projection -- optional dict of the properties to include in (or exclude from) the returned object
+
+        returns:
+            object -- the updated object
+            None -- if no object is associated to the given id
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.update_and_return(id, data, projection=projection)
+        except Exception as e:
+            raise
+
+    async def delete(self, id: str):
+        """Delete an object from the respective collection of the database (see Controller.delete).
+
+        parameters:
+            id -- the unique identifier of the object
+
+        returns:
+            True -- if the delete was successful
+            False -- if the delete failed
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return await self.dao.delete(id=id)
+        except Exception as e:
+            raise
@@ -0,0 +1,360 @@
+from bson.objectid import ObjectId
+from pymongo.errors import WriteError
+
+from src.controllers.asynccontroller import AsyncController
+from src.controllers.taskcontroller import prepareTask, getCreatedTask, getTaskPipeline, getProgressPipeline, getEtagPipeline, getTasksEtag
+from src.util.asyncdao import AsyncDAO
+from src.util.asyncmongo import runInTransactionAsync, runOperations, onDatabaseLoop
+from src.util.pagination import parseSort, getSortStages, getKeysetFilter, encodeCursor
+from src.util.embedding import isEmbedded, isReference, hasReferences
+from src.util.events import EventBus, getEventBus
+
+class AsyncTaskController(AsyncController):
+    def __init__(self, tasks_dao: AsyncDAO, videos_dao: AsyncDAO, todos_dao: AsyncDAO, users_dao: AsyncDAO, embedded: bool = None, events: EventBus = None):
+        """Instantiate the asynchronous variant of the TaskController (see src.controllers.taskcontroller), which awaits independent database operations concurrently.
+
+        parameters:
+            tasks_dao, videos_dao, todos_dao, users_dao -- asynchronous data access objects of the respective collections
+            embedded -- whether the video and todos are embedded in the task objects (defaults to the TODO_STORAGE setting, see src.util.embedding)
+            events -- the bus to which the changes of tasks are published (defaults to the bus of the process, see src.util.events)
+        """
+        super().__init__(dao=tasks_dao)
+        self.videos_dao = videos_dao
+        self.todos_dao = todos_dao
+        self.users_dao = users_dao
+        self.embedded = isEmbedded() if embedded is None else embedded
+        self.events = getEventBus() if events is None else events
+
+    @onDatabaseLoop
+    async def create(self, data: dict):
+        """Create a new task object including its video and todos (see TaskController.create). As all ids are assigned upfront, the writes of the video, the todos, and the task do not depend on each other: without a transaction, they are awaited concurrently, and the task is assigned to the user once they succeeded.
+
+        attributes:
+            data -- dict containing the data of the new task (at least a title, url, and userid)
+
+        returns:
+            id -- the id of the newly created task
+
+        raises:
+            KeyError -- in case an important key is missing in the data dict
+            Exception -- in case any database operation fails
+        """
+        uid, video, todos = prepareTask(data, embedded=self.embedded)
+
+        async def createTodos(session):
+            result = await self.todos_dao.create_many(todos, session=session)
+            if len(result['errors']) > 0:
+                error = result['errors'][0]
+                raise WriteError(error['message'], code=error['code'])
+
+        async def write(session):
+            if self.embedded:
+                await self.dao.create(data, session=session)
+            else:
+                await runOperations([
+                    lambda session: self.videos_dao.create(video, session=session),
+                    createTodos,
+                    lambda session: self.dao.create(data, session=session)
+                ], session=session)
+
+            # the task is only assigned to the user once it was created, such that a failed write leaves the user unchanged without a transaction
+            await self.users_dao.update(uid, {'$push': {'tasks': data['_id']}}, session=session)
+
+        async def rollback():
+            await runOperations([
+                lambda session: self.videos_dao.delete_many([] if self.embedded else [video['_id']]),
+                lambda session: self.todos_dao.delete_many([] if self.embedded else [todo['_id'] for todo in todos]),
+                lambda session: self.dao.delete_many([data['_id']])
+            ])
+
+        try:
+            await runInTransactionAsync(self.dao.collection.database.client, write, rollback=rollback)
+            if self.events.active:
+                self.events.publish('task.created', [uid], data['_id'], data=getCreatedTask(data, video, todos, embedded=self.embedded))
+            return str(data['_id'])
+        except Exception as e:
+            raise
+
+    async def get(self, id: str):
+        """Return a single task object with its video and todos resolved.
+
+        attributes:
+            id -- the unique identifier of a task object
+
+        returns:
+            task -- the populated task object
+            None -- if no task is associated to the given id
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            tasks = await self.populate_tasks([ObjectId(id)])
+            return tasks[0] if len(tasks) > 0 else None
+        except Exception as e:
+            raise
+
+    async def update_and_return(self, id: str, data: dict, projection: dict = None):
+        """Update a task with the given data values and return the updated task with its video and todos resolved (see TaskController.update_and_return).
+
+        attributes:
+            id -- the unique identifier of a task object
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set)
+            projection -- optional dict of the properties to include in (or exclude from) the returned task
+
+        returns:
+            task -- the updated task object
+            None -- if no task is associated to the given id
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            task = await self.dao.update_and_return(id, data, projection=projection)
+            if task is not None and hasReferences(task):
+                populated = await self.populate_tasks([ObjectId(id)])
+                for attribute in ['video', 'todos']:
+                    if attribute in task and len(populated) > 0:
+                        task[attribute] = populated[0][attribute]
+            if task is not None and self.events.active:
+                self.events.publish('task.updated', await self.get_owners(id), id, data=task)
+            return task
+        except Exception as e:
+            raise
+
+    async def get_owners(self, id: str):
+        """Return the ids of all users to whom a task is assigned (see TaskController.get_owners)."""
+        try:
+            users = await self.users_dao.find(filter={'tasks': ObjectId(id)}, projection={'_id': 1})
+            return [user['_id']['$oid'] for user in users]
+        except Exception as e:
+            raise
+
+    async def get_task_ids_of_user(self, id: str):
+        """Return the ids of all task objects that are associated to a specific user.
+
+        attributes:
+            id -- the unique identifier of a user object
+
+        returns:
+            ids -- list of the task ids as strings
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            user = await self.users_dao.findOne(id)
+            return [taskid['$oid'] for taskid in user.get('tasks', [])]
+        except Exception as e:
+            raise
+
+    async def get_tasks_of_user(self, id: str, progress: bool = False):
+        """Return all task objects that are associated to a specific user.
+
+        attributes:
+            id -- the unique identifier of a user object
+            progress -- if True, each task additionally contains the number of its done todos and of all its todos under the key progress
+
+        returns:
+            tasks -- list of tasks associated to that user
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            ids = await self.get_task_ids_of_user(id)
+            return await self.populate_tasks([ObjectId(taskid) for taskid in ids], progress=progress)
+        except Exception as e:
+            raise
+
+    async def get_progress(self, ids: list):
+        """Summarize the progress of multiple tasks with a single aggregation (see TaskController.get_progress).
+
+        attributes:
+            ids -- list of unique identifiers of task objects
+
+        returns:
+            summary -- dict containing the progress per task under the key tasks, and the sums over all tasks under the keys done and total
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if len(ids) == 0:
+            return {'tasks': [], 'done': 0, 'total': 0}
+
+        pipeline = getProgressPipeline({'_id': {'$in': [ObjectId(id) for id in ids]}}, self.todos_dao.collection_name)
+        try:
+            summaries = await self.dao.aggregate(pipeline)
+            return summaries[0] if len(summaries) > 0 else {'tasks': [], 'done': 0, 'total': 0}
+        except Exception as e:
+            raise
+
+    async def get_page_of_user(self, id: str, limit: int = None, after: str = None, progress: bool = False):
+        """Return one page of the task objects that are associated to a specific user, ordered by their ids (see TaskController.get_page_of_user).
+
+        attributes:
+            id -- the unique identifier of a user object
+            limit -- maximum number of tasks of the page (None for all remaining tasks)
+            after -- continuation token of the previous page (None for the first page)
+            progress -- if True, each task additionally contains its progress (see get_tasks_of_user)
+
+        returns:
+            page -- dict containing the populated tasks under the key 'items' and the continuation token of the next page (or None) under the key 'next'
+
+        raises:
+            ValueError -- in case the continuation token is invalid
+            Exception -- in case any database operation fails
+        """
+        try:
+            ids = [ObjectId(taskid) for taskid in await self.get_task_ids_of_user(id)]
+            if len(ids) == 0:
+                return {'items': [], 'next': None}
+
+            sort = parseSort(None)
+            match = {'_id': {'$in': ids}}
+            if after is not None:
+                match = {'$and': [match, getKeysetFilter(after, sort)]}
+
+            tasks = await self.populate_tasks(match=match, sort=getSortStages(sort), limit=None if limit is None else limit + 1, progress=progress)
+
+            cursor = None
+            if limit is not None and len(tasks) > limit:
+                tasks = tasks[:limit]
+                cursor = encodeCursor(tasks[-1], sort)
+            return {'items': tasks, 'next': cursor}
+        except Exception as e:
+            raise
+
+    async def populate_tasks(self, ids: list = None, match: dict = None, sort: list = None, limit: int = None, progress: bool = False):
+        """Fetch multiple task objects and resolve their videos and todos with a single aggregation (see TaskController.populate_tasks).
+
+        parameters:
+            ids -- list of ObjectIds of task objects
+            match -- alternatively to the ids, a filter selecting the task objects
+            sort -- optional list of (field, direction) tuples by which the tasks are sorted
+            limit -- optional maximum number of tasks
+            progress -- if True, each task additionally contains the number of its done todos and of all its todos under the key progress
+
+        returns:
+            tasks -- list of task objects with resolved references
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if match is None:
+            if len(ids) == 0:
+                return []
+            match = {'_id': {'$in': ids}}
+
+        tasks = await self.dao.aggregate(getTaskPipeline(match, self.videos_dao.collection_name, self.todos_dao.collection_name, self.embedded, sort=sort, limit=limit, progress=progress))
+        if self.embedded:
+            pending = [ObjectId(task['_id']['$oid']) for task in tasks if hasReferences(task)]
+            if len(pending) > 0:
+                populated = {task['_id']['$oid']: task for task in await self.dao.aggregate(getTaskPipeline({'_id': {'$in': pending}}, self.videos_dao.collection_name, self.todos_dao.collection_name, False, progress=progress))}
+                tasks = [populated.get(task['_id']['$oid'], task) for task in tasks]
+        return tasks
+
+    async def get_etag(self, ids: list):
+        """Compute the entity tag of the populated representation of multiple tasks without populating them (see TaskController.get_etag).
+
+        parameters:
+            ids -- list of unique identifiers of task objects
+
+        returns:
+            etag -- the entity tag
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if len(ids) == 0:
+            return getTasksEtag([])
+
+        pipeline = getEtagPipeline({'_id': {'$in': [ObjectId(id) for id in ids]}}, self.videos_dao.collection_name, self.todos_dao.collection_name)
+        try:
+            return getTasksEtag(await self.dao.aggregate(pipeline))
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    async def delete(self, id: str):
+        """Delete a task including its video and all todo items associated to it, and remove the reference to the task from its user (see TaskController.delete).
+
+        parameters:
+            id -- the unique identifier of a task object
+
+        returns:
+            counts -- dict containing the number of deleted tasks, videos, and todos
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        async def delete(session):
+            counts, modified = await runOperations([
+                lambda session: self.delete_tasks([id], session=session),
+                lambda session: self.users_dao.update_many({'tasks': ObjectId(id)}, {'$pull': {'tasks': ObjectId(id)}}, session=session)
+            ], session=session)
+            return counts
+
+        try:
+            # the users of the task are determined before the references to it are removed
+            owners = await self.get_owners(id) if self.events.active else []
+            counts = await runInTransactionAsync(self.dao.collection.database.client, delete)
+            if counts['tasks'] > 0 and len(owners) > 0:
+                self.events.publish('task.deleted', owners, id)
+            return counts
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    async def delete_of_user(self, id: str):
+        """Delete all tasks that are associated to a user including their videos and todos (see TaskController.delete_of_user).
+
+        parameters:
+            id -- the unique identifier of a user object
+
+        returns:
+            counts -- dict containing the number of deleted tasks, videos, and todos
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            taskids = await self.get_task_ids_of_user(id)
+            counts = await runInTransactionAsync(self.dao.collection.database.client, lambda session: self.delete_tasks(taskids, session=session))
+            if self.events.active:
+                for taskid in taskids:
+                    self.events.publish('task.deleted', [id], taskid)
+            return counts
+        except Exception as e:
+            raise
+
+    async def delete_tasks(self, ids: list, session=None):
+        """Delete multiple tasks including their videos and todo items with one query per collection (see TaskController.delete_tasks), where the three deletions are awaited concurrently without a session.
+
+        parameters:
+            ids -- list of unique identifiers of task objects
+            session -- optional motor session in which the operations are executed
+
+        returns:
+            counts -- dict containing the number of deleted objects under the keys tasks, videos, and todos
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        counts = {'tasks': 0, 'videos': 0, 'todos': 0}
+        if len(ids) == 0:
+            return counts
+
+        try:
+            tasks = await self.dao.find(filter={'_id': {'$in': [ObjectId(id) for id in ids]}}, projection={'video': 1, 'todos': 1}, session=session)
+            videoids = [task['video']['$oid'] for task in tasks if isReference(task.get('video'))]
+            todoids = [todo['$oid'] for task in tasks for todo in task.get('todos', []) if isReference(todo)]
+
+            counts['videos'], counts['todos'], counts['tasks'] = await runOperations([
+                lambda session: self.videos_dao.delete_many(videoids, session=session),
+                lambda session: self.todos_dao.delete_many(todoids, session=session),
+                lambda session: self.dao.delete_many([task['_id']['$oid'] for task in tasks], session=session)
+            ], session=session)
+            return counts
+        except Exception as e:
+            raise
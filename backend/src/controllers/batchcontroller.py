@@ -0,0 +1,286 @@
+from bson.objectid import ObjectId
+from pymongo import InsertOne, UpdateOne, DeleteOne
+
+from src.controllers.taskcontroller import getTaskPipeline
+from src.controllers.todocontroller import getPositionalUpdate
+from src.util.dao import VERSION
+from src.util.config import getSetting
+from src.util.converter import toJson
+from src.util.embedding import isEmbedded
+from src.util.events import EventBus, getEventBus
+
+COLLECTIONS = ['task', 'todo', 'user']
+ACTIONS = ['create', 'update', 'delete']
+# the update operators accepted within a batch (see https://www.mongodb.com/docs/manual/reference/operator/update/)
+OPERATORS = ['$set', '$unset', '$inc', '$min', '$max', '$mul', '$push', '$addToSet', '$pull', '$pullAll', '$pop', '$currentDate']
+# the error code of an operation referring to an object which does not exist (NoMatchingDocument, see https://www.mongodb.com/docs/manual/reference/error-codes/)
+NO_MATCHING_DOCUMENT = 47
+
+def parseOperations(operations, max_size: int):
+    """Validate the operations of a batch before any of them is executed. Each operation is a dict containing the action (create, update, or delete), the collection (task, todo, or user), the id of the object (for updates and deletions), and the data (the new object for creations, or the update operation for updates).
+
+    parameters:
+        operations -- list of operations
+        max_size -- the maximum number of operations of a batch
+
+    returns:
+        operations -- the validated list of operations
+
+    raises:
+        ValueError -- in case the list or any operation is invalid, where the message contains the index of the operation
+    """
+    if not isinstance(operations, list) or len(operations) == 0:
+        raise ValueError('A batch must contain a non-empty list of operations')
+    if len(operations) > max_size:
+        raise ValueError(f'A batch must not contain more than {max_size} operations')
+
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ValueError(f'Invalid operation {index}: an operation must be an object')
+        if operation.get('action') not in ACTIONS:
+            raise ValueError(f'Invalid operation {index}: the action must be one of {", ".join(ACTIONS)}')
+        if operation.get('collection') not in COLLECTIONS:
+            raise ValueError(f'Invalid operation {index}: the collection must be one of {", ".join(COLLECTIONS)}')
+        if operation['action'] != 'create' and not ObjectId.is_valid(str(operation.get('id'))):
+            raise ValueError(f'Invalid operation {index}: the {operation["action"]} requires the id of the object')
+        if operation['action'] == 'delete':
+            continue
+
+        data = operation.get('data')
+        if not isinstance(data, dict) or len(data) == 0:
+            raise ValueError(f'Invalid operation {index}: the {operation["action"]} requires a non-empty data object')
+        if operation['action'] == 'create' and any(key.startswith('$') or key in ['_id', VERSION] for key in data):
+            raise ValueError(f'Invalid operation {index}: the data of a create must not contain operators, an _id, or a {VERSION}')
+        if operation['action'] == 'update':
+            for operator, fields in data.items():
+                if operator not in OPERATORS or not isinstance(fields, dict):
+                    raise ValueError(f'Invalid operation {index}: {operator} is not a supported update operator')
+                if any(field.split('.')[0] in ['_id', VERSION] for field in fields):
+                    raise ValueError(f'Invalid operation {index}: the _id and the {VERSION} of an object cannot be updated')
+    return operations
+
+class BatchController:
+    def __init__(self, daos: dict, embedded: bool = None, events: EventBus = None):
+        """Instantiate a controller which executes batches of create, update, and delete operations on the task, todo, and user collections with one bulk write per collection (see DAO.bulk_write), instead of one round trip per operation. The operations act on single objects like the data access objects do, i.e., creating a task does not create its video and todos, and deleting a task or user does not delete the objects associated to it.
+
+        parameters:
+            daos -- dict mapping the names of the task, todo, user, and video collections to their data access objects (the video collection is only read to populate the tasks of change events)
+            embedded -- whether the todos are embedded in their tasks (defaults to the TODO_STORAGE setting, see src.util.embedding)
+            events -- the bus to which the changes of tasks and todos are published (defaults to the bus of the process, see src.util.events)
+        """
+        self.daos = daos
+        self.embedded = isEmbedded() if embedded is None else embedded
+        self.events = getEventBus() if events is None else events
+
+    def execute(self, operations: list, ordered: bool = True):
+        """Validate and execute a batch of operations (see parseOperations). The operations are grouped into one bulk write per collection: an unordered batch executes all operations of a collection at once and continues after failed operations, while an ordered batch preserves the order of the operations by executing each run of consecutive operations on the same collection at once, and skips all operations after the first failed one. A todo created with the id of a task that does not exist fails without being created, and it is only assigned to its task once it was created.
+
+        parameters:
+            operations -- list of operations
+            ordered -- whether the operations are executed in their order and stop at the first failed operation
+
+        returns:
+            batch -- dict containing one dict per operation under the key results, with its status (ok, error, or skipped) under the key status, the id of a created object under the key id, and the error code and message of a failed operation under the keys code and message, as well as the numbers of inserted, matched, modified, and deleted objects per collection under the key counts (an update or deletion which does not match any object still succeeds)
+
+        raises:
+            ValueError -- in case the batch is invalid (in which case no operation is executed)
+            Exception -- in case any database operation fails for reasons other than a failing write operation
+        """
+        if not isinstance(ordered, bool):
+            raise ValueError('The ordered flag of a batch must be a boolean')
+        parseOperations(operations, getSetting('MAX_BATCH_SIZE', 1000, int))
+
+        # each operation results in one or multiple write operations (e.g., creating a todo and assigning it to its task)
+        ids = [ObjectId() if operation['action'] == 'create' else None for operation in operations]
+        requests = [self.get_requests(index, operation, ids[index]) for index, operation in enumerate(operations)]
+
+        try:
+            # the tasks of changed todos and the users of deleted tasks are determined before they are removed (see publish)
+            if self.events.active:
+                todotasks = self.get_tasks_of_todos([operation['id'] for operation in operations if operation['collection'] == 'todo' and operation['action'] != 'create'])
+                owners = self.get_owners([operation['id'] for operation in operations if operation['collection'] == 'task' and operation['action'] == 'delete'])
+
+            # a todo is only created if its task exists, since the assignment to the task cannot be undone within a batch
+            taskids = {ObjectId(str(operation['data']['taskid'])) for operation in operations if operation['collection'] == 'todo' and operation['action'] == 'create' and operation['data'].get('taskid') is not None}
+            tasks = {ObjectId(task['_id']['$oid']) for task in self.daos['task'].find({'_id': {'$in': list(taskids)}}, projection={'_id': 1})} if len(taskids) > 0 else set()
+
+            writes = []
+            dependent = []
+            results = []
+            rejected = {}
+            for index, operation in enumerate(operations):
+                result = {'status': 'skipped'}
+                results.append(result)
+                if ordered and len(rejected) > 0:
+                    continue
+                if ids[index] is not None:
+                    result['id'] = ids[index]
+                taskid = operation['data'].get('taskid') if operation['collection'] == 'todo' and operation['action'] == 'create' else None
+                if taskid is not None and ObjectId(str(taskid)) not in tasks:
+                    rejected[index] = f'There is no task with the id {taskid}'
+                    continue
+                if operation['collection'] == 'task' and operation['action'] == 'delete':
+                    tasks.discard(ObjectId(operation['id']))
+                # the further write operations of an operation (i.e., the assignment of a todo to its task) depend on its first one
+                writes.append((*requests[index][0], index))
+                for collection_name, request in requests[index][1:]:
+                    (writes if ordered else dependent).append((collection_name, request, index))
+
+            # an unordered batch executes the dependent write operations after all others, such that they are only executed if the write operations they depend on succeeded
+            groups = self.get_groups(writes, ordered) + self.get_groups(dependent, ordered)
+
+            failed = set()
+            counts = {}
+            for collection_name, group in groups:
+                if ordered and len(failed) > 0:
+                    break
+                group = [(request, index) for request, index in group if index not in failed]
+                if len(group) == 0:
+                    continue
+                result = self.daos[collection_name].bulk_write([request for request, index in group], ordered=ordered)
+                total = counts.setdefault(collection_name, {'inserted': 0, 'matched': 0, 'modified': 0, 'deleted': 0})
+                for key in total:
+                    total[key] += result[key]
+                errors = {error['index']: error for error in result['errors']}
+                for position, (request, index) in enumerate(group):
+                    if position in errors:
+                        results[index].update({'status': 'error', 'code': errors[position]['code'], 'message': errors[position]['message']})
+                        failed.add(index)
+                    elif not (ordered and len(errors) > 0 and position > min(errors)):
+                        results[index]['status'] = 'ok'
+
+            # an operation only succeeded if all of its write operations succeeded
+            for index in failed:
+                results[index]['status'] = 'error'
+            # an ordered batch skips a rejected operation if an operation before it failed
+            for index, message in rejected.items():
+                if not (ordered and len(failed) > 0):
+                    results[index].update({'status': 'error', 'code': NO_MATCHING_DOCUMENT, 'message': message})
+
+            if self.events.active:
+                self.publish(operations, results, todotasks, owners)
+            return {'results': toJson(results), 'counts': counts}
+        except Exception as e:
+            raise
+
+    def publish(self, operations: list, results: list, todotasks: dict, owners: dict):
+        """Publish the changes of the succeeded operations on tasks and todos to the users of their tasks (see src.util.events), like the task and todo controllers do. The changed tasks are populated by one aggregation and their users are determined by one query, regardless of the number of operations.
+
+        parameters:
+            operations -- list of executed operations
+            results -- list of the results of the operations (see execute)
+            todotasks -- dict mapping the ids of the updated and deleted todos to the ids of their tasks, determined before the execution
+            owners -- dict mapping the ids of the deleted tasks to the ids of their users, determined before the execution
+        """
+        changes = []
+        for index, operation in enumerate(operations):
+            if results[index]['status'] != 'ok' or operation['collection'] not in ['task', 'todo']:
+                continue
+            id = str(results[index]['id']) if operation['action'] == 'create' else operation['id']
+            if operation['collection'] == 'task':
+                taskid = id
+            elif operation['action'] == 'create':
+                taskid = operation['data'].get('taskid')
+            else:
+                taskid = todotasks.get(id)
+            if taskid is not None:
+                changes.append((f'{operation["collection"]}.{operation["action"]}d', str(taskid), id))
+        if len(changes) == 0:
+            return
+
+        # the deleted tasks keep the users determined before the execution
+        owners = {**self.get_owners([taskid for type, taskid, id in changes if type != 'task.deleted']), **owners}
+        populated = [taskid for type, taskid, id in changes if not type.endswith('deleted') and len(owners.get(taskid, [])) > 0]
+        tasks = {}
+        if len(populated) > 0:
+            # the pipeline accepts both representations of the todos (see getEtagPipeline)
+            pipeline = getTaskPipeline({'_id': {'$in': [ObjectId(taskid) for taskid in populated]}}, self.daos['video'].collection_name, self.daos['todo'].collection_name, False)
+            tasks = {task['_id']['$oid']: task for task in self.daos['task'].aggregate(pipeline)}
+
+        for type, taskid, id in changes:
+            if len(owners.get(taskid, [])) == 0:
+                continue
+            data = None
+            if type in ['task.created', 'task.updated']:
+                data = tasks.get(taskid)
+            elif type in ['todo.created', 'todo.updated']:
+                data = next((todo for todo in tasks.get(taskid, {}).get('todos', []) if todo['_id']['$oid'] == id), None)
+            self.events.publish(type, owners[taskid], taskid, id=id, data=data)
+
+    def get_tasks_of_todos(self, ids: list):
+        """Return a dict mapping the ids of todo items to the ids of the tasks which contain them (as references or embedded)."""
+        if len(ids) == 0:
+            return {}
+        todoids = [ObjectId(id) for id in ids]
+        tasks = self.daos['task'].find(filter={'$or': [{'todos': {'$in': todoids}}, {'todos._id': {'$in': todoids}}]}, projection={'todos': 1})
+        return {(todo['$oid'] if '$oid' in todo else todo['_id']['$oid']): task['_id']['$oid'] for task in tasks for todo in task.get('todos', [])}
+
+    def get_owners(self, ids: list):
+        """Return a dict mapping the ids of tasks to the ids of the users to whom they are assigned."""
+        if len(ids) == 0:
+            return {}
+        users = self.daos['user'].find(filter={'tasks': {'$in': [ObjectId(id) for id in ids]}}, projection={'tasks': 1})
+        owners = {}
+        for user in users:
+            for taskid in user.get('tasks', []):
+                owners.setdefault(taskid['$oid'], []).append(user['_id']['$oid'])
+        return owners
+
+    def get_groups(self, writes: list, ordered: bool):
+        """Group write operations into one bulk write per collection: in an ordered batch, each run of consecutive write operations on the same collection forms a group, whereas in an unordered batch, all write operations on the same collection do.
+
+        parameters:
+            writes -- list of (collection name, write operation, index of the operation) tuples
+            ordered -- whether the order of the write operations must be preserved
+
+        returns:
+            groups -- list of (collection name, list of (write operation, index of the operation) tuples) tuples
+        """
+        groups = []
+        for collection_name, request, index in writes:
+            if ordered and len(groups) > 0 and groups[-1][0] == collection_name:
+                groups[-1][1].append((request, index))
+            elif not ordered and collection_name in [group[0] for group in groups]:
+                next(group for group in groups if group[0] == collection_name)[1].append((request, index))
+            else:
+                groups.append((collection_name, [(request, index)]))
+        return groups
+
+    def get_requests(self, index: int, operation: dict, id: ObjectId = None):
+        """Translate an operation into the write operations of the collections (see pymongo.InsertOne, UpdateOne, and DeleteOne). A todo created with a taskid is assigned to its task, and in the embedded mode, todo operations are positional updates of their tasks (see TodoController).
+
+        parameters:
+            index -- the index of the operation within the batch
+            operation -- the validated operation
+            id -- the id assigned upfront to the object of a create
+
+        returns:
+            requests -- list of (collection name, write operation) tuples
+
+        raises:
+            ValueError -- in case the taskid of a todo is invalid, or missing in the embedded mode
+        """
+        dao = self.daos[operation['collection']]
+        action = operation['action']
+        data = dict(operation.get('data') or {})
+
+        if operation['collection'] == 'todo':
+            taskid = data.pop('taskid', None)
+            if action == 'create' and (taskid is not None or self.embedded) and not ObjectId.is_valid(str(taskid)):
+                raise ValueError(f'Invalid operation {index}: the taskid of the todo is {"invalid" if taskid is not None else "required"}')
+            if self.embedded:
+                if action == 'create':
+                    filter, update = {'_id': ObjectId(str(taskid))}, {'$push': {'todos': {'_id': id, **data, VERSION: 1}}}
+                elif action == 'update':
+                    filter, update = {'todos._id': ObjectId(operation['id'])}, getPositionalUpdate(data)
+                else:
+                    filter, update = {'todos._id': ObjectId(operation['id'])}, {'$pull': {'todos': {'_id': ObjectId(operation['id'])}}}
+                return [('task', UpdateOne(filter, self.daos['task'].versioned(update)))]
+            if action == 'create' and taskid is not None:
+                return [('todo', InsertOne({**data, '_id': id, VERSION: 1})), ('task', UpdateOne({'_id': ObjectId(str(taskid))}, self.daos['task'].versioned({'$push': {'todos': id}})))]
+
+        if action == 'create':
+            return [(operation['collection'], InsertOne({**data, '_id': id, VERSION: 1}))]
+        if action == 'update':
+            return [(operation['collection'], UpdateOne({'_id': ObjectId(operation['id'])}, dao.versioned(data)))]
+        return [(operation['collection'], DeleteOne({'_id': ObjectId(operation['id'])}))]
@@ -26,6 +26,24 @@ class Controller:
         except Exception as e:
             raise
 
+    def create_many(self, data: list, ordered: bool = True):
+        """Create multiple new objects in the database within a single round trip.
+
+        parameters:
+            data -- a list of dicts, each containing all relevant fields of data according to the validator
+            ordered -- if True, stop at the first object violating the validator
+
+        returns:
+            result -- dict containing the created objects under the key 'created' and the per-object errors under the key 'errors'
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return self.dao.create_many(data, ordered=ordered)
+        except Exception as e:
+            raise
+
     # get a user by id
     def get(self, id: str):
         """Search for an object by id and return the associated database object. The database object will contain
@@ -61,6 +79,38 @@ class Controller:
         except Exception as e:
             raise
 
+    def iterate_all(self, sort: str = None, batch_size: int = None):
+        """Iterates over all objects in the respective collection of the database without loading them into memory at once (see DAO.iterate).
+
+        parameters:
+            sort -- optional name of the field to sort by, prefixed by a '-' for a descending order
+            batch_size -- optional number of objects fetched per round trip
+
+        returns:
+            generator -- yielding one object after the other
+        """
+        return self.dao.iterate(sort=sort, batch_size=batch_size)
+
+    def get_page(self, limit: int = None, after: str = None, sort: str = None):
+        """Gathers one page of the objects in the respective collection of the database (see DAO.find_page).
+
+        parameters:
+            limit -- maximum number of objects of the page (None for all remaining objects)
+            after -- continuation token of the previous page (None for the first page)
+            sort -- the name of the field to sort by, prefixed by a '-' for a descending order
+
+        returns:
+            page -- dict containing the objects under the key 'items' and the continuation token of the next page under the key 'next'
+
+        raises:
+            ValueError -- in case the continuation token is invalid
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return self.dao.find_page(limit=limit, after=after, sort=sort)
+        except Exception as e:
+            raise
+
     def update(self, id: str, data: dict):
         """Locates an object in the respective collection of the database and updates it with the given data 
         values.
@@ -83,6 +133,28 @@ class Controller:
         except Exception as e:
             raise
 
+    def update_and_return(self, id: str, data: dict, projection: dict = None):
+        """Locates an object in the respective collection of the database, updates it with the given data values, and
+        returns the updated object within the same round trip, such that it does not need to be fetched again.
+
+        parameters:
+            id -- the unique identifier of the object
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set, $push),
+                and the values of those keys again dicts where the keys are fieldnames and the values the new values.
+            projection -- optional dict of the properties to include in (or exclude from) the returned object
+
+        returns:
+            object -- the updated object
+            None -- if no object associated to the given id can be found
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return self.dao.update_and_return(id, data, projection=projection)
+        except Exception as e:
+            raise
+
     def delete(self, id: str):
         """Delete an object from the respective collection of the database
 
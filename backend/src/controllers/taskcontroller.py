@@ -1,18 +1,160 @@
 from bson.objectid import ObjectId
+from pymongo.errors import WriteError
 from datetime import datetime
 
 from src.controllers.controller import Controller
 from src.util.dao import DAO
+from src.util.population import getPopulationPipeline
+from src.util.mongo import runInTransaction
+from src.util.pagination import parseSort, getSortStages, getKeysetFilter, encodeCursor
+from src.util.etag import computeEtag
+from src.util.dao import VERSION
+from src.util.embedding import isEmbedded, isReference, hasReferences
+from src.util.events import EventBus, getEventBus
+from src.util.converter import toJson
+
+def prepareTask(data: dict, embedded: bool = False):
+    """Prepare the data of a new task for its creation: fill in the default values and assign the ids of the task, its video and its todos upfront, such that the video, the todos and the task can be written without waiting for each other. The data dict is modified in place and becomes the task object.
+
+    parameters:
+        data -- dict containing the data of the new task (at least a title, url, and userid)
+        embedded -- if True, the video and todos are embedded in the task object instead of referenced by their ids (see src.util.embedding)
+
+    returns:
+        uid -- the id of the user to whom the task is assigned
+        video -- the video object of the task
+        todos -- list of the todo objects of the task
+
+    raises:
+        KeyError -- in case an important key is missing in the data dict
+    """
+    # store the userid
+    if 'userid' not in data:
+        raise KeyError('When creating a task object, the userid of the associated user must be given')
+    uid = data['userid']
+    del data['userid']
+
+    # fill default values for missing values
+    if 'startdate' not in data:
+        data['startdate'] = datetime.today()
+    if 'categories' not in data:
+        data['categories'] = []
+
+    video = {'_id': ObjectId(), 'url': data['url']}
+    del data['url']
+    todos = [{'_id': ObjectId(), 'description': todo, 'done': False} for todo in data.get('todos', [])]
+    data['_id'] = ObjectId()
+    if embedded:
+        data['video'] = {**video, VERSION: 1}
+        data['todos'] = [{**todo, VERSION: 1} for todo in todos]
+    else:
+        data['video'] = video['_id']
+        data['todos'] = [todo['_id'] for todo in todos]
+    return uid, video, todos
+
+def getCreatedTask(data: dict, video: dict, todos: list, embedded: bool = False):
+    """Assemble the populated representation of a newly created task from the objects written by TaskController.create, such that it is published without reading the task once more.
+
+    parameters:
+        data, video, todos -- the task object, its video and its todos (see prepareTask)
+        embedded -- if True, the video and todos are already embedded in the task object
+
+    returns:
+        task -- the populated task object (parsed to JSON)
+    """
+    task = {**data, VERSION: 1}
+    if not embedded:
+        task['video'] = {**video, VERSION: 1}
+        task['todos'] = [{**todo, VERSION: 1} for todo in todos]
+    return toJson(task)
+
+# the number of done todos and of all todos of a populated task
+PROGRESS = {
+    'done': {'$size': {'$filter': {'input': {'$ifNull': ['$todos', []]}, 'as': 'todo', 'cond': {'$and': [{'$ifNull': ['$$todo.done', False]}]}}}},
+    'total': {'$size': {'$ifNull': ['$todos', []]}}
+}
+
+def getTaskPipeline(match: dict, videos: str, todos: str, embedded: bool, sort: list = None, limit: int = None, progress: bool = False):
+    """Create the aggregation pipeline populating the video and todos of the selected tasks (see getPopulationPipeline). In the embedded mode, the tasks already contain their video and todos, hence they are only selected. In the referenced mode, the pipeline additionally accepts tasks that have already been converted by the migration tool (see src.util.embedding).
+
+    parameters:
+        match -- filter selecting the task objects
+        videos, todos -- the names of the video and todo collections
+        embedded -- whether the video and todos are embedded in the tasks
+        sort -- optional list of (field, direction) tuples by which the tasks are sorted
+        limit -- optional maximum number of tasks
+        progress -- if True, each task additionally contains the number of its done todos and of all its todos under the key progress
+
+    returns:
+        pipeline -- list of aggregation stages
+    """
+    if embedded:
+        pipeline = getPopulationPipeline(match=match, references={}, sort=sort, limit=limit)
+    else:
+        pipeline = getPopulationPipeline(match=match, references={'video': videos, 'todos': todos}, single=['video'], sort=sort, limit=limit, embedded=True)
+    if progress:
+        pipeline.append({'$addFields': {'progress': PROGRESS}})
+    return pipeline
+
+def getProgressPipeline(match: dict, todos: str):
+    """Create the aggregation pipeline summarizing the progress of the selected tasks: it counts the done todos and all todos of each task on the database server and sums them up, such that only the counts are transferred instead of the todo objects. Since tasks may still reference their todos while the migration tool converts them (see src.util.embedding), the pipeline accepts both representations in either storage mode; only the todos are resolved, as the video does not contribute to the progress.
+
+    parameters:
+        match -- filter selecting the task objects
+        todos -- the name of the todo collection
+
+    returns:
+        pipeline -- list of aggregation stages resulting in at most one summary object (see TaskController.get_progress)
+    """
+    pipeline = getPopulationPipeline(match=match, references={'todos': todos}, sort=[('_id', 1)], embedded=True)
+    pipeline.append({'$addFields': {'progress': PROGRESS}})
+    pipeline.extend([
+        {'$project': {'title': 1, 'done': '$progress.done', 'total': '$progress.total'}},
+        {'$group': {'_id': None, 'tasks': {'$push': '$$ROOT'}, 'done': {'$sum': '$done'}, 'total': {'$sum': '$total'}}},
+        {'$project': {'_id': 0}}
+    ])
+    return pipeline
+
+def getEtagPipeline(match: dict, videos: str, todos: str):
+    """Create the aggregation pipeline gathering the ids and versions of the selected tasks, their videos, and their todos (see TaskController.get_etag). Like the populated tasks, the pipeline accepts both representations of the todos in either storage mode, such that tasks which the migration tool has not converted yet are tagged by their referenced todos (see TaskController.populate_tasks).
+
+    parameters:
+        match -- filter selecting the task objects
+        videos, todos -- the names of the video and todo collections
+
+    returns:
+        pipeline -- list of aggregation stages
+    """
+    pipeline = getTaskPipeline(match, videos, todos, False)
+    pipeline.append({'$project': {VERSION: 1, 'video._id': 1, f'video.{VERSION}': 1, 'todos._id': 1, f'todos.{VERSION}': 1}})
+    return pipeline
+
+def getTasksEtag(tasks: list):
+    """Compute the entity tag of populated tasks, which only depends on the ids and versions of the tasks, their videos, and their todos. Hence, the tag of the populated tasks equals the tag of their projection onto the ids and versions (see getEtagPipeline).
+
+    parameters:
+        tasks -- list of populated tasks (parsed to json), or of their projections
+
+    returns:
+        etag -- the entity tag
+    """
+    def getVersion(obj):
+        return [obj.get('_id'), obj.get(VERSION)] if isinstance(obj, dict) else None
+    return computeEtag([[getVersion(task), getVersion(task.get('video')), [getVersion(todo) for todo in task.get('todos') or []]] for task in tasks])
 
 class TaskController(Controller):
-    def __init__(self, tasks_dao: DAO, videos_dao: DAO, todos_dao: DAO, users_dao: DAO):
+    def __init__(self, tasks_dao: DAO, videos_dao: DAO, todos_dao: DAO, users_dao: DAO, embedded: bool = None, events: EventBus = None):
         super().__init__(dao=tasks_dao)
         self.videos_dao = videos_dao
         self.todos_dao = todos_dao
         self.users_dao = users_dao
+        # whether the video and todos are embedded in the task objects (defaults to the TODO_STORAGE setting)
+        self.embedded = isEmbedded() if embedded is None else embedded
+        # the bus to which the changes of tasks are published (see src.util.events)
+        self.events = getEventBus() if events is None else events
 
     def create(self, data: dict):
-        """Create a new task object based on the data contained in the dict. The data must contain at least a userid, a video url and a title. If todos are contained in the data, create todo objects and associate them to the task
+        """Create a new task object based on the data contained in the dict. The data must contain at least a userid, a video url and a title. If todos are contained in the data, create todo objects and associate them to the task. All objects are written within one transaction (if the database supports transactions), and the number of round trips does not depend on the number of todos. In the embedded mode, the video and todos are part of the task object, hence only the task is written.
 
         attributes:
             data -- dict containing the data of the new task (at least a title, url, and userid)
@@ -24,54 +166,130 @@ class TaskController(Controller):
             KeyError -- in case an important key is missing in the data dict
             Exception -- in case any database operation fails
         """
+        uid, video, todos = prepareTask(data, embedded=self.embedded)
 
-        # store the userid
-        if 'userid' not in data:
-            raise KeyError('When creating a task object, the userid of the associated user must be given')
-        uid = data['userid']
-        del data['userid']
+        def write(session):
+            if self.embedded:
+                self.dao.create(data, session=session)
+                self.users_dao.update(uid, {'$push': {'tasks': data['_id']}}, session=session)
+                return
 
-        
-        # fill default values for missing values
-        if 'startdate' not in data:
-            data['startdate'] = datetime.today()
-        if 'categories' not in data:
-            data['categories'] = []
+            self.videos_dao.create(video, session=session)
 
-        try:
-            # add the video url
-            video = self.videos_dao.create({'url': data['url']})
-            del data['url']
-            data['video'] = ObjectId(video['_id']['$oid'])
-
-            # create and add todos
-            todos = []
-            for todo in data['todos']:
-                todoobj = self.todos_dao.create({'description': todo, 'done': False})
-                todos.append(ObjectId(todoobj['_id']['$oid']))
-            data['todos'] = todos
+            # create all todos within one round trip
+            result = self.todos_dao.create_many(todos, session=session)
+            if len(result['errors']) > 0:
+                error = result['errors'][0]
+                raise WriteError(error['message'], code=error['code'])
 
             # create the task object and assign it to the user
-            task = self.dao.create(data)
-            self.users_dao.update(
-                uid, {'$push': {'tasks': ObjectId(task['_id']['$oid'])}})
-            return task['_id']['$oid']
+            self.dao.create(data, session=session)
+            self.users_dao.update(uid, {'$push': {'tasks': data['_id']}}, session=session)
+
+        def rollback():
+            if not self.embedded:
+                self.videos_dao.delete_many([video['_id']])
+                self.todos_dao.delete_many([todo['_id'] for todo in todos])
+            self.dao.delete_many([data['_id']])
+
+        try:
+            runInTransaction(self.dao.collection.database.client, write, rollback=rollback)
+            if self.events.active:
+                self.events.publish('task.created', [uid], data['_id'], data=getCreatedTask(data, video, todos, embedded=self.embedded))
+            return str(data['_id'])
         except Exception as e:
             raise
 
     def get(self, id: str):
+        """Return a single task object with its video and todos resolved.
+
+        attributes:
+            id -- the unique identifier of a task object
+
+        returns:
+            task -- the populated task object
+            None -- if no task is associated to the given id
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            tasks = self.populate_tasks([ObjectId(id)])
+            return tasks[0] if len(tasks) > 0 else None
+        except Exception as e:
+            raise
+
+
+    def update_and_return(self, id: str, data: dict, projection: dict = None):
+        """Update a task with the given data values and return the updated task with its video and todos resolved. The task is updated and returned within the same round trip, which already contains the embedded video and todos in the embedded mode; otherwise, its references are resolved by one more aggregation.
+
+        attributes:
+            id -- the unique identifier of a task object
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set)
+            projection -- optional dict of the properties to include in (or exclude from) the returned task
+
+        returns:
+            task -- the updated task object
+            None -- if no task is associated to the given id
+
+        raises:
+            Exception -- in case any database operation fails
+        """
         try:
-            task = super().get(id)
-            return self.populate_task(task)
+            task = self.dao.update_and_return(id, data, projection=projection)
+            if task is not None and hasReferences(task):
+                populated = self.populate_tasks([ObjectId(id)])
+                for attribute in ['video', 'todos']:
+                    if attribute in task and len(populated) > 0:
+                        task[attribute] = populated[0][attribute]
+            if task is not None and self.events.active:
+                self.events.publish('task.updated', self.get_owners(id), id, data=task)
+            return task
         except Exception as e:
             raise
 
+    def get_owners(self, id: str):
+        """Return the ids of all users to whom a task is assigned.
+
+        attributes:
+            id -- the unique identifier of a task object
+
+        returns:
+            ids -- list of the ids of the users
 
-    def get_tasks_of_user(self, id: str):
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            users = self.users_dao.find(filter={'tasks': ObjectId(id)}, projection={'_id': 1})
+            return [user['_id']['$oid'] for user in users]
+        except Exception as e:
+            raise
+
+    def get_task_ids_of_user(self, id: str):
+        """Return the ids of all task objects that are associated to a specific user.
+
+        attributes:
+            id -- the unique identifier of a user object
+
+        returns:
+            ids -- list of the task ids as strings
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            user = self.users_dao.findOne(id)
+            return [taskid['$oid'] for taskid in user.get('tasks', [])]
+        except Exception as e:
+            raise
+
+    def get_tasks_of_user(self, id: str, progress: bool = False):
         """Return all task objects that are associated to a specific user.
 
         attributes:
             id -- the unique identifier of a user object
+            progress -- if True, each task additionally contains the number of its done todos and of all its todos under the key progress
 
         returns:
             tasks -- list of tasks associated to that user
@@ -81,12 +299,154 @@ class TaskController(Controller):
         """
         try:
             user = self.users_dao.findOne(id)
-            tasks = self.dao.find(filter={'_id': user['tasks']}, toid=['_id'])
+            return self.populate_tasks([ObjectId(taskid['$oid']) for taskid in user.get('tasks', [])], progress=progress)
+        except Exception as e:
+            raise
+
+    def get_progress(self, ids: list):
+        """Summarize the progress of multiple tasks with a single aggregation over the tasks and their todos (see getProgressPipeline), which neither transfers nor converts the todo objects.
+
+        attributes:
+            ids -- list of unique identifiers of task objects
+
+        returns:
+            summary -- dict containing one dict per task (with its _id, title, and the number of done and of all todos under the keys done and total) under the key tasks, and the sums over all tasks under the keys done and total
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if len(ids) == 0:
+            return {'tasks': [], 'done': 0, 'total': 0}
+
+        pipeline = getProgressPipeline({'_id': {'$in': [ObjectId(id) for id in ids]}}, self.todos_dao.collection_name)
+        try:
+            summaries = self.dao.aggregate(pipeline)
+            return summaries[0] if len(summaries) > 0 else {'tasks': [], 'done': 0, 'total': 0}
+        except Exception as e:
+            raise
+
+    def get_progress_of_user(self, id: str):
+        """Summarize the progress of all tasks associated to a specific user (see get_progress).
+
+        attributes:
+            id -- the unique identifier of a user object
+
+        returns:
+            summary -- dict containing the progress per task under the key tasks, and the progress of the user under the keys done and total
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            user = self.users_dao.findOne(id)
+            return self.get_progress([taskid['$oid'] for taskid in user.get('tasks', [])])
+        except Exception as e:
+            raise
+
+    def get_page_of_user(self, id: str, limit: int = None, after: str = None, progress: bool = False):
+        """Return one page of the task objects that are associated to a specific user, ordered by their ids.
+
+        attributes:
+            id -- the unique identifier of a user object
+            limit -- maximum number of tasks of the page (None for all remaining tasks)
+            after -- continuation token of the previous page (None for the first page)
+            progress -- if True, each task additionally contains its progress (see get_tasks_of_user)
+
+        returns:
+            page -- dict containing the populated tasks under the key 'items' and the continuation token of the next page (or None) under the key 'next'
+
+        raises:
+            ValueError -- in case the continuation token is invalid
+            Exception -- in case any database operation fails
+        """
+        try:
+            user = self.users_dao.findOne(id)
+            ids = [ObjectId(taskid['$oid']) for taskid in user.get('tasks', [])]
+            if len(ids) == 0:
+                return {'items': [], 'next': None}
+
+            sort = parseSort(None)
+            match = {'_id': {'$in': ids}}
+            if after is not None:
+                match = {'$and': [match, getKeysetFilter(after, sort)]}
+
+            # fetch one additional task to determine whether there is a next page
+            tasks = self.populate_tasks(match=match, sort=getSortStages(sort), limit=None if limit is None else limit + 1, progress=progress)
+
+            cursor = None
+            if limit is not None and len(tasks) > limit:
+                tasks = tasks[:limit]
+                cursor = encodeCursor(tasks[-1], sort)
+            return {'items': tasks, 'next': cursor}
+        except Exception as e:
+            raise
+
+    def populate_tasks(self, ids: list = None, match: dict = None, sort: list = None, limit: int = None, progress: bool = False):
+        """Fetch multiple task objects and resolve the video and todos of all of them with a single aggregation, instead of querying the video and todos of each task separately (see populate_task).
+
+        parameters:
+            ids -- list of ObjectIds of task objects
+            match -- alternatively to the ids, a filter selecting the task objects
+            sort -- optional list of (field, direction) tuples by which the tasks are sorted
+            limit -- optional maximum number of tasks
+            progress -- if True, each task additionally contains the number of its done todos and of all its todos under the key progress
+
+        returns:
+            tasks -- list of task objects with resolved references
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if match is None:
+            if len(ids) == 0:
+                return []
+            match = {'_id': {'$in': ids}}
+
+        tasks = self.dao.aggregate(getTaskPipeline(match, self.videos_dao.collection_name, self.todos_dao.collection_name, self.embedded, sort=sort, limit=limit, progress=progress))
+        if self.embedded:
+            # tasks which have not been converted yet are populated separately
+            pending = [ObjectId(task['_id']['$oid']) for task in tasks if hasReferences(task)]
+            if len(pending) > 0:
+                populated = {task['_id']['$oid']: task for task in self.dao.aggregate(getTaskPipeline({'_id': {'$in': pending}}, self.videos_dao.collection_name, self.todos_dao.collection_name, False, progress=progress))}
+                tasks = [populated.get(task['_id']['$oid'], task) for task in tasks]
+        return tasks
+
+    def get_etag(self, ids: list):
+        """Compute the entity tag of the populated representation of multiple tasks without populating them: a single aggregation only gathers the ids and versions of the tasks, their videos, and their todos (see DAO.versioned), such that the tag changes whenever any of these objects is modified, added, or removed. The tag equals the one derived from the populated tasks (see getTasksEtag).
+
+        parameters:
+            ids -- list of unique identifiers of task objects
+
+        returns:
+            etag -- the entity tag
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if len(ids) == 0:
+            return getTasksEtag([])
+
+        pipeline = getEtagPipeline({'_id': {'$in': [ObjectId(id) for id in ids]}}, self.videos_dao.collection_name, self.todos_dao.collection_name)
+        try:
+            return getTasksEtag(self.dao.aggregate(pipeline))
+        except Exception as e:
+            raise
+
+    def get_etag_of_user(self, id: str):
+        """Compute the entity tag of the populated tasks of a user (see get_etag and get_tasks_of_user).
+
+        parameters:
+            id -- the unique identifier of a user object
 
-            for task in tasks:
-                self.populate_task(task)
+        returns:
+            etag -- the entity tag
 
-            return tasks
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            user = self.users_dao.findOne(id)
+            return self.get_etag([taskid['$oid'] for taskid in user.get('tasks', [])])
         except Exception as e:
             raise
 
@@ -109,6 +469,33 @@ class TaskController(Controller):
 
         return task
 
+    def delete(self, id: str):
+        """Delete a task including its video and all todo items associated to it, and remove the reference to the task from its user.
+
+        parameters:
+            id -- the unique identifier of a task object
+
+        returns:
+            counts -- dict containing the number of deleted tasks, videos, and todos (see delete_tasks)
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        def delete(session):
+            counts = self.delete_tasks([id], session=session)
+            self.users_dao.update_many({'tasks': ObjectId(id)}, {'$pull': {'tasks': ObjectId(id)}}, session=session)
+            return counts
+
+        try:
+            # the users of the task are determined before the references to it are removed
+            owners = self.get_owners(id) if self.events.active else []
+            counts = runInTransaction(self.dao.collection.database.client, delete)
+            if counts['tasks'] > 0 and len(owners) > 0:
+                self.events.publish('task.deleted', owners, id)
+            return counts
+        except Exception as e:
+            raise
+
     def delete_of_user(self, id: str):
         """Delete all tasks that are associated to a user with the given ID. This includes each video and all todo items associated to each of the tasks.
         
@@ -116,24 +503,49 @@ class TaskController(Controller):
             id -- the unique identifier of a user object
             
         returns:
-            n -- number of deleted tasks
+            counts -- dict containing the number of deleted tasks, videos, and todos (see delete_tasks)
         
         raises:
             Exception -- in case any database operation fails
         """
         try:
             user = self.users_dao.findOne(id)
-            if 'tasks' in user:
-                tasks = self.dao.find(filter={'_id': user['tasks']}, toid=['_id'])
-
-                for task in tasks:
-                    self.videos_dao.delete(id=task['video']['$oid'])
-                    for todo in task['todos']:
-                        self.todos_dao.delete(id=todo['$oid'])
-                    self.dao.delete(id=task['_id']['$oid'])
-
-                return len(tasks)
-            else:
-                return 0
+            taskids = [taskid['$oid'] for taskid in user.get('tasks', [])]
+            counts = runInTransaction(self.dao.collection.database.client, lambda session: self.delete_tasks(taskids, session=session))
+            if self.events.active:
+                for taskid in taskids:
+                    self.events.publish('task.deleted', [id], taskid)
+            return counts
+        except Exception as e:
+            raise
+
+    def delete_tasks(self, ids: list, session=None):
+        """Delete multiple tasks including their videos and todo items with one query per collection, regardless of the number of tasks and todos.
+
+        parameters:
+            ids -- list of unique identifiers of task objects
+            session -- optional pymongo session in which the operations are executed
+
+        returns:
+            counts -- dict containing the number of deleted objects under the keys tasks, videos, and todos
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        counts = {'tasks': 0, 'videos': 0, 'todos': 0}
+        if len(ids) == 0:
+            return counts
+
+        try:
+            # collect the references of all tasks
+            tasks = self.dao.find(filter={'_id': {'$in': [ObjectId(id) for id in ids]}}, projection={'video': 1, 'todos': 1}, session=session)
+            # embedded videos and todos are deleted along with their tasks
+            videoids = [task['video']['$oid'] for task in tasks if isReference(task.get('video'))]
+            todoids = [todo['$oid'] for task in tasks for todo in task.get('todos', []) if isReference(todo)]
+
+            counts['videos'] = self.videos_dao.delete_many(videoids, session=session)
+            counts['todos'] = self.todos_dao.delete_many(todoids, session=session)
+            counts['tasks'] = self.dao.delete_many([task['_id']['$oid'] for task in tasks], session=session)
+            return counts
         except Exception as e:
-            raise
\ No newline at end of file
+            raise
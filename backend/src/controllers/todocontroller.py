@@ -1,27 +1,74 @@
 from src.controllers.controller import Controller
-from  src.util.dao import DAO
+from  src.util.dao import DAO, VERSION
+from src.util.embedding import isEmbedded
+from src.util.events import EventBus, getEventBus
 
 from bson.objectid import ObjectId
+from pymongo.errors import WriteError
+
+def getPositionalUpdate(data: dict):
+    """Convert an update operation of a todo item into the update operation of the task containing the embedded todo item, which also increments the version of the todo item (see https://www.mongodb.com/docs/manual/reference/operator/update/positional/).
+
+    parameters:
+        data -- dict containing the update operation of the todo item (e.g., {'$set': {'done': True}})
+
+    returns:
+        update -- dict containing the update operation of the task (e.g., {'$set': {'todos.$.done': True}, '$inc': {'todos.$._version': 1}})
+    """
+    update = {operator: {f'todos.$.{field}': value for field, value in fields.items()} for operator, fields in data.items()}
+    update['$inc'] = {**update.get('$inc', {}), f'todos.$.{VERSION}': 1}
+    return update
+
+def applyProjection(obj: dict, projection: dict = None):
+    """Apply a projection of top-level properties to an object, where a projection either includes (e.g., {'done': 1}) or excludes (e.g., {'description': 0}) properties, and the _id is included unless it is excluded explicitly."""
+    if projection is None:
+        return obj
+    if any(value for field, value in projection.items() if field != '_id'):
+        return {field: value for field, value in obj.items() if projection.get(field, field == '_id')}
+    return {field: value for field, value in obj.items() if projection.get(field, True)}
 
 class TodoController(Controller):
-    def __init__(self, todo_dao: DAO, tasks_dao: DAO):
+    def __init__(self, todo_dao: DAO, tasks_dao: DAO, embedded: bool = None, users_dao: DAO = None, events: EventBus = None):
+        """Instantiate the controller of the todo items, which are either stored in the todo collection or embedded in their tasks (see src.util.embedding). While the migration tool converts the tasks, a todo may still be stored in the other way, hence every operation falls back to the other storage mode if the todo was not found.
+
+        parameters:
+            todo_dao -- data access object of the todo collection
+            tasks_dao -- data access object of the task collection
+            embedded -- whether the todos are embedded in their tasks (defaults to the TODO_STORAGE setting)
+            users_dao -- data access object of the user collection, which is required to publish the changes of todos to their users
+            events -- the bus to which the changes of todos are published (defaults to the bus of the process, see src.util.events)
+        """
         super().__init__(dao=todo_dao)
         self.tasks_dao = tasks_dao
+        self.users_dao = users_dao
+        self.embedded = isEmbedded() if embedded is None else embedded
+        self.events = getEventBus() if events is None else events
 
     def create(self, data: dict):
-        """Given a valid dict containing the data of the new todo item create a new todo item and return the newly created item. If in addition a taskid attribute is given, then the new todo object will be automatically associated to the task object.
+        """Given a valid dict containing the data of the new todo item create a new todo item and return the newly created item. If in addition a taskid attribute is given, then the new todo object will be automatically associated to the task object. In the embedded mode, the taskid is required and the todo is appended to the todos of the task.
 
-        parameters: 
+        parameters:
             data -- dict containing a description under the key description
 
         returns:
             todo -- created todo object upon success
-        
+
         raises:
+            KeyError -- in case the taskid is missing in the embedded mode
+            ValueError -- in case no task is associated to the taskid in the embedded mode
+            WriteError -- in case the description is missing in the embedded mode
             Exception -- in case any database operation fails
         """
 
         try:
+            if self.embedded:
+                if 'taskid' not in data:
+                    raise KeyError('When creating an embedded todo object, the taskid of the associated task must be given')
+                taskid = data['taskid']
+                todo = self.create_embedded(data)
+                self.publish('todo.created', taskid, todo)
+                return todo
+
             if 'taskid' in data:
                 task = self.tasks_dao.findOne(id=data['taskid'])
                 del data['taskid']
@@ -32,9 +79,162 @@ class TodoController(Controller):
 
                 todo = self.dao.create(data)
                 self.tasks_dao.update(id=task['_id']['$oid'], update_data={'$push' : {'todos': ObjectId(todo['_id']['$oid'])}})
+                self.publish('todo.created', task['_id']['$oid'], todo)
 
                 return todo
             else:
                 return self.dao.create(data)
         except Exception as e:
-            raise
\ No newline at end of file
+            raise
+
+    def create_embedded(self, data: dict):
+        """Append a new todo item to the todos of the task with the id contained in the taskid attribute."""
+        taskid = data.pop('taskid')
+        if not isinstance(data.get('description'), str):
+            # the todo validator does not apply to embedded todos (see src/static/validators/todo.json)
+            raise WriteError('Document failed validation: the description of a todo must be determined', code=121)
+        if isinstance(data.get('done'), str):
+            data['done'] = (data['done'].lower() == 'true')
+
+        todo = {'_id': ObjectId(), **data, VERSION: 1}
+        if self.tasks_dao.update_many({'_id': ObjectId(taskid)}, {'$push': {'todos': todo}}) == 0:
+            raise ValueError(f'There is no task with the id {taskid}')
+        return self.dao.to_json(todo)
+
+    def get(self, id: str):
+        """Search for a todo item by id, either in the todo collection or in the todos of its task.
+
+        parameters:
+            id -- the unique identifier of the todo item
+
+        returns:
+            todo -- if a todo item associated to the given id can be found
+            None -- if no todo item associated to the given id can be found
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            if self.embedded:
+                return self.get_embedded(id) or self.dao.findOne(id)
+            return self.dao.findOne(id) or self.get_embedded(id)
+        except Exception as e:
+            raise
+
+    def get_embedded(self, id: str):
+        """Find the todo item with the given id among the todos of its task, where only the todo itself is projected."""
+        tasks = self.tasks_dao.find(filter={'todos._id': ObjectId(id)}, projection={'_id': 0, 'todos': {'$elemMatch': {'_id': ObjectId(id)}}})
+        return tasks[0]['todos'][0] if len(tasks) > 0 and len(tasks[0].get('todos', [])) > 0 else None
+
+    def update(self, id: str, data: dict):
+        """Locate a todo item and update it with the given data values. An embedded todo is updated by a positional update of its task (see https://www.mongodb.com/docs/manual/reference/operator/update/positional/), which also increments the versions of the todo and of the task.
+
+        parameters:
+            id -- the unique identifier of the todo item
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set), and the values of those keys again dicts where the keys are fieldnames of the todo and the values the new values.
+
+        returns:
+            True -- if the update was successful
+            False -- if no todo item is associated to the given id
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            if self.embedded:
+                updated = self.update_embedded(id, data) or self.dao.update_many({'_id': ObjectId(id)}, data) > 0
+            else:
+                updated = self.dao.update_many({'_id': ObjectId(id)}, data) > 0 or self.update_embedded(id, data)
+            if updated and self.events.active:
+                self.publish('todo.updated', self.get_taskid(id), self.get(id))
+            return updated
+        except Exception as e:
+            raise
+
+    def update_embedded(self, id: str, data: dict):
+        """Apply an update operation to the embedded todo item with the given id by prefixing every field with the positional operator."""
+        return self.tasks_dao.update_many({'todos._id': ObjectId(id)}, getPositionalUpdate(data)) > 0
+
+    def update_and_return(self, id: str, data: dict, projection: dict = None):
+        """Locate a todo item, update it with the given data values, and return the updated todo item within the same round trip (see update). An embedded todo item is returned by projecting the updated task onto it.
+
+        parameters:
+            id -- the unique identifier of the todo item
+            data -- a dict where the top level keys are valid MongoDB update operators (e.g., $set)
+            projection -- optional dict of the properties to include in (or exclude from) the returned todo item
+
+        returns:
+            todo -- the updated todo item
+            None -- if no todo item is associated to the given id
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            if self.embedded:
+                todo = self.update_and_return_embedded(id, data, projection)
+                todo = todo if todo is not None else self.dao.update_and_return(id, data, projection=projection)
+            else:
+                todo = self.dao.update_and_return(id, data, projection=projection)
+                todo = todo if todo is not None else self.update_and_return_embedded(id, data, projection)
+            if todo is not None and self.events.active:
+                self.publish('todo.updated', self.get_taskid(id), todo)
+            return todo
+        except Exception as e:
+            raise
+
+    def update_and_return_embedded(self, id: str, data: dict, projection: dict = None):
+        """Apply an update operation to the embedded todo item with the given id and return the updated todo item."""
+        task = self.tasks_dao.find_one_and_update({'todos._id': ObjectId(id)}, getPositionalUpdate(data), projection={'_id': 0, 'todos': {'$elemMatch': {'_id': ObjectId(id)}}})
+        if task is None or len(task.get('todos', [])) == 0:
+            return None
+        return applyProjection(task['todos'][0], projection)
+
+    def delete(self, id: str):
+        """Delete a todo item, either from the todo collection or from the todos of its task.
+
+        parameters:
+            id -- the unique identifier of the todo item
+
+        returns:
+            True -- if the todo item was deleted
+            False -- if no todo item is associated to the given id
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            # the task of the todo is determined before the todo is removed from it
+            taskid = self.get_taskid(id) if self.events.active else None
+            if self.embedded:
+                deleted = self.delete_embedded(id) or self.dao.delete_many([id]) > 0
+            else:
+                deleted = self.dao.delete_many([id]) > 0 or self.delete_embedded(id)
+            if deleted:
+                self.publish('todo.deleted', taskid, {'_id': {'$oid': id}}, data=False)
+            return deleted
+        except Exception as e:
+            raise
+
+    def delete_embedded(self, id: str):
+        """Remove the embedded todo item with the given id from the todos of its task."""
+        return self.tasks_dao.update_many({'todos._id': ObjectId(id)}, {'$pull': {'todos': {'_id': ObjectId(id)}}}) > 0
+
+    def get_taskid(self, id: str):
+        """Return the id of the task which contains the todo item with the given id (as a reference or embedded), or None if no task contains it."""
+        tasks = self.tasks_dao.find(filter={'$or': [{'todos': ObjectId(id)}, {'todos._id': ObjectId(id)}]}, projection={'_id': 1})
+        return tasks[0]['_id']['$oid'] if len(tasks) > 0 else None
+
+    def publish(self, type: str, taskid: str, todo: dict, data: bool = True):
+        """Publish a change of a todo item to the users of its task (see src.util.events), unless no stream is open or the users cannot be determined.
+
+        parameters:
+            type -- the type of the change (todo.created, todo.updated, or todo.deleted)
+            taskid -- the id of the task containing the todo item
+            todo -- the todo item (parsed to JSON)
+            data -- whether the todo item is contained in the event
+        """
+        if not self.events.active or self.users_dao is None or taskid is None or todo is None:
+            return
+        users = self.users_dao.find(filter={'tasks': ObjectId(taskid)}, projection={'_id': 1})
+        self.events.publish(type, [user['_id']['$oid'] for user in users], taskid, id=todo['_id']['$oid'], data=todo if data else None)
@@ -42,5 +42,26 @@ class UserController(Controller):
         try:
             update_result = super().update(id=id, data={'$set': data})
             return update_result
+        except Exception as e:
+            raise
+
+    def update_and_return(self, id, data, projection: dict = None):
+        """Locates a user in the database, sets the given data values, and returns the updated user within the same
+        round trip (see Controller.update_and_return).
+
+        parameters:
+            id -- the unique identifier of the user
+            data -- a dict where the keys are fieldnames and the values the new values (they are wrapped in a $set operator)
+            projection -- optional dict of the properties to include in (or exclude from) the returned user
+
+        returns:
+            user -- the updated user object
+            None -- if no user associated to the given id can be found
+
+        raises:
+            Exception -- in case the database operation fails, raise an exception
+        """
+        try:
+            return super().update_and_return(id=id, data={'$set': data}, projection=projection)
         except Exception as e:
             raise
\ No newline at end of file
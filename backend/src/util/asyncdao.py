@@ -0,0 +1,535 @@
+# coding=utf-8
+from src.util.dao import DAO, VERSION
+from src.util.validators import getValidator, getValidatorUpdate
+from src.util.indexes import getIndexes, getCollation, toIndexModel
+from src.util.asyncmongo import getAsyncDatabase, onDatabaseLoop, runOnDatabaseLoop
+from src.util.config import getSetting
+from src.util.metrics import timed
+from src.util.pagination import parseSort, getSortStages, getKeysetFilter, encodeCursor
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, CollectionInvalid, OperationFailure
+
+# collections which have already been created (or confirmed to exist) by the database loop of this process
+bootstrapped = set()
+
+class AsyncDAO(DAO):
+
+    def __init__(self, collection_name: str, database=None, cache=None):
+        """Establish an asynchronous data access object to a collection, which offers the same methods as the synchronous DAO (see src.util.dao) as coroutines. The documents are validated by the same collection validators and converted to JSON by the same converter.
+
+        All database operations are executed on the database loop of the process (see src.util.asyncmongo), hence they can be awaited from any event loop, e.g., from the asynchronous views of flask.
+
+        parameters:
+            collection_name -- the name of the collection (a collection validator of the same name must be available)
+            database -- optional motor database object (defaults to the database of the shared motor client)
+            cache -- optional read-through cache of the objects by id (see DAO.findOne)
+        """
+        super().__init__(collection_name, database=database, cache=cache)
+
+    @property
+    def collection(self):
+        """The motor collection associated to this data access object. Resolving it does not perform any I/O: the collection is created upon the first awaited operation (see ready)."""
+        if self._collection is None:
+            database = self.database if self.database is not None else getAsyncDatabase()
+            self._collection = database[self.collection_name]
+        return self._collection
+
+    async def ready(self):
+        """Create the collection including its validator and indexes if it does not yet exist, or replace the validator of an existing collection if it changed (see DAO.bootstrap). The check is only performed once per collection and process.
+
+        returns:
+            collection -- the motor collection
+        """
+        collection = self.collection
+        database = collection.database
+        key = (id(database.client), database.name, self.collection_name)
+        if key in bootstrapped:
+            return collection
+
+        if self.collection_name not in await database.list_collection_names(filter={'name': self.collection_name}):
+            try:
+                await database.create_collection(self.collection_name, validator=getValidator(self.collection_name))
+            except CollectionInvalid:
+                # the collection was created by a concurrent operation in the meantime
+                pass
+        else:
+            try:
+                collections = await (await database.list_collections(filter={'name': self.collection_name})).to_list(length=None)
+                command = getValidatorUpdate(self.collection_name, collections)
+                if command is not None:
+                    await database.command(command)
+            except OperationFailure as e:
+                print(f'Warning: the validator of collection {self.collection_name} could not be updated ({e})')
+            except NotImplementedError as e:
+                pass
+
+        if getSetting('MONGO_CREATE_INDEXES', True, bool):
+            declarations = getIndexes(self.collection_name)
+            try:
+                if len(declarations) > 0:
+                    await collection.create_indexes([toIndexModel(declaration) for declaration in declarations])
+            except OperationFailure as e:
+                print(f'Warning: the indexes of collection {self.collection_name} could not be created ({e}), run python -m src.util.indexes to inspect the drift')
+        bootstrapped.add(key)
+        return collection
+
+    @onDatabaseLoop
+    @timed
+    async def create(self, data: dict, session=None):
+        """Create a new document in the collection (see DAO.create).
+
+        parameters:
+            data -- a dict containing key-value pairs compliant to the validator
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            object -- the newly created MongoDB document (parsed to a JSON object)
+
+        raises:
+            WriteError - in case at least one of the validator criteria is violated
+        """
+        localdata = dict(data)
+        localdata.setdefault(VERSION, 1)
+
+        try:
+            collection = await self.ready()
+            result = await collection.insert_one(localdata, session=session)
+            localdata['_id'] = result.inserted_id
+            return self.to_json(localdata)
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def create_many(self, data: list, ordered: bool = True, session=None):
+        """Create multiple new documents within a single round trip (see DAO.create_many).
+
+        parameters:
+            data -- a list of dicts containing key-value pairs compliant to the validator
+            ordered -- if True, the insertion stops at the first document violating the validator
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            result -- dict containing the newly created documents under the key 'created' and the per-document errors under the key 'errors'
+
+        raises:
+            Exception -- in case any database operation fails for reasons other than a violated validator
+        """
+        localdata = [dict(obj) for obj in data]
+        for obj in localdata:
+            obj.setdefault(VERSION, 1)
+        if len(localdata) == 0:
+            return {'created': [], 'errors': []}
+
+        errors = []
+        try:
+            collection = await self.ready()
+            await collection.insert_many(localdata, ordered=ordered, session=session)
+        except BulkWriteError as e:
+            errors = [{'index': error['index'], 'code': error.get('code'), 'message': error.get('errmsg')} for error in e.details.get('writeErrors', [])]
+        except Exception as e:
+            raise
+
+        failed = set(error['index'] for error in errors)
+        if ordered and len(errors) > 0:
+            failed.update(range(min(failed), len(localdata)))
+
+        created = [self.to_json(obj) for index, obj in enumerate(localdata) if index not in failed]
+        return {'created': created, 'errors': errors}
+
+    @onDatabaseLoop
+    @timed
+    async def findOne(self, id: str):
+        """Find one specific object in the collection with the _id property equal to the given id (see DAO.findOne).
+
+        parameters:
+            id -- id value of the requested object
+
+        returns:
+            object -- MongoDB document (parsed to json object)
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        token = None
+        if self.cache is not None:
+            obj = self.cache.get(str(id))
+            if obj is not None:
+                return obj
+            token = self.cache.token()
+
+        try:
+            collection = await self.ready()
+            obj = self.to_json(await collection.find_one({'_id': ObjectId(id)}))
+            if self.cache is not None:
+                self.cache.set(str(id), obj, token=token)
+            return obj
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def find(self, filter=None, toid: list = None, projection: dict = None, limit: int = None, after: str = None, sort: str = None, session=None):
+        """Find all objects contained in the collection which comply to the given filter (see DAO.find).
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional dict of the properties to include in (or exclude from) the returned objects
+            limit -- optional maximum number of returned objects (see find_page)
+            after -- optional continuation token of the previous page (see find_page)
+            sort -- optional sort specification (see find_page)
+            session -- optional motor session in which the query is executed, such that it reads the snapshot of a transaction
+
+        returns:
+            [object] -- list of objects compliant to the given filter
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if limit is not None or after is not None or sort is not None:
+            return (await self.find_page(filter=filter, toid=toid, projection=projection, limit=limit, after=after, sort=sort, session=session))['items']
+        if self.cache is not None and session is None and projection is None and toid == ['_id'] and list(filter.keys()) == ['_id']:
+            return await self.find_by_ids([element['$oid'] for element in filter['_id']])
+
+        filter = self.convert_ids(filter, toid)
+
+        try:
+            collection = await self.ready()
+            dbobjs = await collection.find(filter, projection, collation=getCollation(self.collection_name, filter), session=session).to_list(length=None)
+            return [self.to_json(obj) for obj in dbobjs]
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def find_by_ids(self, ids: list):
+        """Find all objects with an _id property contained in the given list, taking cached objects from the cache (see DAO.find_by_ids).
+
+        parameters:
+            ids -- list of id values of the requested objects
+
+        returns:
+            [object] -- list of the existing objects in the order of the given ids, where each object is contained once even if its id is repeated
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        ids = list(dict.fromkeys(str(id) for id in ids))
+        objs = {}
+        token = None
+        if self.cache is not None:
+            for id in ids:
+                obj = self.cache.get(id)
+                if obj is not None:
+                    objs[id] = obj
+            token = self.cache.token()
+
+        missing = [ObjectId(id) for id in ids if id not in objs]
+        if len(missing) > 0:
+            try:
+                collection = await self.ready()
+                for dbobj in await collection.find({'_id': {'$in': missing}}).to_list(length=None):
+                    obj = self.to_json(dbobj)
+                    objs[obj['_id']['$oid']] = obj
+                    if self.cache is not None:
+                        self.cache.set(obj['_id']['$oid'], obj, token=token)
+            except Exception as e:
+                raise
+        return [objs[id] for id in ids if id in objs]
+
+    @onDatabaseLoop
+    @timed
+    async def find_page(self, filter=None, toid: list = None, projection: dict = None, limit: int = None, after: str = None, sort: str = None, session=None):
+        """Find one page of the objects contained in the collection which comply to the given filter (see DAO.find_page).
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional dict of the properties to include in (or exclude from) the returned objects
+            limit -- maximum number of objects of the page (None for all remaining objects)
+            after -- continuation token of the previous page (None for the first page)
+            sort -- the name of the field to sort by, prefixed by a '-' for a descending order (defaults to the _id)
+            session -- optional motor session in which the query is executed
+
+        returns:
+            page -- dict containing the list of objects under the key 'items' and the continuation token of the next page under the key 'next'
+
+        raises:
+            ValueError -- in case the continuation token is invalid
+            Exception -- in case any database operation fails
+        """
+        filter = self.convert_ids(filter, toid)
+        collation = getCollation(self.collection_name, filter)
+        sort = parseSort(sort)
+        if after is not None:
+            keyset = getKeysetFilter(after, sort)
+            filter = {'$and': [filter, keyset]} if filter else keyset
+
+        try:
+            collection = await self.ready()
+            dbobjs = collection.find(filter, projection, sort=getSortStages(sort), collation=collation, session=session)
+            if limit is not None:
+                dbobjs = dbobjs.limit(limit + 1)
+            dbobjs = await dbobjs.to_list(length=None)
+
+            cursor = None
+            if limit is not None and len(dbobjs) > limit:
+                dbobjs = dbobjs[:limit]
+                cursor = encodeCursor(dbobjs[-1], sort)
+            return {'items': [self.to_json(obj) for obj in dbobjs], 'next': cursor}
+        except Exception as e:
+            raise
+
+    async def iterate(self, filter=None, toid: list = None, projection: dict = None, sort: str = None, batch_size: int = None):
+        """Iterate over all objects contained in the collection which comply to the given filter, fetching one batch per round trip (see DAO.iterate).
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional dict of the properties to include in (or exclude from) the returned objects
+            sort -- optional name of the field to sort by, prefixed by a '-' for a descending order
+            batch_size -- number of objects fetched per round trip (defaults to the STREAM_BATCH_SIZE setting)
+
+        yields:
+            object -- one object (parsed to json object) after the other
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        filter = self.convert_ids(filter, toid)
+        if batch_size is None:
+            batch_size = getSetting('STREAM_BATCH_SIZE', 500, int)
+
+        collection = await runOnDatabaseLoop(self.ready())
+        dbobjs = collection.find(filter, projection, batch_size=batch_size, collation=getCollation(self.collection_name, filter))
+        if sort is not None:
+            dbobjs = dbobjs.sort(getSortStages(parseSort(sort)))
+        try:
+            while True:
+                # every batch is fetched on the database loop, whereas the objects are yielded on the loop of the caller
+                batch = await runOnDatabaseLoop(dbobjs.to_list(length=batch_size))
+                if len(batch) == 0:
+                    break
+                for obj in batch:
+                    yield self.to_json(obj)
+        finally:
+            await runOnDatabaseLoop(dbobjs.close())
+
+    @onDatabaseLoop
+    @timed
+    async def aggregate(self, pipeline: list):
+        """Run an aggregation pipeline on the collection (see DAO.aggregate).
+
+        parameters:
+            pipeline -- list of aggregation stages
+
+        returns:
+            [object] -- list of resulting objects
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            collection = await self.ready()
+            return [self.to_json(obj) for obj in await collection.aggregate(pipeline).to_list(length=None)]
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def update(self, id: str, update_data: dict, session=None):
+        """Update one specific object in the collection with the _id property equal to the given id (see DAO.update).
+
+        parameters:
+            id -- id value of the requested object
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            True -- if the update was successful
+            False -- otherwise
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            collection = await self.ready()
+            update_result = await collection.update_one({'_id': ObjectId(id)}, self.versioned(update_data), session=session)
+            self.invalidate([id], session=session)
+            return update_result.acknowledged
+        except Exception as e:
+            raise
+
+    async def update_and_return(self, id: str, update_data: dict, projection: dict = None, session=None):
+        """Update one specific object in the collection and return the updated object within the same round trip (see DAO.update_and_return).
+
+        parameters:
+            id -- id value of the requested object
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            projection -- optional dict of the properties to include in (or exclude from) the returned object
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            object -- the updated MongoDB document (parsed to a JSON object)
+            None -- if no object is associated to the given id
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        return await self.find_one_and_update({'_id': ObjectId(id)}, update_data, projection=projection, session=session)
+
+    @onDatabaseLoop
+    @timed
+    async def find_one_and_update(self, filter: dict, update_data: dict, projection: dict = None, session=None):
+        """Atomically update the first object in the collection which complies to the given filter and return it as it is after the update (see DAO.find_one_and_update).
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            projection -- optional dict of the properties to include in (or exclude from) the returned object
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            object -- the updated MongoDB document (parsed to a JSON object)
+            None -- if no object complies to the filter
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            collection = await self.ready()
+            obj = await collection.find_one_and_update(filter, self.versioned(update_data), projection=projection, return_document=ReturnDocument.AFTER, session=session)
+            if obj is None:
+                return None
+            self.invalidate([obj['_id']] if '_id' in obj else None, session=session)
+            return self.to_json(obj)
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def update_many(self, filter: dict, update_data: dict, session=None):
+        """Update all objects in the collection which comply to the given filter within a single round trip (see DAO.update_many).
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            n -- the number of modified objects
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            collection = await self.ready()
+            update_result = await collection.update_many(filter, self.versioned(update_data), session=session)
+            self.invalidate(session=session)
+            return update_result.modified_count
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def bulk_write(self, requests: list, ordered: bool = True, session=None):
+        """Execute multiple write operations on the collection within a single round trip (see DAO.bulk_write).
+
+        parameters:
+            requests -- list of pymongo write operations
+            ordered -- if True, the execution stops at the first failing operation; if False, all remaining operations are executed nevertheless
+            session -- optional motor session in which the operations are executed
+
+        returns:
+            result -- dict containing the numbers of inserted, matched, modified, and deleted documents and the list of errors (see DAO.bulk_write)
+
+        raises:
+            Exception -- in case any database operation fails for reasons other than a failing write operation
+        """
+        result = {'inserted': 0, 'matched': 0, 'modified': 0, 'deleted': 0, 'errors': []}
+        if len(requests) == 0:
+            return result
+
+        try:
+            collection = await self.ready()
+            details = (await collection.bulk_write(requests, ordered=ordered, session=session)).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            result['errors'] = [{'index': error['index'], 'code': error.get('code'), 'message': error.get('errmsg')} for error in details.get('writeErrors', [])]
+        except Exception as e:
+            raise
+        finally:
+            self.invalidate(session=session)
+
+        result.update({'inserted': details.get('nInserted', 0), 'matched': details.get('nMatched', 0), 'modified': details.get('nModified', 0), 'deleted': details.get('nRemoved', 0)})
+        return result
+
+    @onDatabaseLoop
+    @timed
+    async def delete(self, id: str):
+        """Remove one specific object with the _id property equal to the given id from the collection (see DAO.delete).
+
+        parameters:
+            id -- id value of the requested object
+
+        returns:
+            True -- if the deletion was successful
+            False -- otherwise
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            collection = await self.ready()
+            result = await collection.delete_one({'_id': ObjectId(id)})
+            self.invalidate([id])
+            return result.acknowledged
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    @timed
+    async def delete_many(self, ids: list, session=None):
+        """Remove all objects with an _id property contained in the given list within a single round trip (see DAO.delete_many).
+
+        parameters:
+            ids -- list of id values (strings or ObjectIds) of the objects to remove
+            session -- optional motor session in which the operation is executed
+
+        returns:
+            n -- the number of removed objects
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if len(ids) == 0:
+            return 0
+
+        try:
+            collection = await self.ready()
+            result = await collection.delete_many({'_id': {'$in': [ObjectId(id) for id in ids]}}, session=session)
+            self.invalidate(ids, session=session)
+            return result.deleted_count
+        except Exception as e:
+            raise
+
+    @onDatabaseLoop
+    async def drop(self):
+        """Remove the entire collection
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            collection = self.collection
+            database = collection.database
+            await collection.drop()
+
+            bootstrapped.discard((id(database.client), database.name, self.collection_name))
+            self._collection = None
+            self.invalidate()
+        except Exception as e:
+            raise
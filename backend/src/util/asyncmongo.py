@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    # motor is optional: it is only required by the asynchronous data access objects (see src.util.asyncdao)
+    AsyncIOMotorClient = None
+
+from pymongo.errors import OperationFailure
+
+from src.util.config import getSetting
+from src.util.mongo import getClientOptions, deferred
+
+# the event loop of the process on which all asynchronous database operations are executed, and its clients
+loop = None
+clients = {}
+standalone = set()
+lock = threading.Lock()
+pid = os.getpid()
+
+def getDatabaseLoop():
+    """Obtain the event loop which executes all asynchronous database operations of this process. A motor client is
+    bound to the event loop it is used on, whereas flask runs each asynchronous view in an event loop of its own. The
+    database operations are therefore executed on one long-lived event loop running in a background thread, such that
+    all requests share one connection pool.
+
+    returns:
+        loop -- the asyncio event loop
+    """
+    global loop, pid
+    with lock:
+        if pid != os.getpid():
+            # the thread of the event loop does not survive a fork
+            loop = None
+            clients.clear()
+            standalone.clear()
+            pid = os.getpid()
+
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='database-loop', daemon=True).start()
+        return loop
+
+async def runInContext(coroutine, context: contextvars.Context):
+    """Await a coroutine with the values of the context variables of another context, e.g., of the caller on another event loop."""
+    for variable, value in context.items():
+        variable.set(value)
+    return await coroutine
+
+async def runOnDatabaseLoop(coroutine):
+    """Execute a coroutine on the database loop (see getDatabaseLoop) and await its result from the current event loop.
+    The coroutine sees the context variables of the caller (e.g., the profile of the current request, see
+    src.util.profiler), which motor passes on to the threads executing the commands.
+
+    parameters:
+        coroutine -- the coroutine performing database operations
+
+    returns:
+        result -- the result of the coroutine
+    """
+    databaseloop = getDatabaseLoop()
+    if asyncio.get_running_loop() is databaseloop:
+        return await coroutine
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(runInContext(coroutine, contextvars.copy_context()), databaseloop))
+
+def onDatabaseLoop(method):
+    """Decorator of coroutine functions which perform database operations, such that they are executed on the database loop regardless of the event loop of the caller."""
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        return await runOnDatabaseLoop(method(*args, **kwargs))
+    return wrapper
+
+def getAsyncClient(url: str = None):
+    """Obtain the process-wide motor client for the given url, which is configured like the synchronous client (see
+    src.util.mongo.getClient). It must only be used on the database loop.
+
+    parameters:
+        url -- the MongoDB url (defaults to the MONGO_URL setting)
+
+    returns:
+        client -- the shared motor.motor_asyncio.AsyncIOMotorClient
+
+    raises:
+        RuntimeError -- in case motor is not installed
+    """
+    if AsyncIOMotorClient is None:
+        raise RuntimeError('Error: the asynchronous data access requires the motor package')
+    if url is None:
+        url = getSetting('MONGO_URL')
+
+    databaseloop = getDatabaseLoop()
+    with lock:
+        if url not in clients:
+            clients[url] = AsyncIOMotorClient(url, io_loop=databaseloop, **getClientOptions())
+        return clients[url]
+
+def getAsyncDatabase(name: str = None):
+    """Obtain the database of the shared motor client.
+
+    parameters:
+        name -- the name of the database (defaults to the MONGO_DATABASE setting or edutask)
+
+    returns:
+        database -- motor database object
+    """
+    if name is None:
+        name = getSetting('MONGO_DATABASE', 'edutask')
+    return getAsyncClient()[name]
+
+def closeAsyncClients():
+    """Close all connection pools of the motor clients and stop the database loop."""
+    global loop
+    with lock:
+        for client in clients.values():
+            client.close()
+        clients.clear()
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            loop = None
+
+async def runInTransactionAsync(client, callback, rollback=None):
+    """Execute an asynchronous unit of work as one multi-document transaction (see src.util.mongo.runInTransaction). On a standalone mongod, the unit of work is executed without a session, and the rollback is awaited if it fails halfway.
+
+    parameters:
+        client -- the motor client executing the unit of work
+        callback -- coroutine function receiving the session (or None)
+        rollback -- optional coroutine function undoing the partial effects of the callback if no transaction is available
+
+    returns:
+        result -- the return value of the callback
+    """
+    if id(client) not in standalone:
+        try:
+            async with await client.start_session() as session:
+                # cached objects are invalidated once the transaction ended (see src.util.mongo.afterCommit)
+                deferred[id(session)] = []
+                try:
+                    return await session.with_transaction(callback)
+                finally:
+                    for deferredcallback in deferred.pop(id(session)):
+                        deferredcallback()
+        except OperationFailure as e:
+            # error code 20 (IllegalOperation): transaction numbers are only allowed on a replica set member or mongos
+            if e.code != 20:
+                raise
+        standalone.add(id(client))
+
+    try:
+        return await callback(None)
+    except Exception as e:
+        if rollback is not None:
+            await rollback()
+        raise
+
+async def runOperations(operations: list, session=None):
+    """Execute independent database operations, i.e., operations of which none depends on the result of another one.
+    Without a session, all operations are awaited concurrently, such that they take one round trip instead of one per
+    operation. The operations of a session must not overlap, hence they are awaited one after the other otherwise.
+
+    parameters:
+        operations -- list of callables, each receiving the session (or None) and returning an awaitable
+        session -- optional motor session (e.g., of a transaction) in which the operations are executed
+
+    returns:
+        [result] -- the results of the operations in the given order
+
+    raises:
+        Exception -- the first exception raised by any operation, after all operations completed
+    """
+    if session is not None:
+        return [await operation(session) for operation in operations]
+
+    # await all operations even if one of them fails, such that a subsequent rollback does not race with them
+    results = await asyncio.gather(*[operation(None) for operation in operations], return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
@@ -0,0 +1,109 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, clock=time.monotonic):
+        """Instantiate a thread-safe cache which holds at most maxsize entries, evicts the least recently used entry
+        when it is full, and expires entries after ttl seconds. The cached values are copied when they are stored and
+        when they are returned, such that callers may modify them.
+
+        parameters:
+            maxsize -- maximum number of entries
+            ttl -- number of seconds after which an entry expires (None for entries that never expire)
+            clock -- callable returning the current time in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # the generation is incremented by every invalidation, such that values read before an invalidation are not stored afterwards (see token)
+        self.generation = 0
+        self.invalidated = OrderedDict()
+        self.floor = 0
+
+    def get(self, key):
+        """Obtain the value of an entry.
+
+        parameters:
+            key -- the key of the entry
+
+        returns:
+            value -- a copy of the cached value
+            None -- if there is no (unexpired) entry for the key
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] <= self.clock()):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+        return copy.deepcopy(value)
+
+    def token(self):
+        """Obtain the current generation of the cache, which has to be taken before the value of an entry is read from its source and passed on to set. A concurrent writer may invalidate the entry after the value was read, in which case the stale value must not be stored.
+
+        returns:
+            token -- the current generation
+        """
+        with self.lock:
+            return self.generation
+
+    def set(self, key, value, token=None):
+        """Store a value, evicting the least recently used entry if the cache is full.
+
+        parameters:
+            key -- the key of the entry
+            value -- the value to store (None values are not cached)
+            token -- optional generation taken before the value was read (see token): the value is discarded if the key was invalidated in the meantime
+        """
+        if value is None:
+            return
+        value = copy.deepcopy(value)
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self.lock:
+            if token is not None and max(self.floor, self.invalidated.get(key, 0)) > token:
+                return
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Remove the entry of a key (if any)."""
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generation += 1
+            self.invalidated[key] = self.generation
+            self.invalidated.move_to_end(key)
+            # the generations of the least recently invalidated keys are forgotten, which discards all values read before them
+            while len(self.invalidated) > self.maxsize:
+                self.floor = max(self.floor, self.invalidated.popitem(last=False)[1])
+
+    def clear(self):
+        """Remove all entries."""
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.invalidated.clear()
+            self.floor = self.generation
+
+    def stats(self):
+        """Obtain the counters of the cache.
+
+        returns:
+            stats -- dict containing the number of hits, misses, evictions, and entries as well as the configuration
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self.entries), 'maxsize': self.maxsize, 'ttl': self.ttl}
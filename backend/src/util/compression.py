@@ -0,0 +1,126 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional: without it, responses are only compressed with gzip
+    brotli = None
+
+from src.util.config import getSetting
+
+COMPRESSIBLE = ['application/json', 'application/x-ndjson', 'text/html', 'text/plain', 'text/css', 'text/javascript']
+
+def getAlgorithms():
+    """Obtain the supported content codings in the order of preference of the server, as configured by the COMPRESSION_ALGORITHMS setting.
+
+    returns:
+        [str] -- list of content codings (e.g., ['br', 'gzip'])
+    """
+    algorithms = [algorithm.strip() for algorithm in getSetting('COMPRESSION_ALGORITHMS', 'br,gzip').split(',')]
+    return [algorithm for algorithm in algorithms if algorithm == 'gzip' or (algorithm == 'br' and brotli is not None)]
+
+def negotiate(request):
+    """Choose the content coding of a response based on the Accept-Encoding header of the request.
+
+    parameters:
+        request -- the flask request
+
+    returns:
+        algorithm -- 'br' or 'gzip'
+        None -- if the client accepts none of the supported content codings
+    """
+    for algorithm in getAlgorithms():
+        if request.accept_encodings.quality(algorithm) > 0:
+            return algorithm
+    return None
+
+def compress(data: bytes, algorithm: str):
+    """Compress an entire response body.
+
+    parameters:
+        data -- the uncompressed body
+        algorithm -- 'br' or 'gzip'
+
+    returns:
+        bytes -- the compressed body
+    """
+    if algorithm == 'br':
+        return brotli.compress(data, quality=getSetting('COMPRESSION_BROTLI_QUALITY', 4, int))
+    return gzip.compress(data, compresslevel=getSetting('COMPRESSION_LEVEL', 6, int), mtime=0)
+
+def compressStream(chunks, algorithm: str):
+    """Compress a streamed response body chunk by chunk, where each chunk is flushed such that the client can decode it right away.
+
+    parameters:
+        chunks -- iterable of the uncompressed chunks (bytes or str)
+        algorithm -- 'br' or 'gzip'
+
+    yields:
+        bytes -- the compressed chunks
+    """
+    if algorithm == 'br':
+        compressor = brotli.Compressor(quality=getSetting('COMPRESSION_BROTLI_QUALITY', 4, int))
+        compressChunk, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        # wbits of 16 + MAX_WBITS produces a gzip header and trailer
+        compressor = zlib.compressobj(getSetting('COMPRESSION_LEVEL', 6, int), zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compressChunk, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            yield compressChunk(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+def compressResponse(request, response):
+    """Compress a response if the client accepts a supported content coding, the content type is compressible, and the body is at least COMPRESSION_MIN_SIZE bytes long (streamed bodies are always compressed).
+
+    parameters:
+        request -- the flask request
+        response -- the flask response
+
+    returns:
+        response -- the (possibly compressed) flask response
+    """
+    if response.status_code < 200 or response.status_code in [204, 304] or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    algorithm = negotiate(request)
+    if algorithm is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compressStream(response.response, algorithm)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < getSetting('COMPRESSION_MIN_SIZE', 500, int):
+            return response
+        response.set_data(compress(data, algorithm))
+
+    response.headers['Content-Encoding'] = algorithm
+
+    # a strong entity tag identifies one exact byte sequence, hence it becomes weak once the body is compressed
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def initCompression(app):
+    """Register the compression of responses (see compressResponse) with a flask application, unless it is disabled by the COMPRESSION_ENABLED setting.
+
+    parameters:
+        app -- the flask application
+    """
+    if getSetting('COMPRESSION_ENABLED', True, bool):
+        app.after_request(lambda response: compressResponse(request, response))
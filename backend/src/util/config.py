@@ -0,0 +1,41 @@
+import os
+import threading
+
+from dotenv import dotenv_values
+
+settings = {}
+lock = threading.Lock()
+
+def loadSettings(path: str = '.env'):
+    """Load the configuration of the backend once per process. Values stored in the local .env file are overridden by
+    the environment variables of the same name (which can be set, e.g., by the docker-compose file).
+
+    parameters:
+        path -- the path of the local .env file
+
+    returns:
+        settings -- dict containing all configuration values
+    """
+    with lock:
+        if not settings:
+            settings.update(dotenv_values(path))
+            settings.update(os.environ)
+    return settings
+
+def getSetting(name: str, default=None, cast=str):
+    """Obtain a single configuration value. The configuration is only read once per process (see loadSettings).
+
+    parameters:
+        name -- the name of the configuration value (e.g., MONGO_URL)
+        default -- value returned in case the configuration value is not set
+        cast -- callable converting the raw string value into the expected type (e.g., int)
+
+    returns:
+        value -- the (converted) configuration value or the default
+    """
+    value = loadSettings().get(name)
+    if value is None or value == '':
+        return default
+    if cast is bool:
+        return value.lower() in ['1', 'true', 'yes', 'on']
+    return cast(value)
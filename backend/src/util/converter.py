@@ -0,0 +1,58 @@
+import json
+from datetime import datetime
+
+from bson import json_util
+from bson.objectid import ObjectId
+
+EPOCH = datetime(1970, 1, 1)
+
+def toJson(data):
+    """Transform a MongoDB document into a json object in a single pass. The result is identical to parsing the
+    (relaxed) extended JSON produced by bson.json_util.dumps, i.e., ObjectIds become {'$oid': ...} and dates become
+    {'$date': ...}, but it avoids serializing the document into an intermediate string. Values of less common bson
+    types are delegated to bson.json_util.
+
+    parameters:
+        data -- the MongoDB document (or any value contained in it)
+
+    returns:
+        object -- the value converted to JSON-compatible python objects
+    """
+    cls = data.__class__
+    if cls is str or cls is int or cls is bool or data is None:
+        return data
+    if cls is dict:
+        return {key: toJson(value) for key, value in data.items()}
+    if cls is list:
+        return [toJson(value) for value in data]
+    if cls is ObjectId:
+        return {'$oid': str(data)}
+    if cls is datetime:
+        date = dateToJson(data)
+        if date is not None:
+            return date
+    if cls is float and data - data == 0:
+        # every finite float (nan and infinity are represented as {'$numberDouble': ...})
+        return data
+    return json.loads(json_util.dumps(data))
+
+def dateToJson(date: datetime):
+    """Convert a datetime into the ISO-8601 representation of relaxed extended JSON.
+
+    parameters:
+        date -- a naive (interpreted as UTC) or UTC datetime
+
+    returns:
+        object -- dict of the form {'$date': '<ISO-8601 string>'}
+        None -- if the datetime lies before the epoch or is not in UTC, such that the generic conversion has to be used
+    """
+    if date.tzinfo is not None:
+        if date.utcoffset().total_seconds() != 0:
+            return None
+        date = date.replace(tzinfo=None)
+    if date < EPOCH:
+        return None
+
+    millis = date.microsecond // 1000
+    fracsecs = '.%03d' % millis if millis else ''
+    return {'$date': f'{date.strftime("%Y-%m-%dT%H:%M:%S")}{fracsecs}Z'}
@@ -1,69 +1,151 @@
 # coding=utf-8
-import os
-
-import pymongo
-from dotenv import dotenv_values
+import threading
 
 # create a data access object
-from src.util.validators import getValidator
-
-import json
-from bson import json_util
+from src.util.validators import getValidator, applyValidator
+from src.util.indexes import getIndexes, getCollation, reconcileIndexes
+from src.util.mongo import getDatabase, afterCommit
+from src.util.config import getSetting
+from src.util.metrics import timed
+
+from src.util.converter import toJson
+from src.util.cache import LRUCache
+from src.util.pagination import parseSort, getSortStages, getKeysetFilter, encodeCursor
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, OperationFailure
+
+# collections which have already been created (or confirmed to exist) by this process
+bootstrapped = set()
+bootstrap_lock = threading.Lock()
 
+# the property containing the version of an object, which is incremented upon every update
+VERSION = '_version'
 
 class DAO:
 
-    def __init__(self, collection_name: str):
+    def __init__(self, collection_name: str, database=None, cache: LRUCache = None):
         """Establish a data access object to a collection of the given name in the MongoDB database as specified in the environment variables. When the collection is first creted, it will be associated to a validator (see https://www.mongodb.com/docs/manual/core/schema-validation/) to ensure some basic data compliance.
 
+        The connection is not established during the instantiation: all data access objects share the connection pool of the client registry (see src.util.mongo), and the collection is only created once per process upon its first use.
+
         parameters:
             collection_name -- the name of the collection (a collection validator of the same name must be available)
+            database -- optional pymongo database object (defaults to the database of the shared client)
+            cache -- optional read-through cache of the objects by id (see findOne), which is invalidated by every write of this data access object
         """
+        self.collection_name = collection_name
+        self.database = database
+        self.cache = cache
+        self._collection = None
+
+    @property
+    def collection(self):
+        """The pymongo collection associated to this data access object, which is resolved (and, if necessary, created) upon first access."""
+        if self._collection is None:
+            database = self.database if self.database is not None else getDatabase()
+            self.bootstrap(database)
+            self._collection = database[self.collection_name]
+        return self._collection
+
+    def bootstrap(self, database):
+        """Create the collection including its validator if it does not yet exist, and replace the validator of an existing collection if it changed (see src.util.validators.applyValidator). The check is only performed once per collection and process.
 
-        # load the local mongo URL (something like mongodb://localhost:27017)
-        LOCAL_MONGO_URL = dotenv_values('.env').get('MONGO_URL')
-        # check out of the environment (which can be overridden by the docker-compose file) also specifies an URL, and use that instead if it exists
-        MONGO_URL = os.environ.get('MONGO_URL', LOCAL_MONGO_URL)
-
-        # connect to the MongoDB and select the appropriate database
-        print(
-            f'Connecting to collection {collection_name} on MongoDB at url {MONGO_URL}')
-        client = pymongo.MongoClient(MONGO_URL)
-        database = client.edutask
-
-        # create the collection if it does not yet exist
-        if collection_name not in database.list_collection_names():
-            validator = getValidator(collection_name)
-            database.create_collection(collection_name, validator=validator)
-
-        self.collection = database[collection_name]
-
-    def create(self, data: dict):
+        parameters:
+            database -- the pymongo database object containing the collection
+        """
+        key = (id(database.client), database.name, self.collection_name)
+        with bootstrap_lock:
+            if key in bootstrapped:
+                return
+
+            # create the collection if it does not yet exist, or bring the validator of an existing collection up to date
+            if self.collection_name not in database.list_collection_names(filter={'name': self.collection_name}):
+                validator = getValidator(self.collection_name)
+                database.create_collection(self.collection_name, validator=validator)
+            else:
+                try:
+                    applyValidator(database, self.collection_name)
+                except OperationFailure as e:
+                    print(f'Warning: the validator of collection {self.collection_name} could not be updated ({e})')
+                except NotImplementedError as e:
+                    # databases which do not implement validators at all (e.g., mongomock)
+                    pass
+
+            # create the declared indexes (see src/static/indexes), which has no effect if they already exist
+            if getSetting('MONGO_CREATE_INDEXES', True, bool):
+                try:
+                    reconcileIndexes(database[self.collection_name], getIndexes(self.collection_name))
+                except OperationFailure as e:
+                    print(f'Warning: the indexes of collection {self.collection_name} could not be created ({e}), run python -m src.util.indexes to inspect the drift')
+            bootstrapped.add(key)
+
+    @timed
+    def create(self, data: dict, session=None):
         """Creates a new document in the collection associated to this data access object. The creation of a new document must comply to the corresponding validator, which defines the data structure of the collection. In particular, the validator has to make sure that: (1) the data for the new object contains all required properties, (2) every property complies to the bson data type constraint (see https://www.mongodb.com/docs/manual/reference/bson-types/, though we currently only consider Strings and Booleans), (3) and the values of a property flagged with 'uniqueItems' are unique among all documents of the collection.
 
         parameters:
             data -- a dict containing key-value pairs compliant to the validator
+            session -- optional pymongo session (e.g., of a transaction) in which the operation is executed
 
         returns:
-            object -- the newly created MongoDB document (parsed to a JSON object) containing the input data and an _id attribute
+            object -- the newly created MongoDB document (parsed to a JSON object) containing the input data, an _id attribute, and the initial _version (see versioned)
 
         raises:
             WriteError - in case at least one of the validator criteria is violated
         """
         localdata = dict(data)
+        localdata.setdefault(VERSION, 1)
 
         try:
             # insert the object into the database
-            inserted_id = self.collection.insert_one(localdata).inserted_id
+            inserted_id = self.collection.insert_one(localdata, session=session).inserted_id
 
-            # fetch and return the created object
-            obj = self.collection.find_one({'_id': inserted_id})
-            return self.to_json(obj)
+            # the inserted document equals the local data plus the generated id, hence it does not need to be fetched again
+            localdata['_id'] = inserted_id
+            return self.to_json(localdata)
         except Exception as e:
             # forward any pymongo.errors.WriteError that occurs during insert_one
             raise
 
+    @timed
+    def create_many(self, data: list, ordered: bool = True, session=None):
+        """Creates multiple new documents in the collection associated to this data access object within a single round trip to the database. Every document must comply to the corresponding validator (see create).
+
+        parameters:
+            data -- a list of dicts containing key-value pairs compliant to the validator
+            ordered -- if True, the insertion stops at the first document violating the validator; if False, all remaining documents are inserted nevertheless
+            session -- optional pymongo session in which the operation is executed
+
+        returns:
+            result -- dict containing the newly created documents (parsed to JSON objects) under the key 'created' and a list of errors under the key 'errors', where each error contains the index of the rejected document in the data list, the error code and the error message
+
+        raises:
+            Exception -- in case any database operation fails for reasons other than a violated validator
+        """
+        localdata = [dict(obj) for obj in data]
+        for obj in localdata:
+            obj.setdefault(VERSION, 1)
+        if len(localdata) == 0:
+            return {'created': [], 'errors': []}
+
+        errors = []
+        try:
+            self.collection.insert_many(localdata, ordered=ordered, session=session)
+        except BulkWriteError as e:
+            errors = [{'index': error['index'], 'code': error.get('code'), 'message': error.get('errmsg')} for error in e.details.get('writeErrors', [])]
+        except Exception as e:
+            raise
+
+        # determine which documents were inserted: an ordered insertion stops at the first error
+        failed = set(error['index'] for error in errors)
+        if ordered and len(errors) > 0:
+            failed.update(range(min(failed), len(localdata)))
+
+        created = [self.to_json(obj) for index, obj in enumerate(localdata) if index not in failed]
+        return {'created': created, 'errors': errors}
+
+    @timed
     def findOne(self, id: str):
         """Find one specific object in the collection with the _id property equal to the given id.
 
@@ -76,19 +158,35 @@ class DAO:
         raises:
             Exception -- in case any database operation fails
         """
+        token = None
+        if self.cache is not None:
+            obj = self.cache.get(str(id))
+            if obj is not None:
+                return obj
+            # the object is not cached if it is modified while it is read
+            token = self.cache.token()
+
         try:
-            obj = self.collection.find_one({'_id': ObjectId(id)})
-            return self.to_json(obj)
+            obj = self.to_json(self.collection.find_one({'_id': ObjectId(id)}))
+            if self.cache is not None:
+                self.cache.set(str(id), obj, token=token)
+            return obj
         except Exception as e:
             raise
 
     # find all objects that comply to the optional filter
-    def find(self, filter=None, toid: list = None):
+    @timed
+    def find(self, filter=None, toid: list = None, projection: dict = None, limit: int = None, after: str = None, sort: str = None, session=None):
         """Find all objects contained in the collection which comply to the given filter. 
 
         parameters: 
             filter -- dict containing key value pairs of properties and applicable filters
             toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional dict of the properties to include in (or exclude from) the returned objects
+            limit -- optional maximum number of returned objects (see find_page)
+            after -- optional continuation token of the previous page (see find_page)
+            sort -- optional sort specification (see find_page)
+            session -- optional pymongo session in which the query is executed, such that it reads the snapshot of a transaction
 
         returns:
             [object] -- list of objects compliant to the given filter
@@ -96,7 +194,141 @@ class DAO:
         raises:
             Exception -- in case any database operation fails
         """
+        if limit is not None or after is not None or sort is not None:
+            return self.find_page(filter=filter, toid=toid, projection=projection, limit=limit, after=after, sort=sort, session=session)['items']
+        if self.cache is not None and session is None and projection is None and toid == ['_id'] and list(filter.keys()) == ['_id']:
+            return self.find_by_ids([element['$oid'] for element in filter['_id']])
+
+        filter = self.convert_ids(filter, toid)
+
+        objs = []
+        try:
+            dbobjs = self.collection.find(filter, projection, collation=getCollation(self.collection_name, filter), session=session)
+
+            for obj in dbobjs:
+                objs.append(self.to_json(obj))
+
+            return objs
+        except Exception as e:
+            raise
+
+    @timed
+    def find_by_ids(self, ids: list):
+        """Find all objects with an _id property contained in the given list, where cached objects are taken from the cache and only the remaining ones are fetched from the database (within a single round trip).
+
+        parameters:
+            ids -- list of id values of the requested objects
+
+        returns:
+            [object] -- list of the existing objects in the order of the given ids, where each object is contained once even if its id is repeated
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        ids = list(dict.fromkeys(str(id) for id in ids))
+        objs = {}
+        token = None
+        if self.cache is not None:
+            for id in ids:
+                obj = self.cache.get(id)
+                if obj is not None:
+                    objs[id] = obj
+            token = self.cache.token()
+
+        missing = [ObjectId(id) for id in ids if id not in objs]
+        if len(missing) > 0:
+            try:
+                for dbobj in self.collection.find({'_id': {'$in': missing}}):
+                    obj = self.to_json(dbobj)
+                    objs[obj['_id']['$oid']] = obj
+                    if self.cache is not None:
+                        self.cache.set(obj['_id']['$oid'], obj, token=token)
+            except Exception as e:
+                raise
+        return [objs[id] for id in ids if id in objs]
+
+    @timed
+    def find_page(self, filter=None, toid: list = None, projection: dict = None, limit: int = None, after: str = None, sort: str = None, session=None):
+        """Find one page of the objects contained in the collection which comply to the given filter. The pages are determined by the position of the last object of the previous page (keyset pagination) rather than by skipping objects, such that each page is served by an index range scan.
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional dict of the properties to include in (or exclude from) the returned objects
+            limit -- maximum number of objects of the page (None for all remaining objects)
+            after -- continuation token of the previous page (None for the first page)
+            sort -- the name of the field to sort by, prefixed by a '-' for a descending order (defaults to the _id)
+            session -- optional pymongo session in which the query is executed
+
+        returns:
+            page -- dict containing the list of objects under the key 'items' and the continuation token of the next page (or None if there are no more objects) under the key 'next'
+
+        raises:
+            ValueError -- in case the continuation token is invalid
+            Exception -- in case any database operation fails
+        """
+        filter = self.convert_ids(filter, toid)
+        collation = getCollation(self.collection_name, filter)
+        sort = parseSort(sort)
+        if after is not None:
+            keyset = getKeysetFilter(after, sort)
+            filter = {'$and': [filter, keyset]} if filter else keyset
+
+        try:
+            # fetch one additional object to determine whether there is a next page
+            dbobjs = self.collection.find(filter, projection, sort=getSortStages(sort), collation=collation, session=session)
+            if limit is not None:
+                dbobjs = dbobjs.limit(limit + 1)
+            dbobjs = list(dbobjs)
+
+            cursor = None
+            if limit is not None and len(dbobjs) > limit:
+                dbobjs = dbobjs[:limit]
+                cursor = encodeCursor(dbobjs[-1], sort)
+            return {'items': [self.to_json(obj) for obj in dbobjs], 'next': cursor}
+        except Exception as e:
+            raise
+
+    def iterate(self, filter=None, toid: list = None, projection: dict = None, sort: str = None, batch_size: int = None):
+        """Iterate over all objects contained in the collection which comply to the given filter without materializing them in a list. The objects are fetched from the database in batches of the given size, such that the memory consumption does not depend on the size of the collection.
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+            projection -- optional dict of the properties to include in (or exclude from) the returned objects
+            sort -- optional name of the field to sort by, prefixed by a '-' for a descending order
+            batch_size -- number of objects fetched per round trip (defaults to the STREAM_BATCH_SIZE setting)
+
+        yields:
+            object -- one object (parsed to json object) after the other
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        filter = self.convert_ids(filter, toid)
+        if batch_size is None:
+            batch_size = getSetting('STREAM_BATCH_SIZE', 500, int)
+
+        dbobjs = self.collection.find(filter, projection, batch_size=batch_size, collation=getCollation(self.collection_name, filter))
+        if sort is not None:
+            dbobjs = dbobjs.sort(getSortStages(parseSort(sort)))
+        try:
+            for obj in dbobjs:
+                yield self.to_json(obj)
+        finally:
+            # release the server-side cursor in case the iteration is aborted early (e.g., when the client disconnects)
+            dbobjs.close()
 
+    def convert_ids(self, filter: dict, toid: list):
+        """Convert the properties of a filter which contain lists of ids in the JSON format ({'$oid': ...}) into MongoDB $in filters.
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            toid -- list of properties (contained in the filter) which are MongoDB ObjectIDs and hence need to be converted
+
+        returns:
+            filter -- the converted filter
+        """
         # if the filter contains attributes that are IDs, then they need to be converted
         if toid and len(toid) > 0:
             for i in toid:
@@ -105,24 +337,34 @@ class DAO:
                     conv = ObjectId(element['$oid'])
                     converted.append(conv)
                 filter[i] = {'$in': converted}
+        return filter
 
-        objs = []
-        try:
-            dbobjs = self.collection.find(filter)
+    @timed
+    def aggregate(self, pipeline: list):
+        """Run an aggregation pipeline (see https://www.mongodb.com/docs/manual/core/aggregation-pipeline/) on the collection.
 
-            for obj in dbobjs:
-                objs.append(self.to_json(obj))
+        parameters:
+            pipeline -- list of aggregation stages
 
-            return objs
+        returns:
+            [object] -- list of resulting objects
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            return [self.to_json(obj) for obj in self.collection.aggregate(pipeline)]
         except Exception as e:
             raise
 
-    def update(self, id: str, update_data: dict):
+    @timed
+    def update(self, id: str, update_data: dict, session=None):
         """Find one specific object in the collection with the _id property equal to the given id and update its data according to the update_data.
 
         parameters: 
             id -- id value of the requested object
             update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators, see https://www.mongodb.com/docs/manual/reference/operator/update/#std-label-update-operators)
+            session -- optional pymongo session in which the operation is executed
 
         returns:
             True -- if the update was successful
@@ -134,12 +376,113 @@ class DAO:
         try:
             update_result = self.collection.update_one(
                 {'_id': ObjectId(id)},
-                update_data
+                self.versioned(update_data),
+                session=session
             )
+            self.invalidate([id], session=session)
             return update_result.acknowledged
         except Exception as e:
             raise
 
+    def update_and_return(self, id: str, update_data: dict, projection: dict = None, session=None):
+        """Find one specific object in the collection with the _id property equal to the given id, update it, and return the updated object within the same round trip (see find_one_and_update).
+
+        parameters:
+            id -- id value of the requested object
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            projection -- optional dict of the properties to include in (or exclude from) the returned object
+            session -- optional pymongo session in which the operation is executed
+
+        returns:
+            object -- the updated MongoDB document (parsed to a JSON object)
+            None -- if no object is associated to the given id
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        return self.find_one_and_update({'_id': ObjectId(id)}, update_data, projection=projection, session=session)
+
+    @timed
+    def find_one_and_update(self, filter: dict, update_data: dict, projection: dict = None, session=None):
+        """Atomically update the first object in the collection which complies to the given filter and return it as it is after the update (see https://www.mongodb.com/docs/manual/reference/method/db.collection.findOneAndUpdate/), which saves reading the object once more after updating it.
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            projection -- optional dict of the properties to include in (or exclude from) the returned object
+            session -- optional pymongo session in which the operation is executed
+
+        returns:
+            object -- the updated MongoDB document (parsed to a JSON object)
+            None -- if no object complies to the filter
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            obj = self.collection.find_one_and_update(filter, self.versioned(update_data), projection=projection, return_document=ReturnDocument.AFTER, session=session)
+            if obj is None:
+                return None
+            self.invalidate([obj['_id']] if '_id' in obj else None, session=session)
+            return self.to_json(obj)
+        except Exception as e:
+            raise
+
+    @timed
+    def bulk_write(self, requests: list, ordered: bool = True, session=None):
+        """Execute multiple write operations (pymongo.InsertOne, UpdateOne, DeleteOne, ...) on the collection within a single round trip (see https://www.mongodb.com/docs/manual/core/bulk-write-operations/). The operations are passed as they are, hence inserted documents need a version and updates need to be versioned beforehand (see versioned).
+
+        parameters:
+            requests -- list of pymongo write operations
+            ordered -- if True, the execution stops at the first failing operation; if False, all remaining operations are executed nevertheless
+            session -- optional pymongo session in which the operations are executed
+
+        returns:
+            result -- dict containing the numbers of inserted, matched, modified, and deleted documents under the keys of the same name, and a list of errors under the key 'errors', where each error contains the index of the failed operation in the requests list, the error code and the error message
+
+        raises:
+            Exception -- in case any database operation fails for reasons other than a failing write operation
+        """
+        result = {'inserted': 0, 'matched': 0, 'modified': 0, 'deleted': 0, 'errors': []}
+        if len(requests) == 0:
+            return result
+
+        try:
+            details = self.collection.bulk_write(requests, ordered=ordered, session=session).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            result['errors'] = [{'index': error['index'], 'code': error.get('code'), 'message': error.get('errmsg')} for error in details.get('writeErrors', [])]
+        except Exception as e:
+            raise
+        finally:
+            self.invalidate(session=session)
+
+        result.update({'inserted': details.get('nInserted', 0), 'matched': details.get('nMatched', 0), 'modified': details.get('nModified', 0), 'deleted': details.get('nRemoved', 0)})
+        return result
+
+    @timed
+    def update_many(self, filter: dict, update_data: dict, session=None):
+        """Update all objects in the collection which comply to the given filter within a single round trip.
+
+        parameters:
+            filter -- dict containing key value pairs of properties and applicable filters
+            update_data -- dict containing the update operation (top-level key values must be valid MongoDB update operators)
+            session -- optional pymongo session in which the operation is executed
+
+        returns:
+            n -- the number of modified objects
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        try:
+            update_result = self.collection.update_many(filter, self.versioned(update_data), session=session)
+            self.invalidate(session=session)
+            return update_result.modified_count
+        except Exception as e:
+            raise
+
+    @timed
     def delete(self, id: str):
         """Find one specific object in the collection with the _id property equal to the given id and remove it from the collection
 
@@ -157,10 +500,38 @@ class DAO:
             result = self.collection.delete_one(
                 {'_id': ObjectId(id)}
             )
+            self.invalidate([id])
             return result.acknowledged
         except Exception as e:
             raise
 
+    @timed
+    def delete_many(self, ids: list, session=None):
+        """Remove all objects with an _id property contained in the given list from the collection within a single round trip.
+
+        parameters:
+            ids -- list of id values (strings or ObjectIds) of the objects to remove
+            session -- optional pymongo session in which the operation is executed
+
+        returns:
+            n -- the number of removed objects
+
+        raises:
+            Exception -- in case any database operation fails
+        """
+        if len(ids) == 0:
+            return 0
+
+        try:
+            result = self.collection.delete_many(
+                {'_id': {'$in': [ObjectId(id) for id in ids]}},
+                session=session
+            )
+            self.invalidate(ids, session=session)
+            return result.deleted_count
+        except Exception as e:
+            raise
+
     def drop(self):
         """Remove the entire collection
 
@@ -168,10 +539,47 @@ class DAO:
             Exception -- in case any database operation fails
         """
         try:
+            database = self.collection.database
             self.collection.drop()
+
+            # the collection has to be created once more upon the next access
+            with bootstrap_lock:
+                bootstrapped.discard((id(database.client), database.name, self.collection_name))
+            self._collection = None
+            self.invalidate()
         except Exception as e:
             raise
 
+    def versioned(self, update_data: dict):
+        """Extend an update operation such that it increments the version of each updated object. The version (stored in the _version property) is set to 1 upon creation and allows to detect modifications without comparing the entire object, e.g., to compute ETags.
+
+        parameters:
+            update_data -- dict containing the update operation
+
+        returns:
+            update_data -- a copy of the update operation including the increment of the version
+        """
+        localdata = dict(update_data)
+        localdata['$inc'] = {**localdata.get('$inc', {}), VERSION: 1}
+        return localdata
+
+    def invalidate(self, ids: list = None, session=None):
+        """Remove objects from the cache of this data access object (if any) after they were modified. Objects modified within a transaction are only removed once the transaction ended (see src.util.mongo.afterCommit), since concurrent readers would otherwise cache their previous state once more.
+
+        parameters:
+            ids -- list of id values of the modified objects (None if any object may have been modified)
+            session -- optional session in which the objects were modified
+        """
+        if self.cache is None:
+            return
+        if session is not None:
+            afterCommit(session, lambda: self.invalidate(ids))
+        elif ids is None:
+            self.cache.clear()
+        else:
+            for id in ids:
+                self.cache.invalidate(str(id))
+
     def to_json(self, data):
         """Transform a MongoDB document into a json object.
 
@@ -181,4 +589,4 @@ class DAO:
         returns:
             dict -- the document converted to JSON
         """
-        return json.loads(json_util.dumps(data))
+        return toJson(data)
@@ -1,9 +1,16 @@
+import threading
+
 from src.util.dao import DAO
+from src.util.cache import LRUCache
+from src.util.config import getSetting
 
 daos = {}
+asyncdaos = {}
+lock = threading.Lock()
 def getDao(collection_name: str):
     """Obtain a data access object of a collection. The purpose of the realization using the singleton pattern is
-    to avoid multiple data access objects for the same collection
+    to avoid multiple data access objects for the same collection. The lookup is thread-safe, such that concurrent
+    requests never create two data access objects of the same collection.
 
     parameters:
         collection_name -- the name of the collection
@@ -12,5 +19,52 @@ def getDao(collection_name: str):
         validator -- DAO to the given collection
     """
     if collection_name not in daos:
-        daos[collection_name] = DAO(collection_name=collection_name)
-    return daos[collection_name]
\ No newline at end of file
+        with lock:
+            if collection_name not in daos:
+                daos[collection_name] = DAO(collection_name=collection_name, cache=getCache(collection_name))
+    return daos[collection_name]
+
+def getAsyncDao(collection_name: str):
+    """Obtain the asynchronous data access object of a collection (see src.util.asyncdao), which shares the read cache
+    of the synchronous data access object of the same collection, such that writes on either path invalidate it.
+
+    parameters:
+        collection_name -- the name of the collection
+
+    returns:
+        dao -- AsyncDAO to the given collection
+    """
+    # the asynchronous data access objects (and the motor driver) are only imported if the asynchronous views are used
+    from src.util.asyncdao import AsyncDAO
+
+    if collection_name not in asyncdaos:
+        cache = getDao(collection_name).cache
+        with lock:
+            if collection_name not in asyncdaos:
+                asyncdaos[collection_name] = AsyncDAO(collection_name=collection_name, cache=cache)
+    return asyncdaos[collection_name]
+
+def getCache(collection_name: str):
+    """Create the read cache of a collection if the collection is listed in the DAO_CACHE_COLLECTIONS setting (a comma
+    separated list of collection names). Collections which require strongly consistent reads must not be listed, as
+    every process caches independently and only invalidates its own writes.
+
+    parameters:
+        collection_name -- the name of the collection
+
+    returns:
+        cache -- LRUCache configured by the DAO_CACHE_SIZE and DAO_CACHE_TTL settings
+        None -- if the collection is not cached
+    """
+    cached = [name.strip() for name in getSetting('DAO_CACHE_COLLECTIONS', '').split(',')]
+    if collection_name not in cached:
+        return None
+    return LRUCache(maxsize=getSetting('DAO_CACHE_SIZE', 1024, int), ttl=getSetting('DAO_CACHE_TTL', 30.0, float))
+
+def getCacheStats():
+    """Obtain the counters of the read caches of all data access objects.
+
+    returns:
+        stats -- dict mapping the name of each cached collection to the counters of its cache (see LRUCache.stats)
+    """
+    return {name: dao.cache.stats() for name, dao in list(daos.items()) if dao.cache is not None}
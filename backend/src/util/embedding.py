@@ -0,0 +1,181 @@
+"""Storage modes of the todos and the video of a task. In the referenced mode (default), they are documents of the todo
+and video collections and the task only contains their ids. In the embedded mode (TODO_STORAGE=embedded), they are
+stored within the task document itself, such that a task is read with a single query and a todo is modified by a
+positional update of its task. The JSON representation of a populated task is the same in both modes.
+
+Existing data is converted by the migration tool while the backend is running, run from the backend folder:
+    python -m src.util.embedding embed [--batch-size 100]        (referenced -> embedded)
+    python -m src.util.embedding reference [--batch-size 100]    (embedded -> referenced)
+"""
+import argparse
+import json
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.util.config import getSetting
+from src.util.dao import VERSION
+from src.util.validators import applyValidator
+
+MODES = ['referenced', 'embedded']
+
+# the number of attempts to convert a task which is modified concurrently
+ATTEMPTS = 5
+
+def isEmbedded():
+    """Determine whether the todos and videos are embedded in their tasks according to the TODO_STORAGE setting.
+
+    raises:
+        ValueError -- in case the setting is neither referenced nor embedded
+    """
+    mode = getSetting('TODO_STORAGE', 'referenced').lower()
+    if mode not in MODES:
+        raise ValueError(f'Invalid TODO_STORAGE {mode}, expected one of {", ".join(MODES)}')
+    return mode == 'embedded'
+
+def isReference(value):
+    """Determine whether a value of a task object (parsed to JSON) is a reference, i.e., an id, rather than an embedded object."""
+    return isinstance(value, dict) and '$oid' in value
+
+def hasReferences(task: dict):
+    """Determine whether the video or any todo of a task object (parsed to JSON) is still stored as a reference."""
+    return isReference(task.get('video')) or any(isReference(todo) for todo in task.get('todos', []))
+
+def embedTask(database, task: dict):
+    """Replace the references of a task by the referenced todo and video documents, and remove these documents from their collections afterwards. The task is only written if its version did not change since it was read, and a referenced document is only removed if its version did not change since it was embedded (otherwise, the embedded copy is updated first), such that concurrent writes of a running backend are never lost.
+
+    parameters:
+        database -- the pymongo database
+        task -- the raw task document
+
+    returns:
+        True -- if the task was converted (or did not contain any references)
+        False -- if the task was modified concurrently and has to be read once more
+    """
+    todoids = [todo for todo in task.get('todos', []) if isinstance(todo, ObjectId)]
+    videoid = task.get('video') if isinstance(task.get('video'), ObjectId) else None
+    if len(todoids) == 0 and videoid is None:
+        return True
+
+    todos = {todo['_id']: todo for todo in database['todo'].find({'_id': {'$in': todoids}})}
+    update = {'$set': {'todos': [todos[todo] if isinstance(todo, ObjectId) else todo for todo in task.get('todos', []) if not isinstance(todo, ObjectId) or todo in todos]}}
+    video = database['video'].find_one({'_id': videoid}) if videoid is not None else None
+    if video is not None:
+        update['$set']['video'] = video
+    elif videoid is not None:
+        # a dangling reference is removed, as it is never populated either
+        update['$unset'] = {'video': ''}
+
+    result = database['task'].update_one({'_id': task['_id'], VERSION: task.get(VERSION)}, update)
+    if result.matched_count == 0:
+        return False
+
+    removeEmbedded(database, task['_id'], list(todos.values()), video)
+    return True
+
+def removeEmbedded(database, taskid, todos: list, video: dict = None):
+    """Remove the todo and video documents which were embedded in a task from their collections. A document that was modified after it was embedded is copied into the task once more before it is removed."""
+    while len(todos) > 0 or video is not None:
+        if len(todos) > 0:
+            database['todo'].delete_many({'$or': [{'_id': todo['_id'], VERSION: todo.get(VERSION)} for todo in todos]})
+            todos = list(database['todo'].find({'_id': {'$in': [todo['_id'] for todo in todos]}}))
+            for todo in todos:
+                database['task'].update_one({'_id': taskid, 'todos._id': todo['_id']}, {'$set': {'todos.$': todo}})
+        if video is not None:
+            database['video'].delete_one({'_id': video['_id'], VERSION: video.get(VERSION)})
+            video = database['video'].find_one({'_id': video['_id']})
+            if video is not None:
+                database['task'].update_one({'_id': taskid}, {'$set': {'video': video}})
+
+def referenceTask(database, task: dict):
+    """Move the embedded todos and video of a task into their collections and replace them by references. The documents are written first, such that a reader never encounters a dangling reference, and an existing document is only overwritten by a newer embedded copy. The task is only written if its version did not change since it was read.
+
+    parameters:
+        database -- the pymongo database
+        task -- the raw task document
+
+    returns:
+        True -- if the task was converted (or did not contain any embedded objects)
+        False -- if the task was modified concurrently and has to be read once more
+    """
+    todos = [todo for todo in task.get('todos', []) if isinstance(todo, dict)]
+    video = task.get('video') if isinstance(task.get('video'), dict) else None
+    if len(todos) == 0 and video is None:
+        return True
+
+    for collection_name, objs in [('todo', todos), ('video', [video] if video is not None else [])]:
+        if len(objs) == 0:
+            continue
+        try:
+            database[collection_name].insert_many(objs, ordered=False)
+        except BulkWriteError as e:
+            # documents written by a previous attempt are only replaced if the embedded copy is newer
+            database[collection_name].bulk_write([UpdateOne({'_id': obj['_id'], VERSION: {'$lt': obj.get(VERSION, 1)}}, {'$set': obj}) for obj in objs], ordered=False)
+
+    update = {'$set': {'todos': [todo['_id'] if isinstance(todo, dict) else todo for todo in task.get('todos', [])]}}
+    if video is not None:
+        update['$set']['video'] = video['_id']
+    result = database['task'].update_one({'_id': task['_id'], VERSION: task.get(VERSION)}, update)
+    return result.matched_count > 0
+
+def migrate(database, direction: str, batch_size: int = 100):
+    """Convert all tasks of the database to the embedded (direction embed) or referenced (direction reference) storage mode. The tasks are read in batches ordered by their ids, and each task is converted individually, such that the backend can keep serving requests (see the README for the procedure). Tasks which are already converted are skipped, hence the migration can be repeated.
+
+    parameters:
+        database -- the pymongo database
+        direction -- either embed or reference
+        batch_size -- the number of tasks read per round trip
+
+    returns:
+        counts -- dict containing the number of converted tasks under the key converted, and the number of tasks which could not be converted due to concurrent modifications under the key failed
+
+    raises:
+        ValueError -- in case the direction is invalid
+        Exception -- in case any database operation fails
+    """
+    if direction not in ['embed', 'reference']:
+        raise ValueError(f'Invalid direction {direction}, expected embed or reference')
+    convert = embedTask if direction == 'embed' else referenceTask
+    kind = 'objectId' if direction == 'embed' else 'object'
+    pending = {'$or': [{'video': {'$type': kind}}, {'todos': {'$type': kind}}]}
+
+    counts = {'converted': 0, 'failed': 0}
+    last = None
+    while True:
+        filter = pending if last is None else {'$and': [pending, {'_id': {'$gt': last}}]}
+        tasks = list(database['task'].find(filter).sort('_id', 1).limit(batch_size))
+        if len(tasks) == 0:
+            return counts
+        for task in tasks:
+            for _ in range(ATTEMPTS):
+                if convert(database, task):
+                    counts['converted'] += 1
+                    break
+                task = database['task'].find_one({'_id': task['_id']})
+                if task is None:
+                    break
+            else:
+                counts['failed'] += 1
+        last = tasks[-1]['_id']
+
+def main():
+    from src.util.daos import getDao
+
+    parser = argparse.ArgumentParser(description='Convert the todos and videos of all tasks between the referenced and the embedded storage mode')
+    parser.add_argument('direction', choices=['embed', 'reference'], help='embed the todos and videos into their tasks, or move them into their own collections')
+    parser.add_argument('--batch-size', type=int, default=100, help='number of tasks read per round trip')
+    args = parser.parse_args()
+
+    # create the collections including their validators and indexes
+    database = getDao('task').collection.database
+    for collection_name in ['video', 'todo']:
+        getDao(collection_name).collection
+    # the conversion requires the task validator accepting both representations, which an existing collection may lack
+    applyValidator(database, 'task')
+
+    counts = migrate(database, args.direction, batch_size=args.batch_size)
+    print(json.dumps(counts))
+
+if __name__ == '__main__':
+    main()
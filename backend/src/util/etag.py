@@ -0,0 +1,117 @@
+import hashlib
+import json
+
+from flask import Response, jsonify
+
+def computeEtag(obj):
+    """Compute a strong entity tag (see https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/ETag) of a JSON-compatible object.
+
+    parameters:
+        obj -- the JSON-compatible object (e.g., the versions of all objects contained in a response)
+
+    returns:
+        etag -- hex digest of the object
+    """
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+def getDocumentEtag(obj: dict):
+    """Compute the entity tag of a single object, which only depends on the id and the version of the object (see DAO.versioned). Objects created before versions were introduced are hashed entirely.
+
+    parameters:
+        obj -- the object (parsed to json)
+
+    returns:
+        etag -- hex digest of the object
+    """
+    if obj is not None and '_version' in obj:
+        return computeEtag([obj['_id'], obj['_version']])
+    return computeEtag(obj)
+
+def isNotModified(request, etag: str):
+    """Determine whether the client already holds the representation identified by the entity tag, i.e., whether the If-None-Match header of the request contains it.
+
+    parameters:
+        request -- the flask request
+        etag -- the entity tag of the current representation
+
+    returns:
+        True -- if the request can be answered with 304 Not Modified
+        False -- otherwise
+    """
+    return request.if_none_match.contains_weak(etag)
+
+def notModified(etag: str):
+    """Create an empty 304 Not Modified response.
+
+    parameters:
+        etag -- the entity tag of the current representation
+
+    returns:
+        response -- flask response
+    """
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+def conditionalResponse(request, etag: str, build):
+    """Answer a conditional GET request: if the client holds the current representation, respond with 304 Not Modified without building the response, otherwise build the response and tag it.
+
+    parameters:
+        request -- the flask request
+        etag -- the entity tag of the current representation
+        build -- callable returning the flask response (e.g., the jsonified object) in case the representation is needed
+
+    returns:
+        response -- flask response
+    """
+    if isNotModified(request, etag):
+        return notModified(etag)
+    response = build()
+    response.set_etag(etag)
+    return response
+
+def conditionalDerivedResponse(request, getEtag, getObject, deriveEtag):
+    """Answer a conditional GET request with a JSON object whose entity tag can also be derived from the object itself (see conditionalResponse). Only a conditional request needs the entity tag before the object is obtained, otherwise the tag is derived from the object, which saves the queries computing the tag.
+
+    parameters:
+        request -- the flask request
+        getEtag -- callable returning the entity tag of the current representation
+        getObject -- callable returning the JSON-compatible object in case the representation is needed
+        deriveEtag -- callable returning the entity tag of a given object, which equals the one returned by getEtag
+
+    returns:
+        response -- flask response
+    """
+    if request.if_none_match:
+        return conditionalResponse(request, getEtag(), lambda: jsonify(getObject()))
+
+    obj = getObject()
+    response = jsonify(obj)
+    response.set_etag(deriveEtag(obj))
+    return response
+
+async def conditionalJsonResponse(request, getEtag, getObject):
+    """Answer a conditional GET request in an asynchronous view (see conditionalResponse). If the request is not conditional, a 304 Not Modified response is impossible, hence the entity tag and the object are obtained concurrently.
+
+    parameters:
+        request -- the flask request
+        getEtag -- coroutine function returning the entity tag of the current representation
+        getObject -- coroutine function returning the JSON-compatible object in case the representation is needed
+
+    returns:
+        response -- flask response
+    """
+    # asyncio is only imported by the asynchronous views, which keeps it out of the startup of the synchronous application
+    import asyncio
+
+    if not request.if_none_match:
+        etag, obj = await asyncio.gather(getEtag(), getObject())
+    else:
+        etag = await getEtag()
+        if isNotModified(request, etag):
+            return notModified(etag)
+        obj = await getObject()
+
+    response = jsonify(obj)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,308 @@
+"""Change events of the tasks and todos of a user, which are pushed to the clients by the server-sent event stream
+GET /events/<userid> (see src/blueprints/eventblueprint.py), such that a client can apply the changes to its copy of the
+tasks instead of fetching all tasks once more after every write. The controllers publish an event after each successful
+write to the event bus of the process, which delivers it to the streams of the affected users.
+
+With the default backend (EVENT_BACKEND=memory), an event only reaches the streams served by the process which executed
+the write. With multiple worker processes, the change-stream backend (EVENT_BACKEND=changestream) writes the events into
+the event collection instead, and every process delivers the events which it observes on a change stream of that
+collection (which requires a replica set, see https://www.mongodb.com/docs/manual/changeStreams/).
+
+An event is a dict containing its type (see TYPES), the ids of the affected users under the key userids, the id of the
+task under the key taskid, the id of the changed object under the key id, and the changed object (as JSON) under the
+key data, if it is available.
+"""
+import collections
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo.errors import OperationFailure
+
+from src.util.config import getSetting
+
+BACKENDS = ['memory', 'changestream']
+TYPES = ['task.created', 'task.updated', 'task.deleted', 'todo.created', 'todo.updated', 'todo.deleted']
+
+# event which tells a client that it missed events and has to fetch its tasks once more
+RESYNC = 'resync'
+
+COLLECTION = 'event'
+
+class Subscription:
+    def __init__(self, bus, userid: str, maxsize: int):
+        """Instantiate the subscription of one event stream to the events of a user. The events are buffered until the stream consumes them; if more than maxsize events are pending, they are replaced by a single resync event, such that a slow client neither blocks the writers nor exhausts the memory."""
+        self.bus = bus
+        self.userid = userid
+        self.maxsize = maxsize
+        self.events = collections.deque()
+        self.condition = threading.Condition()
+
+    def put(self, event: dict):
+        """Append an event to the pending events of the subscription."""
+        with self.condition:
+            if len(self.events) >= self.maxsize:
+                self.events.clear()
+                event = {'type': RESYNC}
+            self.events.append(event)
+            self.condition.notify()
+
+    def get(self, timeout: float = None):
+        """Obtain the next pending event, waiting at most timeout seconds.
+
+        returns:
+            event -- the next event
+            None -- if no event was published within the timeout
+        """
+        with self.condition:
+            if len(self.events) == 0:
+                self.condition.wait(timeout)
+            return self.events.popleft() if len(self.events) > 0 else None
+
+    def close(self):
+        """End the subscription (e.g., when the client closed the stream)."""
+        self.bus.unsubscribe(self)
+
+class EventBus:
+    def __init__(self, queue_size: int = 100):
+        """Instantiate the in-process event bus, which delivers each published event to the subscriptions of the affected users.
+
+        parameters:
+            queue_size -- the maximum number of pending events per subscription (see Subscription)
+        """
+        self.queue_size = queue_size
+        self.subscriptions = {}
+        self.lock = threading.Lock()
+
+    @property
+    def active(self):
+        """Whether a published event may reach any subscription. Controllers skip the lookups which an event requires (e.g., the users of a task) if no stream is open."""
+        return len(self.subscriptions) > 0
+
+    def subscribe(self, userid: str):
+        """Subscribe to the events of a user.
+
+        parameters:
+            userid -- the id of the user
+
+        returns:
+            subscription -- Subscription which has to be closed once the events are no longer consumed
+        """
+        subscription = Subscription(self, userid, self.queue_size)
+        with self.lock:
+            self.subscriptions.setdefault(userid, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.userid, set())
+            subscriptions.discard(subscription)
+            if len(subscriptions) == 0:
+                self.subscriptions.pop(subscription.userid, None)
+
+    def publish(self, type: str, userids: list, taskid: str, id: str = None, data: dict = None):
+        """Publish a change of a task or todo to the streams of the given users.
+
+        parameters:
+            type -- the type of the change (see TYPES)
+            userids -- list of the ids of the users to whom the task is assigned
+            taskid -- the id of the (containing) task
+            id -- the id of the changed object (defaults to the taskid)
+            data -- the changed object as JSON, if available
+
+        raises:
+            ValueError -- in case the type is unknown
+        """
+        if type not in TYPES:
+            raise ValueError(f'Invalid event type {type}, expected one of {", ".join(TYPES)}')
+        event = {'type': type, 'userids': [str(userid) for userid in userids], 'taskid': str(taskid), 'id': str(id or taskid)}
+        if data is not None:
+            event['data'] = data
+        self.dispatch(event)
+
+    def dispatch(self, event: dict):
+        """Forward a published event to its destination, which is the deliver method of the in-process bus."""
+        self.deliver(event)
+
+    def deliver(self, event: dict):
+        """Append an event to the subscriptions of all affected users of this process."""
+        with self.lock:
+            subscriptions = [subscription for userid in event.get('userids', []) for subscription in self.subscriptions.get(userid, set())]
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def resync(self):
+        """Tell all subscriptions of this process to fetch their tasks once more, e.g., after events may have been lost."""
+        with self.lock:
+            subscriptions = [subscription for subscriptions in self.subscriptions.values() for subscription in subscriptions]
+        for subscription in subscriptions:
+            subscription.put({'type': RESYNC})
+
+class ChangeStreamBus(EventBus):
+    def __init__(self, collection=None, queue_size: int = 100, ttl: int = 3600):
+        """Instantiate the event bus shared by all processes through the event collection. Published events are written by a background thread, such that a write never waits for its event, and a second background thread delivers all inserted events to the subscriptions of this process. Both threads are started upon the first use, i.e., in the worker processes of a pre-fork server.
+
+        parameters:
+            collection -- the pymongo collection of the events (defaults to the event collection of the shared database)
+            queue_size -- the maximum number of pending events per subscription (see Subscription)
+            ttl -- the number of seconds after which the database removes a stored event
+        """
+        super().__init__(queue_size=queue_size)
+        self.collection = collection
+        self.ttl = ttl
+        self.pending = collections.deque()
+        self.condition = threading.Condition()
+        self.threads = {}
+
+    @property
+    def active(self):
+        # the streams of other processes cannot be observed, hence every change is published
+        return True
+
+    def getCollection(self):
+        """Obtain the event collection, whose stored events are removed by a TTL index (see https://www.mongodb.com/docs/manual/core/index-ttl/)."""
+        if self.collection is None:
+            from src.util.mongo import getDatabase
+            collection = getDatabase()[COLLECTION]
+            collection.create_index('createdAt', expireAfterSeconds=self.ttl)
+            self.collection = collection
+        return self.collection
+
+    def start(self, name: str, target):
+        """Start a background thread unless it is already running."""
+        with self.lock:
+            if name not in self.threads or not self.threads[name].is_alive():
+                self.threads[name] = threading.Thread(target=target, name=f'events-{name}', daemon=True)
+                self.threads[name].start()
+
+    def subscribe(self, userid: str):
+        subscription = super().subscribe(userid)
+        self.start('watcher', self.watch)
+        return subscription
+
+    def dispatch(self, event: dict):
+        self.start('writer', self.write)
+        with self.condition:
+            self.pending.append(event)
+            self.condition.notify()
+
+    def write(self):
+        """Write the published events into the event collection, all pending events with one round trip. Events which cannot be written are dropped (and the subscriptions resynchronized), as the writes which caused them already succeeded."""
+        while True:
+            with self.condition:
+                while len(self.pending) == 0:
+                    self.condition.wait()
+                events = list(self.pending)
+                self.pending.clear()
+            try:
+                # the data is stored as a string, since its extended JSON keys (e.g., $oid) are no valid field names
+                createdAt = datetime.now(timezone.utc)
+                self.getCollection().insert_many([{**event, 'data': json.dumps(event.get('data')), 'createdAt': createdAt} for event in events])
+            except Exception as e:
+                print(f'{e.__class__.__name__}: {e}')
+                self.resync()
+
+    def watch(self):
+        """Deliver the events inserted by any process to the subscriptions of this process. After an interruption, the change stream is resumed after the last delivered event; if that is no longer possible, all subscriptions are resynchronized."""
+        token = None
+        while True:
+            try:
+                with self.getCollection().watch([{'$match': {'operationType': 'insert'}}], resume_after=token) as stream:
+                    for change in stream:
+                        token = change['_id']
+                        event = {key: value for key, value in change['fullDocument'].items() if key not in ['_id', 'createdAt']}
+                        data = json.loads(event.pop('data', None) or 'null')
+                        self.deliver(event if data is None else {**event, 'data': data})
+            except OperationFailure as e:
+                print(f'{e.__class__.__name__}: {e}')
+                if token is not None:
+                    # the resume token may have expired, hence the events since the interruption are lost
+                    token = None
+                    self.resync()
+                time.sleep(1)
+            except Exception as e:
+                print(f'{e.__class__.__name__}: {e}')
+                time.sleep(1)
+
+def encodeEvents(subscription: Subscription, keepalive: float):
+    """Encode the events of a subscription as a server-sent event stream (see https://html.spec.whatwg.org/multipage/server-sent-events.html), where the type of an event is its event name and the event without the userids is its data. A comment is written whenever no event was published for keepalive seconds, such that proxies keep the connection open and a closed connection is detected.
+
+    parameters:
+        subscription -- the subscription of the stream
+        keepalive -- the maximum number of seconds between two writes
+
+    yields:
+        chunk -- one complete event or comment
+    """
+    yield ': connected\n\n'
+    while True:
+        event = subscription.get(timeout=keepalive)
+        if event is None:
+            yield ': keepalive\n\n'
+            continue
+        data = {key: value for key, value in event.items() if key != 'userids'}
+        yield f'event: {event["type"]}\ndata: {json.dumps(data)}\n\n'
+
+class StreamLimit:
+    def __init__(self, limit: int):
+        """Instantiate the counter of the open event streams of the process. Every stream occupies one thread of its worker for as long as it is open (see GUNICORN_THREADS), hence the number of streams is limited, such that the worker keeps threads for other requests."""
+        self.limit = limit
+        self.open = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Reserve a stream, which returns False if the limit is reached."""
+        with self.lock:
+            if self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        """Release a stream reserved by acquire."""
+        with self.lock:
+            self.open -= 1
+
+def getDeploymentError(workers: int):
+    """Check whether the event backend reaches all streams with the given number of worker processes: the memory backend only delivers an event to the streams of the process which executed the write, hence it requires a single worker.
+
+    parameters:
+        workers -- the number of worker processes
+
+    returns:
+        error -- message describing the misconfiguration, or None if the backend suits the number of workers
+    """
+    backend = getSetting('EVENT_BACKEND', 'memory').lower()
+    if backend == 'memory' and workers > 1:
+        return f'EVENT_BACKEND=memory requires a single worker, but WEB_CONCURRENCY is {workers}: change events would only reach the event streams of the worker which executed the write, set EVENT_BACKEND=changestream (which requires a replica set) or WEB_CONCURRENCY=1'
+    return None
+
+bus = None
+limit = None
+lock = threading.Lock()
+def getStreamLimit():
+    """Obtain the counter of the open event streams of the process, which admits EVENT_MAX_STREAMS streams (by default one less than GUNICORN_THREADS, but at least one)."""
+    global limit
+    if limit is None:
+        with lock:
+            if limit is None:
+                limit = StreamLimit(getSetting('EVENT_MAX_STREAMS', max(1, getSetting('GUNICORN_THREADS', 4, int) - 1), int))
+    return limit
+
+def getEventBus():
+    """Obtain the event bus of the process as configured by the EVENT_BACKEND setting (memory or changestream).
+
+    raises:
+        ValueError -- in case the setting is neither memory nor changestream
+    """
+    global bus
+    if bus is None:
+        with lock:
+            if bus is None:
+                backend = getSetting('EVENT_BACKEND', 'memory').lower()
+                if backend not in BACKENDS:
+                    raise ValueError(f'Invalid EVENT_BACKEND {backend}, expected one of {", ".join(BACKENDS)}')
+                queue_size = getSetting('EVENT_QUEUE_SIZE', 100, int)
+                bus = EventBus(queue_size=queue_size) if backend == 'memory' else ChangeStreamBus(queue_size=queue_size, ttl=getSetting('EVENT_TTL', 3600, int))
+    return bus
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+
+from pymongo import IndexModel
+
+indexes = {}
+def getIndexes(collection_name: str):
+    """Obtain the index declarations of a collection, which are stored as a json file with the same name next to the
+    validators (see src/static/indexes). Each declaration is a dict containing the keys (a list of [field, direction]
+    pairs, where multiple pairs form a compound index) and optionally a name and the options unique, sparse,
+    collation, partialFilterExpression and expireAfterSeconds (see https://www.mongodb.com/docs/manual/indexes/).
+
+    parameters:
+        collection_name -- the name of the collection, which should also be the filename
+
+    returns:
+        [declaration] -- list of index declarations (empty if the collection declares no indexes)
+    """
+    if collection_name not in indexes:
+        path = f'./src/static/indexes/{collection_name}.json'
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                indexes[collection_name] = json.load(f)
+        else:
+            indexes[collection_name] = []
+    return indexes[collection_name]
+
+OPTIONS = ['unique', 'sparse', 'collation', 'partialFilterExpression', 'expireAfterSeconds']
+
+def getIndexName(declaration: dict):
+    """Determine the name of a declared index, which defaults to the name MongoDB would assign (e.g., email_1)."""
+    if 'name' in declaration:
+        return declaration['name']
+    return '_'.join(f'{field}_{direction}' for field, direction in declaration['keys'])
+
+def toIndexModel(declaration: dict):
+    """Convert an index declaration into a pymongo IndexModel."""
+    options = {option: declaration[option] for option in OPTIONS if option in declaration}
+    return IndexModel([(field, direction) for field, direction in declaration['keys']], name=getIndexName(declaration), **options)
+
+def getCollation(collection_name: str, filter: dict):
+    """Determine the collation a query has to use in order to be served by a declared index with a collation (e.g., the
+    case-insensitive index on the email of a user). Queries only use such an index if they specify the same collation.
+
+    parameters:
+        collection_name -- the name of the collection
+        filter -- the filter of the query
+
+    returns:
+        collation -- dict in the format of a MongoDB collation
+        None -- if no declared index with a collation starts with a field of the filter
+    """
+    if not filter:
+        return None
+    for declaration in getIndexes(collection_name):
+        if 'collation' in declaration and declaration['keys'][0][0] in filter:
+            return declaration['collation']
+    return None
+
+def matches(declaration: dict, info: dict):
+    """Check whether an existing index (as returned by index_information) complies to its declaration."""
+    if [list(key) for key in info['key']] != [list(key) for key in declaration['keys']]:
+        return False
+    for option in OPTIONS:
+        if option == 'collation':
+            # the server completes the collation with default values, hence only the declared values are compared
+            existing = info.get('collation', {})
+            if any(existing.get(key) != value for key, value in declaration.get('collation', {}).items()):
+                return False
+        elif option == 'unique' or option == 'sparse':
+            if bool(info.get(option, False)) != bool(declaration.get(option, False)):
+                return False
+        elif info.get(option) != declaration.get(option):
+            return False
+    return True
+
+def getIndexDrift(collection, declarations: list):
+    """Compare the declared indexes of a collection with the indexes which actually exist in the database.
+
+    parameters:
+        collection -- the pymongo collection
+        declarations -- list of index declarations (see getIndexes)
+
+    returns:
+        drift -- dict containing the names of the declared indexes which do not exist under the key 'missing', the names of the existing indexes which differ from their declaration under the key 'changed', and the names of the existing indexes which are not declared (except for the _id index) under the key 'extra'
+    """
+    existing = collection.index_information()
+    declared = {getIndexName(declaration): declaration for declaration in declarations}
+
+    return {
+        'missing': [name for name in declared if name not in existing],
+        'changed': [name for name in declared if name in existing and not matches(declared[name], existing[name])],
+        'extra': [name for name in existing if name not in declared and name != '_id_']
+    }
+
+def reconcileIndexes(collection, declarations: list, drop: bool = False):
+    """Create all declared indexes of a collection which do not exist yet. Creating an index which already exists with the same specification has no effect, hence this can be executed upon every startup.
+
+    parameters:
+        collection -- the pymongo collection
+        declarations -- list of index declarations (see getIndexes)
+        drop -- if True, also recreate changed indexes and drop the indexes which are not declared
+
+    returns:
+        drift -- the drift before the reconciliation (see getIndexDrift) if drop is True
+        None -- otherwise
+
+    raises:
+        OperationFailure -- in case an index cannot be created, e.g., because an index of the same name but a different specification exists or because existing documents violate a unique constraint
+    """
+    drift = None
+    if drop:
+        drift = getIndexDrift(collection, declarations)
+        for name in drift['changed'] + drift['extra']:
+            collection.drop_index(name)
+
+    if len(declarations) > 0:
+        collection.create_indexes([toIndexModel(declaration) for declaration in declarations])
+    return drift
+
+def main():
+    from src.util.mongo import getDatabase
+
+    parser = argparse.ArgumentParser(description='Report or reconcile the drift between the declared and the existing indexes')
+    parser.add_argument('collections', nargs='*', default=['user', 'task', 'todo', 'video'], help='the collections to inspect')
+    parser.add_argument('--reconcile', action='store_true', help='create missing indexes, recreate changed ones and drop undeclared ones')
+    args = parser.parse_args()
+
+    database = getDatabase()
+    for collection_name in args.collections:
+        declarations = getIndexes(collection_name)
+        if args.reconcile:
+            drift = reconcileIndexes(database[collection_name], declarations, drop=True)
+        else:
+            drift = getIndexDrift(database[collection_name], declarations)
+        print(f'{collection_name}: {json.dumps(drift)}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import threading
+
+class Lazy:
+    def __init__(self, factory):
+        """Instantiate a proxy of an object which is only created upon its first use, e.g., the controller of a blueprint, such that importing the blueprint neither reads the configuration nor creates any data access object. All attribute lookups are forwarded to the object, and the creation is thread-safe, such that concurrent requests share one object.
+
+        parameters:
+            factory -- callable without arguments which creates the object
+        """
+        self.factory = factory
+        self.object = None
+        self.lock = threading.Lock()
+
+    def resolve(self):
+        """Obtain the proxied object, which is created upon the first call."""
+        if self.object is None:
+            with self.lock:
+                if self.object is None:
+                    self.object = self.factory()
+        return self.object
+
+    @property
+    def resolved(self):
+        """Whether the proxied object was already created."""
+        return self.object is not None
+
+    def __getattr__(self, name: str):
+        # only invoked for attributes which the proxy itself does not have
+        return getattr(self.resolve(), name)
@@ -0,0 +1,179 @@
+import contextvars
+import functools
+import inspect
+import os
+import time
+
+from flask import g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    # prometheus_client is optional: without it, nothing is measured and /metrics is not available
+    prometheus_client = None
+
+from pymongo import monitoring
+
+from src.util.config import getSetting
+
+# buckets of the latency histograms in seconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPERATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def isEnabled():
+    """Determine whether metrics are recorded, which requires the prometheus_client package and can be disabled by the METRICS_ENABLED setting."""
+    return prometheus_client is not None and getSetting('METRICS_ENABLED', True, bool)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram('http_request_duration_seconds', 'Latency of the HTTP requests', ['method', 'route', 'status'], buckets=REQUEST_BUCKETS)
+    OPERATION_LATENCY = prometheus_client.Histogram('dao_operation_duration_seconds', 'Latency of the operations of the data access objects', ['collection', 'method'], buckets=OPERATION_BUCKETS)
+    OPERATION_ERRORS = prometheus_client.Counter('dao_operation_errors_total', 'Number of failed operations of the data access objects', ['collection', 'method'])
+    POOL_CONNECTIONS = prometheus_client.Gauge('mongo_pool_connections', 'Number of open connections of the MongoDB connection pools', ['address'], multiprocess_mode='livesum')
+    POOL_CHECKED_OUT = prometheus_client.Gauge('mongo_pool_connections_checked_out', 'Number of connections currently used by an operation', ['address'], multiprocess_mode='livesum')
+    POOL_CHECKOUT_FAILURES = prometheus_client.Counter('mongo_pool_checkout_failures', 'Number of operations which failed to obtain a connection from the pool', ['address', 'reason'])
+
+# whether a timed method is being executed, such that the methods it delegates to are not recorded once more
+timing = contextvars.ContextVar('timing', default=False)
+
+def timed(method):
+    """Decorator of the methods of a data access object, which records the latency and the failures of each call per collection and method. Calls of timed methods within a timed method (e.g., DAO.find delegating to DAO.find_page) are not recorded, such that every call of a data access object is counted once. Both plain methods and coroutine functions are supported; coroutine functions have to be timed on the event loop which executes them (see src.util.asyncdao).
+
+    parameters:
+        method -- the method of the data access object (its first argument must provide a collection_name)
+
+    returns:
+        wrapper -- the instrumented method
+    """
+    if prometheus_client is None:
+        return method
+    name = method.__name__
+
+    def observe(dao, start, failed):
+        if not isEnabled():
+            return
+        OPERATION_LATENCY.labels(dao.collection_name, name).observe(time.perf_counter() - start)
+        if failed:
+            OPERATION_ERRORS.labels(dao.collection_name, name).inc()
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if timing.get():
+                return await method(self, *args, **kwargs)
+            token = timing.set(True)
+            start, failed = time.perf_counter(), True
+            try:
+                result = await method(self, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                timing.reset(token)
+                observe(self, start, failed)
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if timing.get():
+                return method(self, *args, **kwargs)
+            token = timing.set(True)
+            start, failed = time.perf_counter(), True
+            try:
+                result = method(self, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                timing.reset(token)
+                observe(self, start, failed)
+    return wrapper
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Connection pool listener (see https://pymongo.readthedocs.io/en/stable/api/pymongo/monitoring.html) which keeps the pool gauges up to date."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.labels(getAddress(event)).inc()
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.labels(getAddress(event)).dec()
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUT_FAILURES.labels(getAddress(event), str(event.reason)).inc()
+
+    def connection_checked_out(self, event):
+        POOL_CHECKED_OUT.labels(getAddress(event)).inc()
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.labels(getAddress(event)).dec()
+
+def getAddress(event):
+    """Format the server address of a connection pool event as host:port."""
+    return f'{event.address[0]}:{event.address[1]}'
+
+def getEventListeners():
+    """Obtain the event listeners which have to be registered with each MongoClient to record the pool gauges.
+
+    returns:
+        [listener] -- list of pymongo event listeners (empty if metrics are disabled)
+    """
+    if not isEnabled():
+        return []
+    return [PoolListener()]
+
+def startTimer():
+    """Remember the start time of the current request."""
+    g.request_start = time.perf_counter()
+
+def recordRequest(response):
+    """Record the latency of the current request per method, route pattern (not the concrete url, such that ids do not create a time series each), and status code.
+
+    parameters:
+        response -- the flask response
+
+    returns:
+        response -- the unchanged response
+    """
+    start = g.get('request_start')
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(time.perf_counter() - start)
+    return response
+
+def generateMetrics():
+    """Render all metrics in the Prometheus text format. If the PROMETHEUS_MULTIPROC_DIR environment variable is set (e.g., for multiple gunicorn workers), the metrics of all processes are aggregated.
+
+    returns:
+        body -- the metrics as bytes
+        content_type -- the content type of the Prometheus text format
+    """
+    registry = prometheus_client.REGISTRY
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+def initMetrics(app):
+    """Register the measurement of the request latencies with a flask application, unless metrics are disabled (see isEnabled). It must be called before any other after_request function is registered, such that the measured latency includes them (e.g., the compression).
+
+    parameters:
+        app -- the flask application
+    """
+    if isEnabled():
+        app.before_request(startTimer)
+        app.after_request(recordRequest)
@@ -0,0 +1,154 @@
+import atexit
+import os
+import threading
+
+import pymongo
+from pymongo.errors import OperationFailure
+
+from src.util.config import getSetting
+from src.util import metrics, profiler
+
+clients = {}
+# clients connected to a standalone mongod, which does not support transactions
+standalone = set()
+# the callbacks of the transactions in progress which are deferred until the transaction ended (see afterCommit)
+deferred = {}
+lock = threading.RLock()
+pid = os.getpid()
+
+def getClientOptions():
+    """Assemble the keyword arguments of the MongoClient from the configuration. All values are optional and fall back
+    to the pymongo defaults when they are not set.
+
+    returns:
+        options -- dict of MongoClient keyword arguments
+    """
+    options = {
+        'maxPoolSize': getSetting('MONGO_MAX_POOL_SIZE', 100, int),
+        'minPoolSize': getSetting('MONGO_MIN_POOL_SIZE', 0, int),
+        'maxIdleTimeMS': getSetting('MONGO_MAX_IDLE_TIME_MS', None, int),
+        'connectTimeoutMS': getSetting('MONGO_CONNECT_TIMEOUT_MS', 20000, int),
+        'serverSelectionTimeoutMS': getSetting('MONGO_SERVER_SELECTION_TIMEOUT_MS', 30000, int),
+        'socketTimeoutMS': getSetting('MONGO_SOCKET_TIMEOUT_MS', None, int),
+        'waitQueueTimeoutMS': getSetting('MONGO_WAIT_QUEUE_TIMEOUT_MS', None, int),
+        'compressors': getSetting('MONGO_COMPRESSORS', None),
+    }
+    options = {key: value for key, value in options.items() if value is not None}
+
+    # record the connection pool gauges (see src.util.metrics) and profile the commands of each request (see src.util.profiler)
+    listeners = metrics.getEventListeners() + profiler.getEventListeners()
+    if len(listeners) > 0:
+        options['event_listeners'] = listeners
+    return options
+
+def getClient(url: str = None):
+    """Obtain the process-wide MongoClient for the given url. The purpose of the registry is to share one connection pool
+    among all data access objects instead of opening a pool per collection. Clients which were inherited from a parent
+    process (e.g., after a fork) are discarded, as pymongo clients are not fork-safe.
+
+    parameters:
+        url -- the MongoDB url (defaults to the MONGO_URL setting)
+
+    returns:
+        client -- the shared pymongo.MongoClient
+    """
+    global pid
+    if url is None:
+        url = getSetting('MONGO_URL')
+
+    with lock:
+        if pid != os.getpid():
+            clients.clear()
+            pid = os.getpid()
+
+        if url not in clients:
+            print(f'Connecting to MongoDB at url {url}')
+            clients[url] = pymongo.MongoClient(url, **getClientOptions())
+        return clients[url]
+
+def getDatabase(name: str = None):
+    """Obtain the database of the shared client.
+
+    parameters:
+        name -- the name of the database (defaults to the MONGO_DATABASE setting or edutask)
+
+    returns:
+        database -- pymongo database object
+    """
+    if name is None:
+        name = getSetting('MONGO_DATABASE', 'edutask')
+    return getClient()[name]
+
+def closeClients():
+    """Close all connection pools of the registry, e.g., during a graceful shutdown."""
+    with lock:
+        for client in clients.values():
+            client.close()
+        clients.clear()
+
+# close the connection pools when the process terminates regularly
+atexit.register(closeClients)
+
+def resetClients():
+    """Discard all clients of the registry without closing them. This has to be called in a child process right after a
+    fork (e.g., in a gunicorn worker), as the connections of the parent process must neither be used nor closed by the
+    child. Subsequent database operations create new clients in the child process.
+    """
+    global pid
+    with lock:
+        clients.clear()
+        standalone.clear()
+        pid = os.getpid()
+
+def runInTransaction(client, callback, rollback=None):
+    """Execute a unit of work as one multi-document transaction. A standalone mongod does not support transactions, in
+    which case the unit of work is executed without a session, and the rollback is invoked if it fails halfway.
+
+    parameters:
+        client -- the pymongo.MongoClient executing the unit of work
+        callback -- callable receiving the session (or None) which is passed on to every database operation; it may be retried on transient errors and must therefore not modify its inputs
+        rollback -- optional callable undoing the partial effects of the callback if no transaction is available
+
+    returns:
+        result -- the return value of the callback
+
+    raises:
+        Exception -- any exception raised by the callback, after the transaction was aborted or the rollback was executed
+    """
+    if id(client) not in standalone:
+        try:
+            with client.start_session() as session:
+                deferred[id(session)] = []
+                try:
+                    return session.with_transaction(callback)
+                finally:
+                    for deferredcallback in deferred.pop(id(session)):
+                        deferredcallback()
+        except OperationFailure as e:
+            # error code 20 (IllegalOperation): transaction numbers are only allowed on a replica set member or mongos
+            if e.code != 20:
+                raise
+        except NotImplementedError as e:
+            # clients which do not implement sessions at all (e.g., mongomock)
+            pass
+        standalone.add(id(client))
+
+    try:
+        return callback(None)
+    except Exception as e:
+        if rollback is not None:
+            rollback()
+        raise
+
+def afterCommit(session, callback):
+    """Defer a callback until the transaction of a session started by runInTransaction (or runInTransactionAsync) has ended. Until the commit, concurrent readers still see the previous state of the modified objects, hence, e.g., cached objects must only be invalidated afterwards. Without a session, or for a session without a transaction in progress, the callback is invoked immediately.
+
+    parameters:
+        session -- the pymongo or motor session (or None)
+        callback -- callable without parameters
+    """
+    callbacks = deferred.get(id(session)) if session is not None else None
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
@@ -0,0 +1,122 @@
+import base64
+import binascii
+
+from bson import json_util
+from bson.objectid import ObjectId
+
+from src.util.config import getSetting
+
+def parseSort(sort: str = None):
+    """Parse a sort specification of the form 'field' (ascending) or '-field' (descending).
+
+    parameters:
+        sort -- the sort specification (defaults to the ascending _id)
+
+    returns:
+        (field, direction) -- the name of the field and the direction (1 or -1)
+    """
+    if not sort:
+        return ('_id', 1)
+    if sort.startswith('-'):
+        return (sort[1:], -1)
+    return (sort, 1)
+
+def getSortStages(sort: tuple):
+    """Obtain the sort order of a page, which always uses the _id as a tie-breaker such that the order is total.
+
+    parameters:
+        sort -- tuple (field, direction) as returned by parseSort
+
+    returns:
+        [(field, direction)] -- list of sort keys in the format of pymongo
+    """
+    field, direction = sort
+    if field == '_id':
+        return [('_id', direction)]
+    return [(field, direction), ('_id', direction)]
+
+def encodeCursor(obj: dict, sort: tuple):
+    """Create an opaque continuation token pointing behind the given object.
+
+    parameters:
+        obj -- the last object of a page (either a MongoDB document or its JSON representation)
+        sort -- tuple (field, direction) as returned by parseSort
+
+    returns:
+        cursor -- url-safe string
+    """
+    field, direction = sort
+    position = {'sort': [field, direction], '_id': obj['_id'], 'value': obj.get(field)}
+    return base64.urlsafe_b64encode(json_util.dumps(position).encode('utf-8')).decode('ascii')
+
+def decodeCursor(cursor: str, sort: tuple):
+    """Restore the position encoded in a continuation token.
+
+    parameters:
+        cursor -- string as returned by encodeCursor
+        sort -- tuple (field, direction) of the current request, which has to equal the one of the token
+
+    returns:
+        (value, id) -- the value of the sort field and the _id of the last object of the previous page
+
+    raises:
+        ValueError -- in case the token is malformed or was created for a different sort order
+    """
+    try:
+        position = json_util.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        if position['sort'] != list(sort) or not isinstance(position['_id'], ObjectId):
+            raise ValueError('Error: the cursor does not match the sort order')
+        return (position['value'], position['_id'])
+    except (binascii.Error, UnicodeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError('Error: invalid cursor') from e
+
+def getKeysetFilter(cursor: str, sort: tuple):
+    """Create a filter selecting all objects located behind the position of a continuation token in the given sort order.
+    Objects without a value for the sort field are ordered before all other objects (as in MongoDB).
+
+    parameters:
+        cursor -- string as returned by encodeCursor
+        sort -- tuple (field, direction) as returned by parseSort
+
+    returns:
+        filter -- dict in the format of a MongoDB filter
+
+    raises:
+        ValueError -- in case the token is invalid
+    """
+    field, direction = sort
+    value, id = decodeCursor(cursor, sort)
+    operator = '$gt' if direction == 1 else '$lt'
+
+    if field == '_id':
+        return {'_id': {operator: id}}
+    if value is None:
+        conditions = [{field: None, '_id': {operator: id}}]
+        if direction == 1:
+            conditions.append({field: {'$ne': None}})
+    else:
+        conditions = [{field: {operator: value}}, {field: value, '_id': {operator: id}}]
+        if direction == -1:
+            conditions.append({field: None})
+    return {'$or': conditions}
+
+def getPageArguments(args: dict):
+    """Extract the pagination arguments ?limit=&after=&sort= of a request. The limit is capped at the MAX_PAGE_SIZE setting.
+
+    parameters:
+        args -- the query arguments of the request
+
+    returns:
+        (limit, after, sort) -- the page size (None if the request is not paginated), the continuation token, and the sort specification
+
+    raises:
+        ValueError -- in case the limit is not a positive integer
+    """
+    limit = args.get('limit')
+    if limit is not None:
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValueError('Error: the limit must be a positive integer')
+        limit = min(int(limit), getSetting('MAX_PAGE_SIZE', 1000, int))
+    elif args.get('after') is not None:
+        limit = getSetting('MAX_PAGE_SIZE', 1000, int)
+    return (limit, args.get('after'), args.get('sort'))
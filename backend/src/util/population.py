@@ -0,0 +1,44 @@
+def getPopulationPipeline(match: dict, references: dict, single: list = None, sort: list = None, limit: int = None, embedded: bool = False):
+    """Create an aggregation pipeline (see https://www.mongodb.com/docs/manual/core/aggregation-pipeline/) which selects
+    all documents complying to the match filter and resolves their references to other collections with one $lookup
+    stage per reference. This replaces fetching each referenced object with a separate query per document.
+
+    parameters:
+        match -- filter selecting the documents to populate (e.g., {'_id': {'$in': [...]}})
+        references -- dict mapping each attribute containing one or multiple ObjectIds to the name of the referenced collection
+        single -- list of attributes which contain a single reference, such that they are resolved to one object (or None) instead of a list
+        sort -- optional list of (field, direction) tuples by which the documents are sorted
+        limit -- optional maximum number of documents (applied before any reference is resolved)
+        embedded -- if True, the attributes may also contain embedded objects (see src.util.embedding), which are kept alongside the resolved references
+
+    returns:
+        pipeline -- list of aggregation stages
+    """
+    if single is None:
+        single = []
+
+    pipeline = [{'$match': match}]
+    if sort:
+        pipeline.append({'$sort': dict(sort)})
+    if limit is not None:
+        pipeline.append({'$limit': limit})
+    if not embedded:
+        for attribute, collection_name in references.items():
+            pipeline.append({'$lookup': {'from': collection_name, 'localField': attribute, 'foreignField': '_id', 'as': attribute}})
+
+        if len(single) > 0:
+            pipeline.append({'$addFields': {attribute: {'$ifNull': [{'$arrayElemAt': [f'${attribute}', 0]}, None]} for attribute in single}})
+        return pipeline
+
+    # the references are resolved into temporary attributes, and only the values with an _id are embedded objects
+    for attribute, collection_name in references.items():
+        pipeline.append({'$lookup': {'from': collection_name, 'localField': attribute, 'foreignField': '_id', 'as': f'_{attribute}'}})
+    fields = {}
+    for attribute in references:
+        if attribute in single:
+            fields[attribute] = {'$ifNull': [{'$arrayElemAt': [f'$_{attribute}', 0]}, {'$cond': [{'$ifNull': [f'${attribute}._id', False]}, f'${attribute}', None]}]}
+        else:
+            fields[attribute] = {'$concatArrays': [{'$filter': {'input': {'$ifNull': [f'${attribute}', []]}, 'as': 'value', 'cond': {'$ifNull': ['$$value._id', False]}}}, f'$_{attribute}']}
+    pipeline.append({'$addFields': fields})
+    pipeline.append({'$project': {f'_{attribute}': 0 for attribute in references}})
+    return pipeline
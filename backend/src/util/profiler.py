@@ -0,0 +1,194 @@
+import contextlib
+import contextvars
+import json
+import threading
+from collections import Counter
+
+from flask import g, request
+from pymongo import monitoring
+
+from src.util.config import getSetting
+
+# the profile of the current flask request (or of the current queryBudget block)
+current = contextvars.ContextVar('profile', default=None)
+
+def isEnabled():
+    """Determine whether the MongoDB commands are profiled, as configured by the PROFILER_ENABLED setting."""
+    return getSetting('PROFILER_ENABLED', False, bool)
+
+def getShape(value):
+    """Reduce a filter (or any other part of a command) to its shape by replacing all values by a placeholder, such that queries which only differ in their values (e.g., the ids of a loop) have the same shape.
+
+    parameters:
+        value -- the filter, update, or pipeline
+
+    returns:
+        shape -- the filter with '?' in place of each value (lists of values are reduced to a single '?')
+    """
+    if isinstance(value, dict):
+        return {key: getShape(element) for key, element in value.items()}
+    if isinstance(value, list):
+        if any(isinstance(element, (dict, list)) for element in value):
+            return [getShape(element) for element in value]
+        return '?'
+    return '?'
+
+def getQueryShape(command_name: str, command: dict):
+    """Describe the shape of a MongoDB command by its name, its collection, and the shape of its filter.
+
+    parameters:
+        command_name -- the name of the command (e.g., find)
+        command -- the command document
+
+    returns:
+        shape -- str such as 'find task {"_id": {"$in": "?"}}'
+    """
+    collection = command.get(command_name)
+    if command_name in ['find', 'count', 'distinct', 'findAndModify']:
+        body = command.get('filter', command.get('query', {}))
+    elif command_name == 'aggregate':
+        body = command.get('pipeline', [])
+    elif command_name in ['update', 'delete']:
+        body = [statement.get('q', {}) for statement in command.get(f'{command_name}s', [])]
+    else:
+        body = None
+
+    if body is None or not isinstance(collection, str):
+        return f'{command_name} {collection}' if isinstance(collection, str) else command_name
+    return f'{command_name} {collection} {json.dumps(getShape(body), sort_keys=True, default=str)}'
+
+class QueryProfile:
+    def __init__(self):
+        """Instantiate the profile of the MongoDB commands issued on behalf of one request."""
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.pending = {}
+        # the commands of an asynchronous view are published by multiple threads of motor at once
+        self.lock = threading.Lock()
+
+    def started(self, request_id, shape: str):
+        """Record the start of a command."""
+        with self.lock:
+            self.pending[request_id] = shape
+
+    def finished(self, request_id, duration_micros: int):
+        """Record the completion (or failure) of a command."""
+        with self.lock:
+            shape = self.pending.pop(request_id, None)
+            if shape is None:
+                return
+            self.count += 1
+            self.duration += duration_micros / 1000
+            self.shapes[shape] += 1
+
+    def repeated(self):
+        """Obtain the query shapes which were issued more than once, which usually indicates a query in a loop.
+
+        returns:
+            repeated -- dict mapping each repeated shape to its number of occurrences
+        """
+        return {shape: count for shape, count in self.shapes.items() if count > 1}
+
+    def summary(self):
+        """Summarize the profile in one line."""
+        summary = f'{self.count} queries in {self.duration:.1f} ms'
+        repeated = self.repeated()
+        if len(repeated) > 0:
+            summary += ' (repeated: ' + ', '.join(f'{shape} x{count}' for shape, count in repeated.items()) + ')'
+        return summary
+
+class ProfilingListener(monitoring.CommandListener):
+    """Command listener (see https://pymongo.readthedocs.io/en/stable/api/pymongo/monitoring.html) which attributes each command to the profile of the current request. pymongo publishes the events in the thread executing the command, i.e., in the thread of the request, or in a thread of motor which runs in the context of the asynchronous view (see src.util.asyncmongo.runOnDatabaseLoop)."""
+
+    def started(self, event):
+        profile = current.get()
+        if profile is not None:
+            profile.started(event.request_id, getQueryShape(event.command_name, event.command))
+
+    def succeeded(self, event):
+        profile = current.get()
+        if profile is not None:
+            profile.finished(event.request_id, event.duration_micros)
+
+    def failed(self, event):
+        profile = current.get()
+        if profile is not None:
+            profile.finished(event.request_id, event.duration_micros)
+
+def getEventListeners():
+    """Obtain the event listeners which have to be registered with each MongoClient to profile the commands.
+
+    returns:
+        [listener] -- list of pymongo event listeners (empty if the profiler is disabled)
+    """
+    if not isEnabled():
+        return []
+    return [ProfilingListener()]
+
+def startProfile():
+    """Start the profile of the current request, unless the request is executed within a profile already (e.g., within a queryBudget block of a test)."""
+    if current.get() is None:
+        g.profile_token = current.set(QueryProfile())
+
+def finishProfile(response):
+    """Attach the profile of the current request to the response as the X-Query-Count and Server-Timing headers, and print it if the PROFILER_LOG setting is enabled.
+
+    parameters:
+        response -- the flask response
+
+    returns:
+        response -- the response including the headers
+    """
+    profile = current.get()
+    if profile is None:
+        return response
+
+    response.headers['X-Query-Count'] = str(profile.count)
+    response.headers['Server-Timing'] = f'db;dur={profile.duration:.1f};desc="{profile.count} queries"'
+    if getSetting('PROFILER_LOG', False, bool):
+        print(f'{request.method} {request.path}: {profile.summary()}')
+    return response
+
+def resetProfile(exception=None):
+    """Discard the profile of the current request, also if the request failed, such that a worker thread never passes it on to its next request."""
+    token = g.pop('profile_token', None)
+    if token is not None:
+        current.reset(token)
+
+def initProfiler(app):
+    """Register the profiling of the MongoDB commands of each request with a flask application, if the PROFILER_ENABLED setting is enabled.
+
+    parameters:
+        app -- the flask application
+    """
+    if isEnabled():
+        app.before_request(startProfile)
+        app.after_request(finishProfile)
+        app.teardown_request(resetProfile)
+
+@contextlib.contextmanager
+def queryBudget(max_queries: int):
+    """Assert that the code executed within the block issues at most the given number of MongoDB commands, e.g., in a test:
+
+        with queryBudget(3):
+            client.get(f'/tasks/ofuser/{id}')
+
+    The commands are recorded by the ProfilingListener, which must be registered with the client (see getEventListeners).
+
+    parameters:
+        max_queries -- the maximum number of commands
+
+    yields:
+        profile -- the QueryProfile of the block
+
+    raises:
+        AssertionError -- in case the block issued more commands than the budget allows
+    """
+    profile = QueryProfile()
+    token = current.set(profile)
+    try:
+        yield profile
+    finally:
+        current.reset(token)
+    assert profile.count <= max_queries, f'Expected at most {max_queries} queries, but {profile.summary()}'
@@ -0,0 +1,169 @@
+import argparse
+import json
+import math
+import random
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+
+from src.util.dao import VERSION
+
+FIRST_NAMES = ['Jane', 'John', 'Alex', 'Maria', 'Sam', 'Li', 'Fatima', 'Noah', 'Emma', 'Lukas', 'Sara', 'Omar']
+LAST_NAMES = ['Doe', 'Smith', 'Andersson', 'Garcia', 'Nguyen', 'Müller', 'Khan', 'Rossi', 'Kowalski', 'Silva']
+WORDS = ['improve', 'devtools', 'web', 'development', 'tools', 'effective', 'video', 'watch', 'learn', 'practice', 'react',
+    'python', 'flask', 'mongodb', 'testing', 'usability', 'evaluate', 'notes', 'summary', 'chapter', 'exercise', 'review']
+URLS = ['U_gANjtv28g', 'dQw4w9WgXcQ', 'rfscVS0vtbw', 'PkZNo7MFNFg', 'Ke90Tje7VS0']
+
+# the creation time encoded in the generated ids and the start of the generated start dates
+EPOCH = datetime(2023, 1, 1)
+
+def parseDistribution(spec: str):
+    """Parse the specification of a distribution of non-negative integers, which is one of fixed:N, uniform:MIN-MAX, poisson:MEAN, or normal:MEAN,SD (rounded and clamped to 0).
+
+    parameters:
+        spec -- the specification (e.g., poisson:5)
+
+    returns:
+        sample -- callable receiving a random.Random and returning one value
+
+    raises:
+        ValueError -- in case the specification is invalid
+    """
+    try:
+        kind, _, arguments = spec.partition(':')
+        if kind == 'fixed':
+            value = int(arguments)
+            return lambda rng: value
+        if kind == 'uniform':
+            low, high = [int(value) for value in arguments.split('-')]
+            return lambda rng: rng.randint(low, high)
+        if kind == 'poisson':
+            mean = float(arguments)
+            return lambda rng: samplePoisson(rng, mean)
+        if kind == 'normal':
+            mean, sd = [float(value) for value in arguments.split(',')]
+            return lambda rng: max(0, round(rng.gauss(mean, sd)))
+    except ValueError as e:
+        pass
+    raise ValueError(f'Invalid distribution {spec}, expected fixed:N, uniform:MIN-MAX, poisson:MEAN, or normal:MEAN,SD')
+
+def samplePoisson(rng: random.Random, mean: float):
+    """Draw a value from a Poisson distribution (Knuth's method, or the normal approximation for large means)."""
+    if mean > 50:
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    limit, k, p = math.exp(-mean), 0, rng.random()
+    while p > limit:
+        k += 1
+        p *= rng.random()
+    return k
+
+def generateId(rng: random.Random, created: datetime):
+    """Generate a deterministic ObjectId with the given creation time."""
+    return ObjectId(struct.pack('>I', int(created.timestamp())) + rng.randbytes(8))
+
+def generateUser(index: int, seed: int, tasks, todos, words):
+    """Generate a user including its tasks, videos and todos. Every user is generated by a random number generator of its own, such that the data only depends on the seed and the index of the user (and not on the batches or their order).
+
+    parameters:
+        index -- the index of the user, which also makes the email unique
+        seed -- the seed of the dataset
+        tasks, todos, words -- the distributions of the number of tasks per user, todos per task, and words per description (see parseDistribution)
+
+    returns:
+        documents -- dict mapping each collection name to the list of generated documents
+    """
+    rng = random.Random(f'{seed}:{index}')
+    created = EPOCH + timedelta(minutes=index)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    user = {'_id': generateId(rng, created), 'firstName': first, 'lastName': last, 'email': f'{first}.{last}.{index}@example.com'.lower(), 'tasks': [], VERSION: 1}
+
+    documents = {'user': [user], 'task': [], 'video': [], 'todo': []}
+    for t in range(tasks(rng)):
+        video = {'_id': generateId(rng, created), 'url': rng.choice(URLS), VERSION: 1}
+        todoobjs = [{'_id': generateId(rng, created), 'description': ' '.join(rng.choices(WORDS, k=max(1, words(rng) // 4))).capitalize(), 'done': rng.random() < 0.5, VERSION: 1} for _ in range(todos(rng))]
+        task = {
+            '_id': generateId(rng, created),
+            'title': f'{" ".join(rng.choices(WORDS, k=3)).capitalize()} {index}.{t}',
+            'description': ' '.join(rng.choices(WORDS, k=words(rng))).capitalize(),
+            'startdate': EPOCH + timedelta(days=rng.randint(0, 365)),
+            'categories': [],
+            'video': video['_id'],
+            'todos': [todo['_id'] for todo in todoobjs],
+            VERSION: 1
+        }
+        user['tasks'].append(task['_id'])
+        documents['video'].append(video)
+        documents['todo'].extend(todoobjs)
+        documents['task'].append(task)
+    return documents
+
+def seedDatabase(database, users: int, tasks: str = 'poisson:5', todos: str = 'poisson:3', words: str = 'uniform:5-30', seed: int = 0, offset: int = 0, batch_size: int = 500, workers: int = 4):
+    """Generate a deterministic dataset and insert it with one bulk insert per collection and batch of users, where the batches are inserted by parallel workers.
+
+    parameters:
+        database -- the pymongo database (its collections should be created beforehand, e.g., by their data access objects, such that the validators and indexes apply)
+        users -- the number of users
+        tasks, todos, words -- the distributions of the number of tasks per user, todos per task, and words per description (see parseDistribution)
+        seed -- the seed of the dataset: the same seed, distributions and indexes always produce the same documents
+        offset -- the index of the first user, such that multiple calls produce distinct users
+        batch_size -- the number of users per batch
+        workers -- the number of batches inserted in parallel
+
+    returns:
+        counts -- dict containing the number of inserted documents per collection
+
+    raises:
+        ValueError -- in case a distribution is invalid
+        Exception -- in case any database operation fails
+    """
+    tasks, todos, words = parseDistribution(tasks), parseDistribution(todos), parseDistribution(words)
+
+    def insertBatch(first: int):
+        documents = {'user': [], 'task': [], 'video': [], 'todo': []}
+        for index in range(first, min(first + batch_size, offset + users)):
+            for collection_name, objs in generateUser(index, seed, tasks, todos, words).items():
+                documents[collection_name].extend(objs)
+
+        # the referenced objects are inserted first, such that a reader never encounters a dangling reference
+        for collection_name in ['video', 'todo', 'task', 'user']:
+            if len(documents[collection_name]) > 0:
+                database[collection_name].insert_many(documents[collection_name], ordered=False)
+        return {collection_name: len(objs) for collection_name, objs in documents.items()}
+
+    counts = {'user': 0, 'task': 0, 'video': 0, 'todo': 0}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for batchcounts in executor.map(insertBatch, range(offset, offset + users, batch_size)):
+            for collection_name, count in batchcounts.items():
+                counts[collection_name] += count
+    return counts
+
+def main():
+    from src.util.daos import getDao
+
+    parser = argparse.ArgumentParser(description='Seed the database with a deterministic synthetic dataset')
+    parser.add_argument('--users', type=int, default=1000, help='number of users')
+    parser.add_argument('--tasks', default='poisson:5', help='distribution of the number of tasks per user')
+    parser.add_argument('--todos', default='poisson:3', help='distribution of the number of todos per task')
+    parser.add_argument('--words', default='uniform:5-30', help='distribution of the number of words per task description')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the dataset')
+    parser.add_argument('--offset', type=int, default=0, help='index of the first user')
+    parser.add_argument('--batch-size', type=int, default=500, help='number of users per bulk insert')
+    parser.add_argument('--workers', type=int, default=4, help='number of batches inserted in parallel')
+    parser.add_argument('--drop', action='store_true', help='drop the collections before seeding')
+    args = parser.parse_args()
+
+    if args.drop:
+        for collection_name in ['user', 'task', 'video', 'todo']:
+            getDao(collection_name).drop()
+    # create the collections including their validators and indexes
+    database = getDao('user').collection.database
+    for collection_name in ['task', 'video', 'todo']:
+        getDao(collection_name).collection
+
+    counts = seedDatabase(database, args.users, tasks=args.tasks, todos=args.todos, words=args.words, seed=args.seed, offset=args.offset, batch_size=args.batch_size, workers=args.workers)
+    print(json.dumps(counts))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import json
+
+from flask import Response, stream_with_context
+
+from src.util.config import getSetting
+
+def encodeJsonArray(objs):
+    """Encode a sequence of JSON objects as one JSON array, chunk by chunk.
+
+    parameters:
+        objs -- iterable of JSON-compatible objects
+
+    yields:
+        chunk -- part of the JSON array (the concatenation of all chunks is a valid JSON document)
+    """
+    separator = '['
+    for chunk in encodeChunks(objs):
+        yield separator + ','.join(chunk)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+def encodeNdjson(objs):
+    """Encode a sequence of JSON objects as newline delimited JSON (see https://github.com/ndjson/ndjson-spec).
+
+    parameters:
+        objs -- iterable of JSON-compatible objects
+
+    yields:
+        chunk -- one or multiple complete lines
+    """
+    for chunk in encodeChunks(objs):
+        yield '\n'.join(chunk) + '\n'
+
+def encodeChunks(objs):
+    """Group the encoded objects into chunks of roughly STREAM_CHUNK_SIZE bytes, such that the response is not written object by object.
+
+    parameters:
+        objs -- iterable of JSON-compatible objects
+
+    yields:
+        [str] -- list of encoded objects
+    """
+    size = getSetting('STREAM_CHUNK_SIZE', 65536, int)
+    chunk, length = [], 0
+    for obj in objs:
+        encoded = json.dumps(obj, separators=(',', ':'))
+        chunk.append(encoded)
+        length += len(encoded)
+        if length >= size:
+            yield chunk
+            chunk, length = [], 0
+    if len(chunk) > 0:
+        yield chunk
+
+def isStreamRequested(request):
+    """Determine whether a request asks for a streamed response, either via the query argument ?stream=json or ?stream=ndjson, or via the header Accept: application/x-ndjson.
+
+    parameters:
+        request -- the flask request
+
+    returns:
+        format -- 'json' or 'ndjson' if the response shall be streamed
+        None -- otherwise
+    """
+    stream = request.args.get('stream')
+    if stream in ['json', 'ndjson']:
+        return stream
+    if stream is not None and stream.lower() in ['1', 'true']:
+        return 'json'
+    if request.accept_mimetypes.best == 'application/x-ndjson':
+        return 'ndjson'
+    return None
+
+def streamResponse(objs, format: str = 'json'):
+    """Create a flask response which writes the objects incrementally while they are being fetched from the database, such that the memory consumption of the request does not depend on the number of objects.
+
+    parameters:
+        objs -- iterable of JSON-compatible objects (e.g., the generator of DAO.iterate)
+        format -- 'json' for a JSON array or 'ndjson' for newline delimited JSON
+
+    returns:
+        response -- flask response with a streamed body
+    """
+    if format == 'ndjson':
+        return Response(stream_with_context(encodeNdjson(objs)), mimetype='application/x-ndjson')
+    return Response(stream_with_context(encodeJsonArray(objs)), mimetype='application/json')
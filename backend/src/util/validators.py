@@ -13,4 +13,39 @@ def getValidator(collection_name: str):
     if collection_name not in validators:
         with open(f'./src/static/validators/{collection_name}.json', 'r') as f:
             validators[collection_name] = json.load(f)
-    return validators[collection_name]
\ No newline at end of file
+    return validators[collection_name]
+def getValidatorUpdate(collection_name: str, collections: list):
+    """Determine the collMod command (see https://www.mongodb.com/docs/manual/reference/command/collMod/) which replaces the validator of an existing collection by the current one (see getValidator). A validator is only set when a collection is created, hence a collection created by an earlier version keeps its previous validator until it is replaced.
+
+    parameters:
+        collection_name -- the name of the collection
+        collections -- the collection information returned by list_collections for this collection
+
+    returns:
+        command -- the collMod command
+        None -- if the validator of the collection is up to date (or the collection does not exist)
+    """
+    validator = getValidator(collection_name)
+    if len(collections) == 0 or collections[0].get('options', {}).get('validator') == validator:
+        return None
+    return {'collMod': collection_name, 'validator': validator}
+
+def applyValidator(database, collection_name: str):
+    """Replace the validator of an existing collection by the current one unless it is up to date (see getValidatorUpdate).
+
+    parameters:
+        database -- the pymongo database object containing the collection
+        collection_name -- the name of the collection
+
+    returns:
+        True -- if the validator was replaced
+        False -- if it was up to date
+
+    raises:
+        OperationFailure -- in case the validator cannot be replaced, e.g., because the user is not authorized to run collMod
+    """
+    command = getValidatorUpdate(collection_name, list(database.list_collections(filter={'name': collection_name})))
+    if command is None:
+        return False
+    database.command(command)
+    return True
@@ -0,0 +1,66 @@
+import contextlib
+import multiprocessing
+import os
+import runpy
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch, MagicMock
+
+import src.util.mongo as mongo
+from src.app import create_app
+from src.util.lazy import Lazy
+
+def test_create_app_does_not_connect():
+    with patch('src.util.mongo.pymongo.MongoClient') as mockclient:
+        create_app()
+    mockclient.assert_not_called()
+
+def test_create_app_registers_blueprints():
+    rules = [rule.rule for rule in create_app().url_map.iter_rules()]
+    assert all(rule in rules for rule in ['/', '/populate', '/users/all', '/tasks/ofuser/<id>', '/todos/byid/<id>'])
+
+def test_reset_clients_after_fork_creates_new_client():
+    with patch('src.util.mongo.pymongo.MongoClient') as mockclient, patch.dict(mongo.clients, clear=True):
+        mongo.getClient('mongodb://localhost:27017')
+        mongo.resetClients()
+        mongo.getClient('mongodb://localhost:27017')
+    assert (mockclient.call_count, mockclient.return_value.close.call_count) == (2, 0)
+
+def test_import_does_not_create_data_access_objects():
+    probe = 'import main; from src.util import daos, mongo; print(len(daos.daos), len(mongo.clients))'
+    result = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['0', '0']
+
+def test_lazy_creates_object_once():
+    factory = MagicMock()
+    controller = Lazy(factory)
+    assert controller.resolved is False
+    controller.get('id')
+    controller.delete('id')
+    assert (factory.call_count, controller.resolved) == (1, True)
+
+def test_ping_does_not_read_files():
+    client = create_app().test_client()
+    client.get('/')
+    with patch('src.util.config.dotenv_values') as mockvalues, patch('builtins.open') as mockopen:
+        response = client.get('/')
+    mockvalues.assert_not_called()
+    mockopen.assert_not_called()
+    assert response.status_code == 200
+
+def test_gunicorn_configuration_reads_settings():
+    # the settings of the application include the values of the local .env file
+    with patch.dict('src.util.config.settings', {'PORT': '8000', 'WEB_CONCURRENCY': '1', 'GUNICORN_THREADS': '8'}):
+        configuration = runpy.run_path(os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py'))
+    assert (configuration['bind'], configuration['workers'], configuration['threads']) == ('0.0.0.0:8000', 1, 8)
+
+@pytest.mark.parametrize('backend, workers', [('memory', 1), ('changestream', 2 * multiprocessing.cpu_count() + 1)])
+def test_gunicorn_starts_multiple_workers_only_with_change_streams(backend, workers):
+    with patch.dict('src.util.config.settings', {'EVENT_BACKEND': backend}):
+        configuration = runpy.run_path(os.path.join(os.path.dirname(__file__), '..', '..', 'gunicorn.conf.py'))
+        server = MagicMock()
+        server.cfg.workers = 3
+        with pytest.raises(SystemExit) if backend == 'memory' else contextlib.nullcontext():
+            configuration['on_starting'](server)
+    assert configuration['workers'] == workers
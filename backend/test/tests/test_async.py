@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+
+from flask import Flask
+from pymongo.errors import WriteError
+
+import src.util.asyncmongo as asyncmongo
+from src.controllers.asynctaskcontroller import AsyncTaskController
+from src.util.etag import conditionalJsonResponse
+
+@pytest.fixture
+def controller():
+    daos = {}
+    for name in ['task', 'video', 'todo', 'user']:
+        daos[name] = MagicMock(collection_name=name)
+        for method in ['create', 'create_many', 'update', 'update_many', 'delete_many', 'find', 'findOne', 'aggregate']:
+            setattr(daos[name], method, AsyncMock())
+    daos['todo'].create_many.return_value = {'created': [], 'errors': []}
+
+    controller = AsyncTaskController(tasks_dao=daos['task'], videos_dao=daos['video'], todos_dao=daos['todo'], users_dao=daos['user'])
+    # pretend a standalone mongod, such that no session is started
+    asyncmongo.standalone.add(id(daos['task'].collection.database.client))
+    return controller
+
+def test_run_operations_concurrently():
+    # the first operation only completes once the second one started, which deadlocks if they are awaited sequentially
+    async def run():
+        started = asyncio.Event()
+        async def first(session):
+            await started.wait()
+            return 1
+        async def second(session):
+            started.set()
+            return 2
+        return await asyncio.wait_for(asyncmongo.runOperations([first, second]), timeout=1)
+
+    assert asyncio.run(run()) == [1, 2]
+
+def test_run_operations_sequentially_in_session():
+    order = []
+    async def operation(session, index):
+        await asyncio.sleep(0.01 * (2 - index))
+        order.append(index)
+
+    asyncio.run(asyncmongo.runOperations([lambda session: operation(session, 0), lambda session: operation(session, 1)], session=object()))
+    assert order == [0, 1]
+
+def test_run_operations_awaits_all_before_raising():
+    completed = []
+    async def failing(session):
+        raise WriteError('invalid')
+    async def slow(session):
+        await asyncio.sleep(0.01)
+        completed.append(True)
+
+    with pytest.raises(WriteError):
+        asyncio.run(asyncmongo.runOperations([failing, slow]))
+    assert completed == [True]
+
+def test_run_on_database_loop():
+    async def getThread():
+        return threading.current_thread().name
+
+    assert asyncio.run(asyncmongo.runOnDatabaseLoop(getThread())) == 'database-loop'
+
+def test_create_writes_without_transaction(controller):
+    taskid = asyncio.run(controller.create({'userid': '5f6b1a2b3c4d5e6f7a8b9c0d', 'title': 'Title', 'url': 'url', 'todos': ['Watch video']}))
+
+    assert controller.dao.create.call_args.args[0]['_id'] == controller.users_dao.update.call_args.args[1]['$push']['tasks']
+    assert str(controller.dao.create.call_args.args[0]['_id']) == taskid
+    assert controller.videos_dao.create.await_count == 1 and controller.todos_dao.create_many.await_count == 1
+
+def test_create_rolls_back_invalid_todos(controller):
+    controller.todos_dao.create_many.return_value = {'created': [], 'errors': [{'index': 0, 'code': 121, 'message': 'Document failed validation'}]}
+
+    with pytest.raises(WriteError):
+        asyncio.run(controller.create({'userid': '5f6b1a2b3c4d5e6f7a8b9c0d', 'title': 'Title', 'url': 'url', 'todos': ['Watch video']}))
+    assert controller.videos_dao.delete_many.await_count == 1 and controller.dao.delete_many.await_count == 1
+    # the user never references the task which was rolled back
+    assert controller.users_dao.update.await_count == 0
+
+@pytest.mark.parametrize('headers, expected', [({}, 200), ({'If-None-Match': '"tag"'}, 304)])
+def test_conditional_json_response(headers, expected):
+    getObject = AsyncMock(return_value={'title': 'Title'})
+    async def getEtag():
+        return 'tag'
+
+    with Flask(__name__).test_request_context(headers=headers) as context:
+        response = asyncio.run(conditionalJsonResponse(context.request, getEtag, getObject))
+    assert (response.status_code, response.get_etag()[0], getObject.await_count) == (expected, 'tag', int(expected == 200))
@@ -0,0 +1,193 @@
+import asyncio
+import itertools
+import threading
+import pytest
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+from pymongo import InsertOne
+from pymongo.errors import OperationFailure
+
+from src.app import create_app
+from src.controllers.asynctaskcontroller import AsyncTaskController
+from src.util.asyncdao import AsyncDAO
+from src.util.cache import LRUCache
+from src.util.dao import DAO
+from src.util.validators import getValidator
+
+class MotorCursor:
+    """Cursor of the mocked motor collection, which fetches its batches by awaiting to_list."""
+    def __init__(self, cursor, database):
+        self.cursor = cursor
+        self.database = database
+
+    def limit(self, limit):
+        self.cursor = self.cursor.limit(limit)
+        return self
+
+    def sort(self, sort):
+        self.cursor = self.cursor.sort(sort)
+        return self
+
+    async def to_list(self, length=None):
+        self.database.threads.append(threading.current_thread().name)
+        return list(itertools.islice(self.cursor, length))
+
+    async def close(self):
+        pass
+
+class MotorCollection:
+    """Motor collection on top of a mongomock collection, which records the threads its coroutines are awaited on."""
+    def __init__(self, collection, database):
+        self.wrapped = collection
+        self.database = database
+
+    def find(self, *args, **kwargs):
+        return MotorCursor(self.wrapped.find(*args, **kwargs), self.database)
+
+    def aggregate(self, pipeline, **kwargs):
+        return MotorCursor(self.wrapped.aggregate(pipeline, **kwargs), self.database)
+
+    def __getattr__(self, name):
+        method = getattr(self.wrapped, name)
+        async def coroutine(*args, **kwargs):
+            self.database.threads.append(threading.current_thread().name)
+            return method(*args, **kwargs)
+        return coroutine
+
+class MotorClient:
+    async def start_session(self):
+        # a standalone mongod, which does not support transactions
+        raise OperationFailure('Transaction numbers are only allowed on a replica set member or mongos', code=20)
+
+class MotorDatabase:
+    def __init__(self, database):
+        self.wrapped = database
+        self.name = database.name
+        self.client = MotorClient()
+        self.threads = []
+
+    def __getitem__(self, name):
+        return MotorCollection(self.wrapped[name], self)
+
+    async def list_collection_names(self, **kwargs):
+        return self.wrapped.list_collection_names(**kwargs)
+
+    async def create_collection(self, name, **kwargs):
+        return self.wrapped.create_collection(name)
+
+    async def list_collections(self, **kwargs):
+        return MotorCursor(iter(self.wrapped.list_collections(**kwargs)), self)
+
+    async def command(self, command):
+        return self.wrapped.command(command)
+
+@pytest.fixture
+def motordatabase(mockdatabase):
+    return MotorDatabase(mockdatabase)
+
+@pytest.fixture
+def asyncdaos(motordatabase):
+    return {name: AsyncDAO(collection_name=name, database=motordatabase) for name in ['task', 'video', 'todo', 'user']}
+
+def test_ready_updates_validator_of_existing_collection(motordatabase):
+    collections = [{'name': 'task', 'options': {'validator': {'$jsonSchema': {'bsonType': 'object'}}}}]
+    with patch.object(motordatabase.wrapped, 'list_collections', create=True, return_value=collections), \
+            patch.object(motordatabase.wrapped, 'command') as mockcommand:
+        asyncio.run(AsyncDAO(collection_name='task', database=motordatabase).ready())
+    mockcommand.assert_called_once_with({'collMod': 'task', 'validator': getValidator('task')})
+
+def test_operations_run_on_database_loop(motordatabase, asyncdaos):
+    todo = asyncio.run(asyncdaos['todo'].create({'description': 'Watch video', 'done': False}))
+    asyncio.run(asyncdaos['todo'].findOne(todo['_id']['$oid']))
+    assert len(motordatabase.threads) > 0 and set(motordatabase.threads) == {'database-loop'}
+
+def test_async_and_sync_access_return_same_objects(daos, asyncdaos):
+    todo = asyncio.run(asyncdaos['todo'].create({'description': 'Watch video', 'done': False}))
+    assert asyncio.run(asyncdaos['todo'].update(todo['_id']['$oid'], {'$set': {'done': True}})) is True
+    assert asyncio.run(asyncdaos['todo'].findOne(todo['_id']['$oid'])) == daos['todo'].findOne(todo['_id']['$oid']) == {**todo, 'done': True, '_version': 2}
+
+def test_find_page_pages_through_objects(asyncdaos):
+    created = asyncio.run(asyncdaos['todo'].create_many([{'description': f'todo {i}', 'done': False} for i in range(3)]))['created']
+    first = asyncio.run(asyncdaos['todo'].find_page(limit=2))
+    second = asyncio.run(asyncdaos['todo'].find_page(limit=2, after=first['next']))
+    assert (first['items'] + second['items'], second['next']) == (created, None)
+
+def test_iterate_fetches_batches(asyncdaos):
+    created = asyncio.run(asyncdaos['todo'].create_many([{'description': f'todo {i}', 'done': False} for i in range(5)]))['created']
+
+    async def collect():
+        return [obj async for obj in asyncdaos['todo'].iterate(batch_size=2)]
+    assert asyncio.run(collect()) == created
+
+def test_delete_many_removes_objects(daos, asyncdaos):
+    created = asyncio.run(asyncdaos['todo'].create_many([{'description': f'todo {i}', 'done': False} for i in range(3)]))['created']
+    assert asyncio.run(asyncdaos['todo'].delete_many([todo['_id']['$oid'] for todo in created[:2]])) == 2
+    assert daos['todo'].find() == created[2:]
+
+def test_bulk_write_reports_failed_operations(asyncdaos, mockdatabase):
+    mockdatabase.user.create_index('email', unique=True)
+    requests = [InsertOne({'email': email, '_version': 1}) for email in ['jane.doe@gmail.com', 'jane.doe@gmail.com', 'john.doe@gmail.com']]
+    result = asyncio.run(asyncdaos['user'].bulk_write(requests, ordered=False))
+    assert (result['inserted'], [(error['index'], error['code']) for error in result['errors']], mockdatabase.user.count_documents({})) == (2, [(1, 11000)], 2)
+
+def test_delegating_operation_is_timed_once(asyncdaos):
+    methods = ['find', 'find_page']
+    before = [REGISTRY.get_sample_value('dao_operation_duration_seconds_count', {'collection': 'todo', 'method': method}) or 0 for method in methods]
+    asyncio.run(asyncdaos['todo'].find(limit=1))
+    assert [REGISTRY.get_sample_value('dao_operation_duration_seconds_count', {'collection': 'todo', 'method': method}) or 0 for method in methods] == [before[0] + 1, before[1]]
+
+def test_cache_is_shared_with_sync_dao(mockdatabase, motordatabase):
+    cache = LRUCache()
+    dao = DAO(collection_name='todo', database=mockdatabase, cache=cache)
+    asyncdao = AsyncDAO(collection_name='todo', database=motordatabase, cache=cache)
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    dao.findOne(todo['_id']['$oid'])
+
+    with patch.object(mockdatabase.todo, 'find_one') as mockfindone:
+        assert asyncio.run(asyncdao.findOne(todo['_id']['$oid'])) == todo
+    mockfindone.assert_not_called()
+
+    asyncio.run(asyncdao.update(todo['_id']['$oid'], {'$set': {'done': True}}))
+    assert dao.findOne(todo['_id']['$oid'])['done'] is True
+
+@pytest.fixture
+def client(asyncdaos):
+    controller = AsyncTaskController(tasks_dao=asyncdaos['task'], videos_dao=asyncdaos['video'], todos_dao=asyncdaos['todo'], users_dao=asyncdaos['user'], embedded=False)
+    with patch.dict('src.util.config.settings', {'ASYNC_VIEWS': 'true'}), patch('src.blueprints.asynctaskblueprint.controller', controller):
+        yield create_app().test_client()
+
+def test_async_views_are_registered(client):
+    assert client.application.view_functions['async_task_blueprint.get_tasks_of_user'] is not None
+
+def test_async_tasks_of_user_match_sync_controller(client, controller, user):
+    response = client.get(f'/tasks/ofuser/{user["_id"]["$oid"]}')
+    assert (response.status_code, response.json) == (200, controller.get_tasks_of_user(user['_id']['$oid']))
+
+def test_async_tasks_of_user_not_modified(client, user):
+    url = f'/tasks/ofuser/{user["_id"]["$oid"]}'
+    etag = client.get(url).headers['ETag']
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert (response.status_code, response.data) == (304, b'')
+
+def test_async_task_update_and_get(client, daos, user):
+    task = daos['task'].find()[0]
+    url = f'/tasks/byid/{task["_id"]["$oid"]}'
+    updated = client.put(url, data={'data': "{'$set': {'title': 'Renamed'}}"})
+    response = client.get(url)
+    assert (updated.json['title'], updated.json['_version'], response.json) == ('Renamed', 2, updated.json)
+
+def test_async_task_update_of_missing_task_not_found(client):
+    assert client.put(f'/tasks/byid/{"0" * 24}', data={'data': "{'$set': {'title': 'Renamed'}}"}).status_code == 404
+
+def test_async_get_of_missing_task_not_found(client):
+    assert client.get(f'/tasks/byid/{"0" * 24}').status_code == 404
+
+def test_async_task_create(client, daos, user):
+    response = client.post('/tasks/create', data={'userid': user['_id']['$oid'], 'title': 'New', 'description': '-', 'url': 'x', 'todos': ['Watch video', 'Take notes']})
+    assert (response.status_code, [task['title'] for task in response.json]) == (200, ['Improve Devtools', 'Tech Stacks', 'New'])
+    assert (len(daos['video'].find()), len(daos['todo'].find())) == (3, 6)
+
+def test_async_views_allow_cross_origin_requests(client, user):
+    response = client.get(f'/tasks/ofuser/{user["_id"]["$oid"]}', headers={'Origin': 'http://localhost:3000'})
+    assert (response.status_code, response.headers['Access-Control-Allow-Origin']) == (200, 'http://localhost:3000')
@@ -0,0 +1,118 @@
+import pytest
+from unittest.mock import patch
+from bson.objectid import ObjectId
+
+from src.controllers.batchcontroller import BatchController
+from src.util.embedding import migrate
+from src.util.events import EventBus
+
+@pytest.fixture
+def controller(mockdatabase, daos):
+    mockdatabase.user.create_index('email', unique=True)
+    return BatchController(daos=daos, embedded=False)
+
+def createUser(email):
+    return {'action': 'create', 'collection': 'user', 'data': {'firstName': 'Jane', 'lastName': 'Doe', 'email': email}}
+
+@pytest.mark.parametrize('operations', [
+    None,
+    [],
+    [{'action': 'replace', 'collection': 'user', 'data': {'firstName': 'Jane'}}],
+    [{'action': 'update', 'collection': 'video', 'id': str(ObjectId()), 'data': {'$set': {'url': '-'}}}],
+    [{'action': 'delete', 'collection': 'user', 'id': 'invalid'}],
+    [{'action': 'update', 'collection': 'user', 'id': str(ObjectId()), 'data': {'$where': {'firstName': 'Jane'}}}],
+    [{'action': 'update', 'collection': 'user', 'id': str(ObjectId()), 'data': {'$inc': {'_version': 1}}}],
+    [{'action': 'create', 'collection': 'user', 'data': {'_id': str(ObjectId())}}]])
+def test_invalid_batch_is_not_executed(controller, mockdatabase, operations):
+    with pytest.raises(ValueError):
+        controller.execute([createUser('jane.doe@gmail.com')] + operations if operations else operations)
+    assert mockdatabase.user.count_documents({}) == 0
+
+def test_batch_groups_operations_per_collection(controller, daos):
+    with patch.object(daos['user'].collection, 'bulk_write', wraps=daos['user'].collection.bulk_write) as mockwrite:
+        batch = controller.execute([createUser(f'jane.doe.{index}@gmail.com') for index in range(3)], ordered=False)
+    assert (mockwrite.call_count, [result['status'] for result in batch['results']], batch['counts']['user']['inserted']) == (1, ['ok'] * 3, 3)
+
+def test_ordered_batch_skips_after_failure(controller, mockdatabase):
+    batch = controller.execute([createUser('jane.doe@gmail.com'), createUser('jane.doe@gmail.com'), createUser('john.doe@gmail.com')])
+    assert [result['status'] for result in batch['results']] == ['ok', 'error', 'skipped']
+    assert (batch['results'][1]['code'], mockdatabase.user.count_documents({})) == (11000, 1)
+
+def test_unordered_batch_continues_after_failure(controller, mockdatabase):
+    batch = controller.execute([createUser('jane.doe@gmail.com'), createUser('jane.doe@gmail.com'), createUser('john.doe@gmail.com')], ordered=False)
+    assert ([result['status'] for result in batch['results']], mockdatabase.user.count_documents({})) == (['ok', 'error', 'ok'], 2)
+
+def test_batch_updates_and_deletes(controller, daos):
+    users = [daos['user'].create({'firstName': 'Jane', 'lastName': 'Doe', 'email': f'jane.doe.{index}@gmail.com'}) for index in range(2)]
+    batch = controller.execute([
+        {'action': 'update', 'collection': 'user', 'id': users[0]['_id']['$oid'], 'data': {'$set': {'firstName': 'Janet'}}},
+        {'action': 'delete', 'collection': 'user', 'id': users[1]['_id']['$oid']}])
+    user = daos['user'].findOne(users[0]['_id']['$oid'])
+    assert ((user['firstName'], user['_version']), daos['user'].findOne(users[1]['_id']['$oid'])) == (('Janet', 2), None)
+    assert (batch['counts']['user']['modified'], batch['counts']['user']['deleted']) == (1, 1)
+
+def test_batch_assigns_todo_to_task(controller, daos):
+    task = daos['task'].create({'title': 'Improve Devtools', 'description': '-', 'todos': []})
+    batch = controller.execute([{'action': 'create', 'collection': 'todo', 'data': {'description': 'Take notes', 'taskid': task['_id']['$oid']}}])
+    assert daos['task'].findOne(task['_id']['$oid'])['todos'] == [batch['results'][0]['id']]
+
+@pytest.mark.parametrize('ordered, statuses', [(True, ['error', 'skipped']), (False, ['error', 'ok'])])
+def test_batch_rejects_todo_of_missing_task(controller, mockdatabase, ordered, statuses):
+    batch = controller.execute([
+        {'action': 'create', 'collection': 'todo', 'data': {'description': 'Take notes', 'taskid': str(ObjectId())}},
+        createUser('jane.doe@gmail.com')], ordered=ordered)
+    assert ([result['status'] for result in batch['results']], batch['results'][0]['code'], mockdatabase.todo.count_documents({})) == (statuses, 47, 0)
+
+def test_unordered_batch_assigns_only_created_todos(controller, daos, mockdatabase):
+    mockdatabase.todo.create_index('description', unique=True)
+    task = daos['task'].create({'title': 'Improve Devtools', 'description': '-', 'todos': []})
+    batch = controller.execute([
+        {'action': 'update', 'collection': 'task', 'id': task['_id']['$oid'], 'data': {'$set': {'title': 'Renamed'}}},
+        {'action': 'create', 'collection': 'todo', 'data': {'description': 'Take notes', 'taskid': task['_id']['$oid']}},
+        {'action': 'create', 'collection': 'todo', 'data': {'description': 'Take notes', 'taskid': task['_id']['$oid']}}], ordered=False)
+    assert [result['status'] for result in batch['results']] == ['ok', 'ok', 'error']
+    assert daos['task'].findOne(task['_id']['$oid'])['todos'] == [batch['results'][1]['id']]
+
+def test_embedded_batch_updates_tasks(daos, mockdatabase):
+    controller = BatchController(daos=daos, embedded=True)
+    task = daos['task'].create({'title': 'Improve Devtools', 'description': '-', 'todos': []})
+    batch = controller.execute([{'action': 'create', 'collection': 'todo', 'data': {'description': 'Take notes', 'taskid': task['_id']['$oid']}}])
+    todoid = batch['results'][0]['id']['$oid']
+    controller.execute([{'action': 'update', 'collection': 'todo', 'id': todoid, 'data': {'$set': {'done': True}}}])
+
+    todos = mockdatabase.task.find_one()['todos']
+    assert ([(str(todo['_id']), todo['done'], todo['_version']) for todo in todos], mockdatabase.todo.count_documents({})) == ([(todoid, True, 2)], 0)
+    with pytest.raises(ValueError):
+        controller.execute([{'action': 'create', 'collection': 'todo', 'data': {'description': 'Without task'}}])
+
+@pytest.mark.parametrize('embedded', [False, True])
+def test_batch_publishes_changes(daos, mockdatabase, user, embedded):
+    if embedded:
+        migrate(mockdatabase, 'embed')
+    bus = EventBus()
+    subscription = bus.subscribe(user['_id']['$oid'])
+    first, second = mockdatabase.task.find()
+    todoids = [str(todo['_id'] if embedded else todo) for todo in first['todos']]
+    batch = BatchController(daos=daos, embedded=embedded, events=bus).execute([
+        {'action': 'update', 'collection': 'todo', 'id': todoids[0], 'data': {'$set': {'done': True}}},
+        {'action': 'create', 'collection': 'todo', 'data': {'description': 'Take notes', 'taskid': str(first['_id'])}},
+        {'action': 'update', 'collection': 'task', 'id': str(second['_id']), 'data': {'$set': {'title': 'Renamed'}}},
+        {'action': 'delete', 'collection': 'todo', 'id': todoids[1]},
+        createUser('john.doe@gmail.com')])
+
+    events = [subscription.get(timeout=0) for index in range(5)]
+    assert [(event['type'], event['taskid'], event['id']) for event in events[:4]] == [
+        ('todo.updated', str(first['_id']), todoids[0]),
+        ('todo.created', str(first['_id']), batch['results'][1]['id']['$oid']),
+        ('task.updated', str(second['_id']), str(second['_id'])),
+        ('todo.deleted', str(first['_id']), todoids[1])]
+    assert (events[0]['data']['done'], events[1]['data']['description'], events[2]['data']['title'], 'data' in events[3], events[4]) == (True, 'Take notes', 'Renamed', False, None)
+
+def test_batch_route(daos):
+    import main
+    with patch('src.blueprints.batchblueprint.controller', BatchController(daos=daos, embedded=False)):
+        client = main.app.test_client()
+        response = client.post('/batch', json={'ordered': False, 'operations': [createUser('jane.doe@gmail.com')]})
+        invalid = client.post('/batch', json={'operations': [{'action': 'create', 'collection': 'video', 'data': {'url': '-'}}]})
+    assert (response.status_code, response.get_json()['results'][0]['status'], invalid.status_code) == (200, 'ok', 400)
+    assert b'Invalid operation 0' in invalid.data
@@ -0,0 +1,120 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from src.util.cache import LRUCache
+from src.util.dao import DAO
+from src.util.mongo import runInTransaction
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_cache_evicts_least_recently_used_entry():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+def test_cache_expires_entries():
+    clock = Clock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.set('a', 1)
+    clock.now = 10
+    assert cache.get('a') is None
+
+def test_cache_returns_copies():
+    cache = LRUCache()
+    cache.set('a', {'todos': []})
+    cache.get('a')['todos'].append('modified')
+    assert cache.get('a') == {'todos': []}
+
+def test_cache_counts_hits_and_misses():
+    cache = LRUCache()
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('b')
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+def test_cache_discards_values_read_before_invalidation():
+    cache = LRUCache()
+    token = cache.token()
+    cache.invalidate('a')
+    cache.set('a', 1, token=token)
+    cache.set('b', 2, token=token)
+    assert (cache.get('a'), cache.get('b')) == (None, 2)
+
+def test_cache_discards_values_read_before_clear():
+    cache = LRUCache()
+    token = cache.token()
+    cache.clear()
+    cache.set('a', 1, token=token)
+    assert cache.get('a') is None
+
+@pytest.fixture
+def dao(mockdatabase):
+    return DAO(collection_name='todo', database=mockdatabase, cache=LRUCache())
+
+def test_findOne_reads_through_cache(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    dao.findOne(todo['_id']['$oid'])
+    with patch.object(dao.collection, 'find_one') as mockfindone:
+        assert dao.findOne(todo['_id']['$oid']) == todo
+    mockfindone.assert_not_called()
+
+def test_update_invalidates_cache(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    dao.findOne(todo['_id']['$oid'])
+    dao.update(todo['_id']['$oid'], {'$set': {'done': True}})
+    assert dao.findOne(todo['_id']['$oid'])['done'] is True
+
+def test_delete_invalidates_cache(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    dao.findOne(todo['_id']['$oid'])
+    dao.delete(todo['_id']['$oid'])
+    assert dao.findOne(todo['_id']['$oid']) is None
+
+def test_find_by_ids_only_fetches_uncached_objects(dao):
+    todos = dao.create_many([{'description': f'todo {i}', 'done': False} for i in range(3)])['created']
+    dao.findOne(todos[0]['_id']['$oid'])
+    with patch.object(dao.collection, 'find', wraps=dao.collection.find) as spy:
+        result = dao.find({'_id': [todo['_id'] for todo in todos]}, toid=['_id'])
+    assert (result, len(spy.call_args.args[0]['_id']['$in'])) == (todos, 2)
+
+def test_find_by_ids_keeps_order_and_dedupes(dao):
+    todos = dao.create_many([{'description': f'todo {i}', 'done': False} for i in range(3)])['created']
+    dao.findOne(todos[2]['_id']['$oid'])
+    ids = [todos[2]['_id']['$oid'], todos[0]['_id']['$oid'], todos[2]['_id']['$oid'], todos[1]['_id']['$oid']]
+    assert dao.find_by_ids(ids) == [todos[2], todos[0], todos[1]]
+
+def test_findOne_does_not_cache_object_modified_while_read(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    find_one = dao.collection.find_one
+
+    def concurrentUpdate(*args, **kwargs):
+        obj = find_one(*args, **kwargs)
+        dao.update(todo['_id']['$oid'], {'$set': {'done': True}})
+        return obj
+
+    with patch.object(dao.collection, 'find_one', side_effect=concurrentUpdate):
+        assert dao.findOne(todo['_id']['$oid'])['done'] is False
+    assert dao.findOne(todo['_id']['$oid'])['done'] is True
+
+def test_invalidation_is_deferred_until_transaction_ended(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    dao.findOne(todo['_id']['$oid'])
+    session = MagicMock()
+    session.with_transaction.side_effect = lambda callback: callback(session)
+    client = MagicMock()
+    client.start_session.return_value.__enter__.return_value = session
+
+    def write(session):
+        dao.invalidate([todo['_id']['$oid']], session=session)
+        return dao.cache.get(todo['_id']['$oid']) is not None
+
+    assert runInTransaction(client, write) is True
+    assert dao.cache.get(todo['_id']['$oid']) is None
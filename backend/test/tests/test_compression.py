@@ -0,0 +1,50 @@
+import gzip
+import pytest
+from flask import Flask, jsonify
+
+from src.util.compression import initCompression
+from src.util.streaming import streamResponse
+
+@pytest.fixture
+def client():
+    app = Flask('compression')
+    initCompression(app)
+
+    @app.route('/large')
+    def large():
+        response = jsonify([{'description': 'Upgrade the tools used for web development.'}] * 100)
+        response.set_etag('abc')
+        return response
+
+    @app.route('/small')
+    def small():
+        return jsonify({'version': 'v1.0.0'})
+
+    @app.route('/stream')
+    def stream():
+        return streamResponse(({'index': i} for i in range(1000)))
+
+    return app.test_client()
+
+def test_gzip_response(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert (response.headers['Content-Encoding'], gzip.decompress(response.data).startswith(b'[')) == ('gzip', True)
+
+def test_brotli_preferred(client):
+    brotli = pytest.importorskip('brotli')
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+    assert (response.headers['Content-Encoding'], brotli.decompress(response.data).startswith(b'[')) == ('br', True)
+
+def test_uncompressed_without_accept_encoding(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'identity'})
+    assert ('Content-Encoding' in response.headers, response.headers['Vary']) == (False, 'Accept-Encoding')
+
+def test_small_response_not_compressed(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+
+def test_compressed_etag_is_weak(client):
+    assert client.get('/large', headers={'Accept-Encoding': 'gzip'}).headers['ETag'] == 'W/"abc"'
+
+def test_streamed_response_compressed(client):
+    response = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert len(gzip.decompress(response.data).decode().split('},{')) == 1000
@@ -0,0 +1,34 @@
+import json
+import pytest
+from datetime import datetime, timezone, timedelta
+from bson import json_util, Int64, Decimal128, Binary, Regex
+from bson.objectid import ObjectId
+
+from src.util.converter import toJson
+
+def reference(data):
+    return json.loads(json_util.dumps(data))
+
+@pytest.mark.parametrize('data', [
+    None,
+    'text',
+    42,
+    True,
+    1.5,
+    float('nan'),
+    ObjectId(),
+    datetime(2023, 4, 1, 12, 30, 15, 123456),
+    datetime(2023, 4, 1, 12, 30, 15),
+    datetime(2023, 4, 1, tzinfo=timezone.utc),
+    datetime(2023, 4, 1, tzinfo=timezone(timedelta(hours=2))),
+    datetime(1960, 1, 1),
+    Int64(2**40),
+    Decimal128('1.5'),
+    Binary(b'abc'),
+    Regex('^a', 'i'),
+    {'_id': ObjectId(), 'title': 'Tech Stacks', 'todos': [ObjectId(), ObjectId()], 'video': ObjectId(), 'startdate': datetime(2023, 4, 1), 'categories': []},
+    [{'nested': [{'_id': ObjectId(), 'done': False}]}],
+])
+def test_toJson_equals_json_util_round_trip(data):
+    result, expected = toJson(data), reference(data)
+    assert json.dumps(result, sort_keys=True) == json.dumps(expected, sort_keys=True)
@@ -0,0 +1,30 @@
+import pytest
+from unittest.mock import patch
+
+from src.util.dao import DAO
+
+@pytest.fixture
+def dao(mockdatabase):
+    mockdatabase.todo.create_index('description', unique=True)
+    return DAO(collection_name='todo', database=mockdatabase)
+
+def test_create_does_not_fetch_document(dao):
+    with patch.object(dao.collection, 'find_one') as mockfindone:
+        result = dao.create({'description': 'Watch video', 'done': False})
+    mockfindone.assert_not_called()
+    assert result == dao.findOne(result['_id']['$oid'])
+
+def test_create_many_returns_created_documents(dao):
+    result = dao.create_many([{'description': 'a', 'done': False}, {'description': 'b', 'done': True}])
+    assert [todo['description'] for todo in result['created']] == ['a', 'b']
+
+def test_create_many_empty(dao):
+    assert dao.create_many([]) == {'created': [], 'errors': []}
+
+def test_create_many_ordered_stops_at_first_error(dao):
+    result = dao.create_many([{'description': 'a'}, {'description': 'a'}, {'description': 'c'}])
+    assert ([todo['description'] for todo in result['created']], [error['index'] for error in result['errors']]) == (['a'], [1])
+
+def test_create_many_unordered_reports_each_error(dao):
+    result = dao.create_many([{'description': 'a'}, {'description': 'a'}, {'description': 'c'}], ordered=False)
+    assert ([todo['description'] for todo in result['created']], [error['index'] for error in result['errors']]) == (['a', 'c'], [1])
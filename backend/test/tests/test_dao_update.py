@@ -0,0 +1,29 @@
+import pytest
+from unittest.mock import patch
+
+from src.util.cache import LRUCache
+from src.util.dao import DAO
+
+@pytest.fixture
+def dao(mockdatabase):
+    return DAO(collection_name='todo', database=mockdatabase, cache=LRUCache(maxsize=10, ttl=60))
+
+def test_update_and_return_uses_single_command(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    with patch.object(dao.collection, 'update_one') as mockupdate:
+        result = dao.update_and_return(todo['_id']['$oid'], {'$set': {'done': True}})
+    mockupdate.assert_not_called()
+    assert (result['done'], result['_version']) == (True, 2) and result == dao.findOne(todo['_id']['$oid'])
+
+def test_update_and_return_projection(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    assert dao.update_and_return(todo['_id']['$oid'], {'$set': {'done': True}}, projection={'done': 1}) == {'_id': todo['_id'], 'done': True}
+
+def test_update_and_return_unknown_object(dao):
+    assert dao.update_and_return('0123456789ab0123456789ab', {'$set': {'done': True}}) is None
+
+def test_update_and_return_invalidates_cache(dao):
+    todo = dao.create({'description': 'Watch video', 'done': False})
+    dao.findOne(todo['_id']['$oid'])
+    dao.update_and_return(todo['_id']['$oid'], {'$set': {'done': True}})
+    assert dao.findOne(todo['_id']['$oid'])['done'] is True
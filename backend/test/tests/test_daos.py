@@ -0,0 +1,38 @@
+import pytest
+import mongomock
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import call, patch
+
+import src.util.daos as daos
+from src.util.dao import DAO
+from src.util.validators import getValidator
+
+def test_dao_instantiation_does_not_connect():
+    with patch('src.util.dao.getDatabase') as mockgetdatabase:
+        DAO(collection_name='user')
+    mockgetdatabase.assert_not_called()
+
+def test_dao_creates_missing_collection_with_validator():
+    database = mongomock.MongoClient().edutask
+    with patch.object(database, 'create_collection') as mockcreate:
+        DAO(collection_name='user', database=database).collection
+    mockcreate.assert_called_once_with('user', validator=getValidator('user'))
+
+@pytest.mark.parametrize('validator, expected', [({'$jsonSchema': {'bsonType': 'object'}}, 1), (getValidator('task'), 0)])
+def test_dao_updates_validator_of_existing_collection(mockdatabase, validator, expected):
+    with patch.object(mockdatabase, 'list_collections', create=True, return_value=[{'name': 'task', 'options': {'validator': validator}}]), \
+            patch.object(mockdatabase, 'command') as mockcommand:
+        DAO(collection_name='task', database=mockdatabase).collection
+    assert mockcommand.call_args_list == [call({'collMod': 'task', 'validator': getValidator('task')})] * expected
+
+def test_dao_bootstraps_collection_once(mockdatabase):
+    with patch.object(mockdatabase, 'list_collection_names', wraps=mockdatabase.list_collection_names) as spy:
+        DAO(collection_name='todo', database=mockdatabase).collection
+        DAO(collection_name='todo', database=mockdatabase).collection
+    assert spy.call_count == 1
+
+def test_getDao_concurrent_lookup_returns_single_instance():
+    with patch.dict(daos.daos, clear=True):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: daos.getDao('task'), range(32)))
+    assert all(result is results[0] for result in results)
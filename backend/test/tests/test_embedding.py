@@ -0,0 +1,133 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from bson.objectid import ObjectId
+
+from src.controllers.taskcontroller import TaskController, getTasksEtag
+from src.controllers.todocontroller import TodoController
+from src.util.embedding import isEmbedded, embedTask, migrate, main
+from src.util.validators import getValidator
+
+def getControllers(daos, embedded):
+    return TaskController(tasks_dao=daos['task'], videos_dao=daos['video'], todos_dao=daos['todo'], users_dao=daos['user'], embedded=embedded), TodoController(todo_dao=daos['todo'], tasks_dao=daos['task'], embedded=embedded)
+
+@pytest.fixture
+def userid(user):
+    return user['_id']['$oid']
+
+def test_invalid_storage_mode():
+    with patch.dict('src.util.config.settings', {'TODO_STORAGE': 'nested'}):
+        with pytest.raises(ValueError):
+            isEmbedded()
+
+def test_migration_keeps_representation(mockdatabase, daos, userid):
+    referenced, _ = getControllers(daos, False)
+    embedded, _ = getControllers(daos, True)
+    expected = referenced.get_tasks_of_user(userid)
+
+    assert migrate(mockdatabase, 'embed') == {'converted': 2, 'failed': 0}
+    assert (mockdatabase.todo.count_documents({}), mockdatabase.video.count_documents({})) == (0, 0)
+    assert embedded.get_tasks_of_user(userid) == expected
+    assert referenced.get_tasks_of_user(userid) == expected
+
+    assert migrate(mockdatabase, 'reference') == {'converted': 2, 'failed': 0}
+    assert (mockdatabase.todo.count_documents({}), mockdatabase.video.count_documents({})) == (4, 2)
+    assert referenced.get_tasks_of_user(userid) == expected
+
+def test_migration_is_repeatable(mockdatabase, userid):
+    migrate(mockdatabase, 'embed')
+    assert migrate(mockdatabase, 'embed') == {'converted': 0, 'failed': 0}
+
+def test_embed_rejects_modified_task(mockdatabase, daos, userid):
+    task = mockdatabase.task.find_one()
+    daos['task'].update(str(task['_id']), {'$set': {'title': 'Renamed'}})
+    assert embedTask(mockdatabase, task) is False
+    assert mockdatabase.todo.count_documents({}) == 4
+
+def test_embedded_create_writes_single_document(mockdatabase, daos, userid):
+    controller, _ = getControllers(daos, True)
+    controller.create({'userid': userid, 'title': 'Embedded', 'description': '-', 'url': 'U_gANjtv28g', 'todos': ['Watch video']})
+    task = mockdatabase.task.find_one({'title': 'Embedded'})
+    assert (task['video']['url'], [todo['description'] for todo in task['todos']], mockdatabase.todo.count_documents({})) == ('U_gANjtv28g', ['Watch video'], 4)
+
+def test_embedded_todo_positional_update(mockdatabase, daos, userid):
+    migrate(mockdatabase, 'embed')
+    _, todos = getControllers(daos, True)
+    task = mockdatabase.task.find_one()
+    todoid = str(task['todos'][1]['_id'])
+
+    assert todos.update(todoid, {'$set': {'done': True}}) is True
+    todo = todos.get(todoid)
+    assert (todo['description'], todo['done'], todo['_version']) == (task['todos'][1]['description'], True, 2)
+    assert mockdatabase.task.find_one({'_id': task['_id']})['_version'] == task['_version'] + 1
+
+def test_embedded_todo_create_and_delete(mockdatabase, daos, userid):
+    migrate(mockdatabase, 'embed')
+    _, todos = getControllers(daos, True)
+    taskid = mockdatabase.task.find_one()['_id']
+
+    todo = todos.create({'taskid': str(taskid), 'description': 'Take notes', 'done': 'false'})
+    assert mockdatabase.task.find_one({'_id': taskid})['todos'][-1]['description'] == 'Take notes'
+    assert todos.delete(todo['_id']['$oid']) is True
+    assert len(mockdatabase.task.find_one({'_id': taskid})['todos']) == 2
+    with pytest.raises(KeyError):
+        todos.create({'description': 'Without task'})
+
+def test_todo_falls_back_to_other_representation(mockdatabase, daos, userid):
+    todoid = str(mockdatabase.task.find_one()['todos'][0])
+    migrate(mockdatabase, 'embed')
+    _, todos = getControllers(daos, False)
+
+    assert todos.update(todoid, {'$set': {'done': True}}) is True
+    assert todos.get(todoid)['done'] is True
+    assert todos.update(str(ObjectId()), {'$set': {'done': True}}) is False
+
+def test_referenced_mode_reads_mixed_tasks(mockdatabase, daos, userid):
+    migrate(mockdatabase, 'embed')
+    controller, todos = getControllers(daos, False)
+    taskid = mockdatabase.task.find_one()['_id']
+    # a todo created in the referenced mode is referenced by an already embedded task
+    todos.create({'taskid': str(taskid), 'description': 'Take notes'})
+
+    task = controller.get(str(taskid))
+    assert (task['video']['url'], sorted(todo['description'] for todo in task['todos'])) == ('U_gANjtv28g', sorted(['Watch video', f'Summarize {task["title"]}', 'Take notes']))
+
+def test_progress_is_independent_of_storage_mode(mockdatabase, daos, userid):
+    controller, todos = getControllers(daos, False)
+    todos.update(str(mockdatabase.task.find_one()['todos'][0]), {'$set': {'done': True}})
+    expected = controller.get_progress_of_user(userid)
+    embedded, _ = getControllers(daos, True)
+    # tasks which have not been converted yet still count their referenced todos
+    assert (embedded.get_progress_of_user(userid), expected['done']) == (expected, 1)
+
+    migrate(mockdatabase, 'embed')
+    assert embedded.get_progress_of_user(userid) == controller.get_progress_of_user(userid) == expected
+
+def test_etag_matches_populated_tasks_during_migration(mockdatabase, daos, userid):
+    controller, _ = getControllers(daos, True)
+    ids = controller.get_task_ids_of_user(userid)
+    # the first task is converted, whereas the second one still references its video and todos
+    embedTask(mockdatabase, mockdatabase.task.find_one({'_id': ObjectId(ids[0])}))
+    assert controller.get_etag(ids) == getTasksEtag(controller.get_tasks_of_user(userid))
+
+def test_embedded_todo_update_and_return(mockdatabase, daos, userid):
+    migrate(mockdatabase, 'embed')
+    _, todos = getControllers(daos, True)
+    todo = mockdatabase.task.find_one()['todos'][0]
+
+    updated = todos.update_and_return(str(todo['_id']), {'$set': {'done': True}}, projection={'done': 1})
+    assert updated == {'_id': {'$oid': str(todo['_id'])}, 'done': True}
+
+def test_migration_tool_updates_task_validator_first():
+    database = MagicMock()
+    database.list_collections.return_value = [{'name': 'task', 'options': {'validator': {'$jsonSchema': {'properties': {'todos': {'items': {'bsonType': 'objectId'}}}}}}}]
+    dao = MagicMock()
+    dao.collection.database = database
+
+    def migrate(database, direction, batch_size):
+        # no task is converted before the validator accepts the embedded representation
+        assert database.command.call_args_list == [(({'collMod': 'task', 'validator': getValidator('task')},),)]
+        return {'converted': 0, 'failed': 0}
+
+    with patch('sys.argv', ['embedding', 'embed']), patch('src.util.daos.getDao', return_value=dao), patch('src.util.embedding.migrate', side_effect=migrate) as mockmigrate:
+        main()
+    assert mockmigrate.call_count == 1
@@ -0,0 +1,56 @@
+import pytest
+from unittest.mock import patch
+
+from src.controllers.todocontroller import TodoController
+from src.controllers.usercontroller import UserController
+
+@pytest.fixture
+def client(daos, controller):
+    import main
+    with patch('src.blueprints.taskblueprint.controller', controller), \
+            patch('src.blueprints.todoblueprint.controller', TodoController(todo_dao=daos['todo'], tasks_dao=daos['task'])), \
+            patch('src.blueprints.userblueprint.controller', UserController(daos['user'])):
+        yield main.app.test_client()
+
+def test_update_increments_version(daos):
+    todo = daos['todo'].create({'description': 'Watch video', 'done': False})
+    daos['todo'].update(todo['_id']['$oid'], {'$set': {'done': True}})
+    assert (todo['_version'], daos['todo'].findOne(todo['_id']['$oid'])['_version']) == (1, 2)
+
+def test_tasks_of_user_not_modified(client, user):
+    url = f'/tasks/ofuser/{user["_id"]["$oid"]}'
+    etag = client.get(url).headers['ETag']
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert (response.status_code, response.data) == (304, b'')
+
+def test_tasks_of_user_not_modified_skips_population(client, controller, user):
+    url = f'/tasks/ofuser/{user["_id"]["$oid"]}'
+    etag = client.get(url).headers['ETag']
+    with patch.object(controller, 'populate_tasks') as mockpopulate:
+        client.get(url, headers={'If-None-Match': etag})
+    mockpopulate.assert_not_called()
+
+def test_todo_toggle_changes_etag_of_task(client, daos, user):
+    task = daos['task'].find()[0]
+    url = f'/tasks/byid/{task["_id"]["$oid"]}'
+    etag = client.get(url).headers['ETag']
+    daos['todo'].update(task['todos'][0]['$oid'], {'$set': {'done': True}})
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert (response.status_code, response.json['todos'][0]['done']) == (200, True)
+
+def test_task_not_modified(client, daos, user):
+    url = f'/tasks/byid/{daos["task"].find()[0]["_id"]["$oid"]}'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+def test_user_not_modified(client, user):
+    url = f'/users/{user["_id"]["$oid"]}'
+    etag = client.get(url).headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+@pytest.mark.parametrize('url, data', [('/tasks/byid', {'data': "{'$set': {'title': 'Renamed'}}"}), ('/todos/byid', {'data': "{'$set': {'done': true}}"}), ('/users', {'firstName': 'John'})])
+def test_update_of_missing_object_not_found(client, url, data):
+    assert client.put(f'{url}/{"0" * 24}', data=data).status_code == 404
+
+def test_get_of_missing_task_not_found(client):
+    assert client.get(f'/tasks/byid/{"0" * 24}').status_code == 404
@@ -0,0 +1,135 @@
+import pytest
+import threading
+from unittest.mock import patch, MagicMock
+
+from src.controllers.taskcontroller import TaskController
+from src.controllers.todocontroller import TodoController
+from src.controllers.usercontroller import UserController
+from src.util.events import EventBus, ChangeStreamBus, StreamLimit, encodeEvents, getDeploymentError, RESYNC
+
+@pytest.fixture
+def bus():
+    return EventBus(queue_size=10)
+
+def getControllers(daos, bus, embedded=False):
+    return TaskController(tasks_dao=daos['task'], videos_dao=daos['video'], todos_dao=daos['todo'], users_dao=daos['user'], embedded=embedded, events=bus), TodoController(todo_dao=daos['todo'], tasks_dao=daos['task'], embedded=embedded, users_dao=daos['user'], events=bus)
+
+@pytest.fixture
+def userid(daos):
+    return UserController(daos['user']).create({'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane.doe@gmail.com'})['_id']['$oid']
+
+def getEvents(subscription):
+    events = []
+    while (event := subscription.get(timeout=0)) is not None:
+        events.append(event)
+    return events
+
+def test_bus_is_inactive_without_subscriptions(bus):
+    subscription = bus.subscribe('a')
+    assert bus.active is True
+    subscription.close()
+    assert bus.active is False
+
+def test_bus_delivers_to_affected_users(bus):
+    jane, john = bus.subscribe('jane'), bus.subscribe('john')
+    bus.publish('task.deleted', ['jane'], 'taskid')
+    assert (getEvents(jane), getEvents(john)) == ([{'type': 'task.deleted', 'userids': ['jane'], 'taskid': 'taskid', 'id': 'taskid'}], [])
+    with pytest.raises(ValueError):
+        bus.publish('task.renamed', ['jane'], 'taskid')
+
+def test_slow_subscription_is_resynchronized(bus):
+    subscription = bus.subscribe('jane')
+    for index in range(12):
+        bus.publish('task.deleted', ['jane'], f'task{index}')
+    assert [event['type'] for event in getEvents(subscription)] == [RESYNC, 'task.deleted']
+
+def test_subscription_waits_for_event(bus):
+    subscription = bus.subscribe('jane')
+    threading.Timer(0.05, lambda: bus.publish('task.deleted', ['jane'], 'taskid')).start()
+    assert subscription.get(timeout=5)['type'] == 'task.deleted'
+
+@pytest.mark.parametrize('embedded', [False, True])
+def test_created_task_equals_populated_task(daos, bus, userid, embedded):
+    controller, _ = getControllers(daos, bus, embedded=embedded)
+    subscription = bus.subscribe(userid)
+    taskid = controller.create({'userid': userid, 'title': 'Improve Devtools', 'description': '-', 'url': 'U_gANjtv28g', 'todos': ['Watch video']})
+    event = subscription.get(timeout=0)
+    assert (event['type'], event['taskid'], event['data']) == ('task.created', taskid, controller.get(taskid))
+
+def test_todo_events_reach_owner(daos, bus, userid):
+    controller, todos = getControllers(daos, bus)
+    taskid = controller.create({'userid': userid, 'title': 'Improve Devtools', 'description': '-', 'url': 'U_gANjtv28g', 'todos': ['Watch video']})
+    subscription = bus.subscribe(userid)
+
+    todo = todos.create({'taskid': taskid, 'description': 'Take notes'})
+    todos.update_and_return(todo['_id']['$oid'], {'$set': {'done': True}})
+    todos.delete(todo['_id']['$oid'])
+    controller.delete(taskid)
+
+    events = getEvents(subscription)
+    assert [(event['type'], event['taskid'], event['id']) for event in events] == [('todo.created', taskid, todo['_id']['$oid']), ('todo.updated', taskid, todo['_id']['$oid']), ('todo.deleted', taskid, todo['_id']['$oid']), ('task.deleted', taskid, taskid)]
+    assert events[1]['data']['done'] is True
+
+def test_no_lookups_without_subscriptions(daos, bus, userid):
+    controller, todos = getControllers(daos, bus)
+    taskid = controller.create({'userid': userid, 'title': 'Improve Devtools', 'description': '-', 'url': 'U_gANjtv28g', 'todos': ['Watch video']})
+    todoid = controller.get(taskid)['todos'][0]['_id']['$oid']
+    with patch.object(daos['user'], 'find') as mockfind, patch.object(daos['task'], 'find') as mocktasks:
+        todos.update_and_return(todoid, {'$set': {'done': True}})
+    mockfind.assert_not_called()
+    mocktasks.assert_not_called()
+
+def test_encode_events(bus):
+    subscription = bus.subscribe('jane')
+    bus.publish('task.deleted', ['jane'], 'taskid')
+    stream = encodeEvents(subscription, keepalive=0)
+    assert [next(stream) for _ in range(3)] == [': connected\n\n', 'event: task.deleted\ndata: {"type": "task.deleted", "taskid": "taskid", "id": "taskid"}\n\n', ': keepalive\n\n']
+
+def test_change_stream_bus_delivers_inserted_events():
+    collection = MagicMock()
+    inserted = threading.Event()
+    collection.insert_many.side_effect = lambda documents: inserted.set()
+    bus = ChangeStreamBus(collection=collection)
+
+    bus.publish('todo.updated', ['jane'], 'taskid', id='todoid', data={'done': True})
+    assert inserted.wait(timeout=5)
+    document = collection.insert_many.call_args[0][0][0]
+    assert (document['data'], 'createdAt' in document) == ('{"done": true}', True)
+
+    # the watcher delivers the documents of the change stream to the local subscriptions
+    stream = MagicMock()
+    stream.__enter__.return_value = iter([{'_id': 'token', 'fullDocument': {**document, '_id': 'eventid'}}])
+    collection.watch.side_effect = [stream]
+    subscription = bus.subscribe('jane')
+    assert subscription.get(timeout=5) == {'type': 'todo.updated', 'userids': ['jane'], 'taskid': 'taskid', 'id': 'todoid', 'data': {'done': True}}
+
+def test_event_route(daos, userid):
+    import main
+    bus = EventBus()
+    with patch('src.blueprints.eventblueprint.getEventBus', return_value=bus):
+        client = main.app.test_client()
+        response = client.get(f'/events/{userid}', buffered=False)
+        bus.publish('task.deleted', [userid], 'taskid')
+        stream = response.response
+        chunks = [next(stream), next(stream)]
+        response.close()
+        invalid = client.get('/events/invalid')
+    assert (response.mimetype, chunks[1].startswith(b'event: task.deleted'), bus.active, invalid.status_code) == ('text/event-stream', True, False, 400)
+
+def test_event_route_limits_open_streams(userid):
+    import main
+    limit = StreamLimit(1)
+    with patch('src.blueprints.eventblueprint.getEventBus', return_value=EventBus()), patch('src.blueprints.eventblueprint.getStreamLimit', return_value=limit):
+        client = main.app.test_client()
+        response = client.get(f'/events/{userid}', buffered=False)
+        rejected = client.get(f'/events/{userid}')
+        response.close()
+        invalid = client.get('/events/invalid')
+        reopened = client.get(f'/events/{userid}', buffered=False)
+        reopened.close()
+    assert (response.status_code, rejected.status_code, invalid.status_code, reopened.status_code, limit.open) == (200, 503, 400, 200, 0)
+
+@pytest.mark.parametrize('backend, workers, refused', [('memory', 1, False), ('memory', 3, True), ('changestream', 3, False)])
+def test_deployment_error(backend, workers, refused):
+    with patch.dict('src.util.config.settings', {'EVENT_BACKEND': backend}):
+        assert (getDeploymentError(workers) is not None) == refused
@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import MagicMock
+
+from src.util.indexes import getIndexes, getIndexDrift, getCollation, reconcileIndexes, toIndexModel
+
+DECLARATIONS = [
+    {'name': 'email_unique', 'keys': [['email', 1]], 'unique': True, 'collation': {'locale': 'en', 'strength': 2}},
+    {'keys': [['lastName', 1], ['firstName', 1]]}
+]
+
+@pytest.fixture
+def collection():
+    collection = MagicMock()
+    collection.index_information.return_value = {
+        '_id_': {'key': [('_id', 1)], 'v': 2},
+        'email_unique': {'key': [('email', 1)], 'unique': True, 'v': 2, 'collation': {'locale': 'en', 'strength': 2, 'caseLevel': False}},
+        'lastName_1_firstName_1': {'key': [('lastName', 1), ('firstName', 1)], 'v': 2}
+    }
+    return collection
+
+def test_drift_empty_when_indexes_comply(collection):
+    assert getIndexDrift(collection, DECLARATIONS) == {'missing': [], 'changed': [], 'extra': []}
+
+def test_drift_reports_missing_changed_and_extra(collection):
+    del collection.index_information.return_value['lastName_1_firstName_1']
+    collection.index_information.return_value['email_unique']['unique'] = False
+    collection.index_information.return_value['title_1'] = {'key': [('title', 1)], 'v': 2}
+    assert getIndexDrift(collection, DECLARATIONS) == {'missing': ['lastName_1_firstName_1'], 'changed': ['email_unique'], 'extra': ['title_1']}
+
+def test_drift_reports_changed_collation(collection):
+    collection.index_information.return_value['email_unique']['collation']['strength'] = 3
+    assert getIndexDrift(collection, DECLARATIONS)['changed'] == ['email_unique']
+
+def test_reconcile_drops_changed_and_extra_indexes(collection):
+    collection.index_information.return_value['email_unique']['unique'] = False
+    collection.index_information.return_value['title_1'] = {'key': [('title', 1)], 'v': 2}
+    reconcileIndexes(collection, DECLARATIONS, drop=True)
+    assert [call.args[0] for call in collection.drop_index.call_args_list] == ['email_unique', 'title_1']
+
+def test_index_model_of_compound_index():
+    assert toIndexModel(DECLARATIONS[1]).document == {'key': {'lastName': 1, 'firstName': 1}, 'name': 'lastName_1_firstName_1'}
+
+def test_user_email_is_unique_and_case_insensitive():
+    declaration = [declaration for declaration in getIndexes('user') if declaration['keys'] == [['email', 1]]][0]
+    assert (declaration['unique'], declaration['collation']['strength']) == (True, 2)
+
+def test_query_on_email_uses_index_collation():
+    assert (getCollation('user', {'email': 'jane.doe@gmail.com'}), getCollation('user', {'firstName': 'Jane'})) == ({'locale': 'en', 'strength': 2}, None)
+
+def test_collection_without_declarations():
+    assert getIndexes('video') == []
@@ -0,0 +1,63 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from src.app import create_app
+from src.controllers.usercontroller import UserController
+from src.util.dao import DAO
+from src.util.metrics import PoolListener
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+@pytest.fixture
+def dao(mockdatabase):
+    return DAO(collection_name='user', database=mockdatabase)
+
+@pytest.fixture
+def client(dao):
+    with patch('src.blueprints.userblueprint.controller', UserController(dao)):
+        yield create_app().test_client()
+
+def test_dao_operation_is_recorded(dao):
+    before = sample('dao_operation_duration_seconds_count', collection='user', method='create')
+    dao.create({'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane.doe@gmail.com'})
+    assert sample('dao_operation_duration_seconds_count', collection='user', method='create') == before + 1
+
+def test_dao_operation_error_is_recorded(dao):
+    before = sample('dao_operation_errors_total', collection='user', method='findOne')
+    with pytest.raises(Exception):
+        dao.findOne('not an id')
+    assert sample('dao_operation_errors_total', collection='user', method='findOne') == before + 1
+
+def test_delegating_dao_operation_is_recorded_once(dao):
+    before = [sample('dao_operation_duration_seconds_count', collection='user', method=method) for method in ['find', 'find_page']]
+    dao.find(limit=1)
+    assert [sample('dao_operation_duration_seconds_count', collection='user', method=method) for method in ['find', 'find_page']] == [before[0] + 1, before[1]]
+
+def test_request_is_recorded_per_route(client, dao):
+    user = dao.create({'firstName': 'Jane', 'lastName': 'Doe', 'email': 'jane.doe@gmail.com'})
+    labels = {'method': 'GET', 'route': '/users/<id>', 'status': '200'}
+    before = sample('http_request_duration_seconds_count', **labels)
+    client.get(f'/users/{user["_id"]["$oid"]}')
+    assert sample('http_request_duration_seconds_count', **labels) == before + 1
+
+def test_metrics_endpoint(client):
+    client.get('/cache')
+    response = client.get('/metrics')
+    assert response.status_code == 200 and b'http_request_duration_seconds_bucket{' in response.data
+
+def test_metrics_disabled(client):
+    with patch.dict('src.util.config.settings', {'METRICS_ENABLED': 'false'}):
+        assert client.get('/metrics').status_code == 404
+
+def test_pool_gauges():
+    listener = PoolListener()
+    event = SimpleNamespace(address=('localhost', 27017))
+    before = sample('mongo_pool_connections_checked_out', address='localhost:27017')
+    listener.connection_checked_out(event)
+    during = sample('mongo_pool_connections_checked_out', address='localhost:27017')
+    listener.connection_checked_in(event)
+    assert (during, sample('mongo_pool_connections_checked_out', address='localhost:27017')) == (before + 1, before)
@@ -0,0 +1,67 @@
+import json
+import pytest
+from unittest.mock import patch
+
+from src.util.dao import DAO
+from src.controllers.usercontroller import UserController
+
+@pytest.fixture
+def dao(mockdatabase):
+    dao = DAO(collection_name='user', database=mockdatabase)
+    dao.create_many([{'firstName': name, 'lastName': 'Doe', 'email': f'{name.lower()}{i}@doe.com'} for i, name in enumerate(['Jane', 'John', 'Jane', 'Anna', 'John', 'Bob', 'Jane'])])
+    dao.create({'lastName': 'Doe', 'email': 'nofirstname@doe.com'})
+    return dao
+
+def collect(dao, limit, sort=None):
+    pages, after = [], None
+    while True:
+        page = dao.find_page(limit=limit, after=after, sort=sort)
+        pages.append(page['items'])
+        after = page['next']
+        if after is None:
+            return pages
+
+@pytest.mark.parametrize('sort', [None, 'firstName', '-firstName'])
+@pytest.mark.parametrize('limit', [1, 3, 8, 20])
+def test_find_page_visits_every_object_once_in_order(dao, sort, limit):
+    pages = collect(dao, limit, sort)
+    assert [obj['email'] for page in pages for obj in page] == [obj['email'] for obj in dao.find_page(sort=sort)['items']]
+
+def test_find_page_limits_page_size(dao):
+    assert [len(page) for page in collect(dao, 3)] == [3, 3, 2]
+
+def test_find_page_rejects_cursor_of_other_sort_order(dao):
+    cursor = dao.find_page(limit=1, sort='firstName')['next']
+    with pytest.raises(ValueError):
+        dao.find_page(limit=1, after=cursor, sort='lastName')
+
+def test_find_page_rejects_malformed_cursor(dao):
+    with pytest.raises(ValueError):
+        dao.find_page(limit=1, after='not-a-cursor')
+
+@pytest.fixture
+def client(dao):
+    import main
+    with patch('src.blueprints.userblueprint.controller', UserController(dao)):
+        yield main.app.test_client()
+
+def test_get_users_returns_next_cursor(client):
+    first = client.get('/users/all?limit=5')
+    second = client.get(f'/users/all?limit=5&after={first.headers["X-Next-Cursor"]}')
+    assert (len(first.json), len(second.json), 'X-Next-Cursor' in second.headers) == (5, 3, False)
+
+def test_get_users_rejects_invalid_limit(client):
+    assert client.get('/users/all?limit=-1').status_code == 400
+
+def test_get_users_streams_json_array(client, dao):
+    response = client.get('/users/all?stream=json')
+    assert (response.is_streamed, response.json) == (True, dao.find())
+
+def test_get_users_streams_ndjson(client, dao):
+    response = client.get('/users/all', headers={'Accept': 'application/x-ndjson'})
+    assert [json.loads(line) for line in response.data.decode().splitlines()] == dao.find()
+
+def test_iterate_fetches_in_batches(dao):
+    with patch.object(dao.collection, 'find', wraps=dao.collection.find) as spy:
+        objs = list(dao.iterate(batch_size=2))
+    assert (len(objs), spy.call_args.kwargs['batch_size']) == (8, 2)
@@ -0,0 +1,60 @@
+import pytest
+import random
+import mongomock
+from unittest.mock import patch
+
+from src.util.seeding import parseDistribution, seedDatabase
+
+def dump(database):
+    return {name: sorted(database[name].find(), key=lambda obj: obj['_id']) for name in ['user', 'task', 'video', 'todo']}
+
+@pytest.mark.parametrize('spec, expected', [('fixed:3', {3}), ('uniform:1-2', {1, 2})])
+def test_distribution(spec, expected):
+    sample = parseDistribution(spec)
+    rng = random.Random(0)
+    assert set(sample(rng) for _ in range(100)) == expected
+
+@pytest.mark.parametrize('spec', ['poisson:4', 'normal:4,1'])
+def test_distribution_mean(spec):
+    sample = parseDistribution(spec)
+    rng = random.Random(0)
+    assert 3.5 < sum(sample(rng) for _ in range(2000)) / 2000 < 4.5
+
+@pytest.mark.parametrize('spec', ['fixed', 'uniform:5', 'zipf:2', 'poisson:x'])
+def test_invalid_distribution(spec):
+    with pytest.raises(ValueError):
+        parseDistribution(spec)
+
+def test_seed_is_deterministic_regardless_of_batches(mockdatabase):
+    other = mongomock.MongoClient().edutask
+    seedDatabase(mockdatabase, 7, seed=42, batch_size=7, workers=1)
+    seedDatabase(other, 7, seed=42, batch_size=2, workers=3)
+    assert dump(mockdatabase) == dump(other)
+
+def test_seed_references(mockdatabase):
+    counts = seedDatabase(mockdatabase, 5, tasks='fixed:2', todos='fixed:3', seed=1)
+    tasks = list(mockdatabase.task.find())
+
+    assert counts == {'user': 5, 'task': 10, 'video': 10, 'todo': 30}
+    assert sorted(id for user in mockdatabase.user.find() for id in user['tasks']) == sorted(task['_id'] for task in tasks)
+    assert mockdatabase.todo.count_documents({'_id': {'$in': [id for task in tasks for id in task['todos']]}}) == 30
+
+def test_seed_offset_creates_distinct_users(mockdatabase):
+    seedDatabase(mockdatabase, 3, tasks='fixed:0', seed=1)
+    seedDatabase(mockdatabase, 3, tasks='fixed:0', seed=1, offset=3)
+    assert len(mockdatabase.user.distinct('email')) == 6
+
+def test_seed_endpoint(mockdatabase):
+    from src.app import create_app
+    with patch('src.util.dao.getDatabase', return_value=mockdatabase), patch('src.util.dao.DAO.bootstrap'), patch.dict('src.util.daos.daos', clear=True):
+        response = create_app().test_client().post('/seed', data={'users': 4, 'tasks': 'fixed:1', 'todos': 'fixed:2'})
+    assert (response.status_code, response.json) == (200, {'user': 4, 'task': 4, 'video': 4, 'todo': 8})
+
+@pytest.mark.parametrize('data', [{'users': 11}, {'users': -1}, {'workers': 3}, {'workers': 0}])
+def test_seed_endpoint_rejects_values_over_cap(mockdatabase, data):
+    from src.app import create_app
+    with patch('src.util.dao.getDatabase', return_value=mockdatabase), patch('src.util.dao.DAO.bootstrap'), patch.dict('src.util.daos.daos', clear=True), \
+            patch.dict('src.util.config.settings', {'MAX_SEED_USERS': '10', 'MAX_SEED_WORKERS': '2'}):
+        response = create_app().test_client().post('/seed', data={'users': 4, 'workers': 1, **data})
+    assert response.status_code == 400
+    assert mockdatabase.user.count_documents({}) == 0
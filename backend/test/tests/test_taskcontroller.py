@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import patch
+from pymongo.errors import WriteError
+
+def test_get_tasks_of_user_matches_populate_task(daos, controller, user):
+    expected = [controller.populate_task(task) for task in daos['task'].find()]
+    assert controller.get_tasks_of_user(user['_id']['$oid']) == expected
+
+def test_get_tasks_of_user_uses_single_aggregation(daos, controller, user):
+    with patch.object(daos['task'].collection, 'aggregate', wraps=daos['task'].collection.aggregate) as spy, \
+            patch.object(daos['video'], 'findOne') as mockfindone, \
+            patch.object(daos['todo'], 'find') as mockfind:
+        tasks = controller.get_tasks_of_user(user['_id']['$oid'])
+    assert (spy.call_count, mockfindone.call_count, mockfind.call_count, len(tasks)) == (1, 0, 0, 2)
+
+def test_get_populates_single_task(daos, controller, user):
+    task = daos['task'].find()[0]
+    assert controller.get(task['_id']['$oid']) == controller.populate_task(task)
+
+def test_get_unknown_task(controller):
+    assert controller.get('0123456789ab0123456789ab') is None
+
+@pytest.mark.parametrize('todos', [0, 1, 25])
+def test_create_issues_constant_number_of_writes(daos, controller, user, todos):
+    collections = [daos[name].collection for name in ['task', 'video', 'todo', 'user']]
+    with patch.object(collections[0], 'insert_one', wraps=collections[0].insert_one) as taskinsert, \
+            patch.object(collections[1], 'insert_one', wraps=collections[1].insert_one) as videoinsert, \
+            patch.object(collections[2], 'insert_many', wraps=collections[2].insert_many) as todoinsert, \
+            patch.object(collections[3], 'update_one', wraps=collections[3].update_one) as userupdate:
+        controller.create({'userid': user['_id']['$oid'], 'title': 'New', 'description': '-', 'url': 'x', 'todos': [f'todo {i}' for i in range(todos)]})
+    assert [spy.call_count for spy in [taskinsert, videoinsert, todoinsert, userupdate]] == [1, 1, 1 if todos else 0, 1]
+
+def test_create_rolls_back_without_transaction_support(daos, controller, user):
+    counts = [len(daos[name].find()) for name in ['task', 'video', 'todo']]
+
+    with patch.object(daos['user'].collection, 'update_one', side_effect=WriteError('Document failed validation', code=121)):
+        with pytest.raises(WriteError):
+            controller.create({'userid': user['_id']['$oid'], 'title': 'New', 'description': '-', 'url': 'x', 'todos': ['Watch video']})
+    assert [len(daos[name].find()) for name in ['task', 'video', 'todo']] == counts
+
+def test_delete_of_user_removes_tasks_videos_and_todos(daos, controller, user):
+    counts = controller.delete_of_user(user['_id']['$oid'])
+    assert (counts, [len(daos[name].find()) for name in ['task', 'video', 'todo']]) == ({'tasks': 2, 'videos': 2, 'todos': 4}, [0, 0, 0])
+
+def test_delete_of_user_issues_one_delete_per_collection(daos, controller, user):
+    spies = [patch.object(daos[name].collection, 'delete_many', wraps=daos[name].collection.delete_many) for name in ['task', 'video', 'todo']]
+    with spies[0] as taskdelete, spies[1] as videodelete, spies[2] as tododelete:
+        controller.delete_of_user(user['_id']['$oid'])
+    assert [spy.call_count for spy in [taskdelete, videodelete, tododelete]] == [1, 1, 1]
+
+def test_delete_cascades_to_video_todos_and_user(daos, controller, user):
+    task = daos['task'].find()[0]
+    counts = controller.delete(task['_id']['$oid'])
+    assert (counts, len(daos['user'].findOne(user['_id']['$oid'])['tasks']), len(daos['todo'].find())) == ({'tasks': 1, 'videos': 1, 'todos': 2}, 1, 2)
+
+def test_delete_tasks_reads_references_in_session(daos, controller, user):
+    session = object()
+    task = daos['task'].find()[0]
+    with patch.object(daos['task'], 'find', return_value=[task]) as mockfind, \
+            patch.object(daos['task'], 'delete_many'), patch.object(daos['video'], 'delete_many'), patch.object(daos['todo'], 'delete_many'):
+        controller.delete_tasks([task['_id']['$oid']], session=session)
+    assert mockfind.call_args.kwargs['session'] is session
+
+def test_get_page_of_user_pages_through_populated_tasks(controller, user):
+    first = controller.get_page_of_user(user['_id']['$oid'], limit=1)
+    second = controller.get_page_of_user(user['_id']['$oid'], limit=1, after=first['next'])
+    assert first['items'] + second['items'] == controller.get_tasks_of_user(user['_id']['$oid']) and second['next'] is None
+
+def test_get_progress_of_user_counts_done_todos(daos, controller, user):
+    tasks = sorted(daos['task'].find(), key=lambda task: task['_id']['$oid'])
+    daos['todo'].update(tasks[0]['todos'][0]['$oid'], {'$set': {'done': True}})
+
+    summary = controller.get_progress_of_user(user['_id']['$oid'])
+    assert ([(task['title'], task['done'], task['total']) for task in summary['tasks']], summary['done'], summary['total']) == ([(tasks[0]['title'], 1, 2), (tasks[1]['title'], 0, 2)], 1, 4)
+
+def test_get_progress_uses_single_aggregation(daos, controller, user):
+    ids = [task['_id']['$oid'] for task in daos['task'].find()]
+    with patch.object(daos['task'].collection, 'aggregate', wraps=daos['task'].collection.aggregate) as spy, patch.object(daos['todo'], 'to_json') as mockconvert:
+        controller.get_progress(ids)
+    assert (spy.call_count, mockconvert.call_count) == (1, 0)
+
+def test_get_tasks_of_user_with_progress(controller, user):
+    tasks = controller.get_tasks_of_user(user['_id']['$oid'], progress=True)
+    assert [task['progress'] for task in tasks] == [{'done': 0, 'total': 2}] * 2
+
+def test_update_and_return_populates_task(daos, controller, user):
+    task = daos['task'].find()[0]
+    updated = controller.update_and_return(task['_id']['$oid'], {'$set': {'title': 'Renamed'}})
+    assert updated == {**controller.get(task['_id']['$oid']), 'title': 'Renamed'} and updated['_version'] == 2